@@ -1,5 +1,23 @@
 from django.contrib import admin
 
+from . import sessions
 from .models import User
 
-admin.site.register(User)
\ No newline at end of file
+
+@admin.register(User)
+class UserAdmin(admin.ModelAdmin):
+    list_display = ('email', 'full_name', 'is_active', 'is_manager')
+    search_fields = ('email', 'full_name')
+    actions = ('log_out_everywhere', 'lock_accounts')
+
+    @admin.action(description='Log out of every session')
+    def log_out_everywhere(self, request, queryset):
+        count = sum(sessions.logout_everywhere(user) for user in queryset)
+        self.message_user(request, f'Ended {count} sessions')
+
+    @admin.action(description='Lock accounts (deactivate and log out)')
+    def lock_accounts(self, request, queryset):
+        queryset = queryset.exclude(pk=request.user.pk)
+        queryset.update(is_active=False)
+        count = sum(sessions.logout_everywhere(user) for user in queryset)
+        self.message_user(request, f'Locked the accounts and ended {count} sessions')
@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, Warning, register
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+from .throttle import CACHE_ALIAS as THROTTLE_CACHE
+
+# Caches that each worker process keeps to itself
+LOCAL_CACHES = (LocMemCache, DummyCache)
+
+
+@register(Tags.caches)
+def check_session_cache(app_configs, **kwargs):
+    if settings.SESSION_ENGINE != 'accounts.session_store':
+        return []
+    if not isinstance(caches[settings.SESSION_CACHE_ALIAS], LOCAL_CACHES):
+        return []
+    return [Error(
+        f'The session cache "{settings.SESSION_CACHE_ALIAS}" is local to each process.',
+        hint=('accounts.session_store keeps sessions and deletions in the cache, so worker '
+              'processes would serve sessions deleted in another one. Point '
+              'SESSION_CACHE_ALIAS at a shared cache (memcached, Redis).'),
+        id='accounts.E001',
+    )]
+
+
+@register(Tags.caches)
+def check_throttle_cache(app_configs, **kwargs):
+    if not isinstance(caches[THROTTLE_CACHE], LOCAL_CACHES):
+        return []
+    return [Warning(
+        f'The login throttle cache "{THROTTLE_CACHE}" is local to each process.',
+        hint=('Each worker process and each restart gets its own login allowance. Point '
+              'LOGIN_THROTTLE_CACHE at a shared cache, e.g. a DatabaseCache.'),
+        id='accounts.W001',
+    )]
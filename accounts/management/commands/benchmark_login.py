@@ -0,0 +1,138 @@
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import Client
+from django.urls import reverse
+
+from accounts import throttle
+from accounts.models import User, UserSession
+
+PASSWORD = 'benchmark-pass-1234'
+EMAIL_DOMAIN = 'login-benchmark.invalid'
+
+
+class Command(BaseCommand):
+    help = ('Measure legitimate login latency on its own, during a password-guessing '
+            'flood with throttling off, and during the same flood with throttling on')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--logins', type=int, default=10, help='Legitimate logins timed per phase')
+        parser.add_argument('--attackers', type=int, default=8, help='Threads sending wrong passwords')
+        parser.add_argument('--attack-rate', type=float, default=20, help='Wrong passwords sent per second')
+        parser.add_argument('--attacker-ips', type=int, default=4)
+        parser.add_argument('--victims', type=int, default=50, help='Accounts the attackers guess at')
+        parser.add_argument(
+            '--warmup', type=float, default=30,
+            help='Seconds the attack runs before timing starts, so the buckets are drained',
+        )
+
+    def handle(self, *args, **options):
+        self.host = 'testserver'
+        if '*' not in settings.ALLOWED_HOSTS and 'testserver' not in settings.ALLOWED_HOSTS:
+            self.host = settings.ALLOWED_HOSTS[0].lstrip('.')
+        self.url = reverse('accounts:user_login')
+        # Hash once; every benchmark account shares it
+        encoded = make_password(PASSWORD)
+        users = User.objects.bulk_create([
+            User(email=f'user{number}@{EMAIL_DOMAIN}', full_name='Login benchmark', password=encoded)
+            for number in range(options['logins'])
+        ] + [
+            User(email=f'victim{number}@{EMAIL_DOMAIN}', full_name='Login benchmark', password=encoded)
+            for number in range(options['victims'])
+        ])
+        self.legit = [user.email for user in users[:options['logins']]]
+        self.victims = [user.email for user in users[options['logins']:]]
+        self.attacker_ips = [f'203.0.113.{number + 1}' for number in range(options['attacker_ips'])]
+        try:
+            self.attack_rate = options['attack_rate']
+            self.phase('no attack', 0, True, 0)
+            self.phase('attack, throttling off', options['attackers'], False, options['warmup'])
+            self.phase('attack, throttling on', options['attackers'], True, options['warmup'])
+        finally:
+            keys = UserSession.objects.filter(user__email__endswith=EMAIL_DOMAIN).values('session_key')
+            Session.objects.filter(session_key__in=keys).delete()
+            User.objects.filter(email__endswith=EMAIL_DOMAIN).delete()
+
+    def reset_buckets(self):
+        for ip in self.attacker_ips:
+            throttle.ip_bucket.reset(ip)
+        for email in self.legit + self.victims:
+            throttle.account_bucket.reset(email)
+
+    def phase(self, label, attacker_count, throttled, warmup):
+        self.reset_buckets()
+        buckets = throttle.ip_bucket, throttle.account_bucket
+        if not throttled:
+            throttle.ip_bucket = throttle.TokenBucket('ip', 10 ** 9, 1)
+            throttle.account_bucket = throttle.TokenBucket('account', 10 ** 9, 1)
+        stop = threading.Event()
+        measuring = threading.Event()
+        results = {'hashed': 0, 'rejected': 0}
+        lock = threading.Lock()
+
+        def attacker(number):
+            client = Client(HTTP_HOST=self.host, REMOTE_ADDR=self.attacker_ips[number % len(self.attacker_ips)])
+            local = {'hashed': 0, 'rejected': 0}
+            attempt = number
+            # Each thread sends its share of the rate, or as fast as it can when the site lags
+            interval = attacker_count / self.attack_rate
+            next_at = time.perf_counter()
+            try:
+                while not stop.is_set():
+                    next_at = max(next_at + interval, time.perf_counter())
+                    stop.wait(next_at - time.perf_counter())
+                    email = self.victims[attempt % len(self.victims)]
+                    response = client.post(self.url, {'email': email, 'password': f'guess-{attempt}'})
+                    if measuring.is_set():
+                        local['rejected' if response.status_code == 429 else 'hashed'] += 1
+                    attempt += len(self.victims) + 1
+            finally:
+                connections.close_all()
+            with lock:
+                for key, value in local.items():
+                    results[key] += value
+
+        threads = [threading.Thread(target=attacker, args=(number,)) for number in range(attacker_count)]
+        for thread in threads:
+            thread.start()
+        if threads:
+            time.sleep(warmup)
+        measuring.set()
+        latencies = []
+        failed = 0
+        began = time.perf_counter()
+        try:
+            for number, email in enumerate(self.legit):
+                # Every shopper comes from their own address
+                client = Client(HTTP_HOST=self.host, REMOTE_ADDR=f'198.51.100.{number % 250 + 1}')
+                started = time.perf_counter()
+                response = client.post(self.url, {'email': email, 'password': PASSWORD})
+                latencies.append(time.perf_counter() - started)
+                if response.status_code != 302 or response.url == self.url:
+                    failed += 1
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+            throttle.ip_bucket, throttle.account_bucket = buckets
+        elapsed = time.perf_counter() - began
+
+        latencies.sort()
+        self.stdout.write(self.style.MIGRATE_HEADING(label))
+        self.stdout.write(
+            f'legitimate logins: {len(latencies)}, failed {failed}, '
+            f'p50 {latencies[len(latencies) // 2] * 1000:.0f}ms, '
+            f'p95 {latencies[int(len(latencies) * 0.95)] * 1000:.0f}ms, '
+            f'max {latencies[-1] * 1000:.0f}ms'
+        )
+        if attacker_count:
+            total = results['hashed'] + results['rejected']
+            self.stdout.write(
+                f'attack while timed: {total} attempts in {elapsed:.1f}s ({total / elapsed:.1f}/s), '
+                f"{results['hashed']} reached the password check, {results['rejected']} rejected early"
+            )
@@ -0,0 +1,118 @@
+import random
+import threading
+import time
+from importlib import import_module
+
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection, connections
+
+from accounts import session_store
+
+ENGINES = ('django.contrib.sessions.backends.db', 'accounts.session_store')
+
+
+class Command(BaseCommand):
+    help = ('Compare session engines under concurrent requests: each request loads a '
+            'session and some also modify and save it')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=16)
+        parser.add_argument('--requests', type=int, default=500, help='Requests per thread')
+        parser.add_argument('--sessions', type=int, default=1000)
+        parser.add_argument(
+            '--write-ratio', type=float, default=0.2,
+            help='Share of requests that change the session (e.g. the cart)',
+        )
+        parser.add_argument('--engine', action='append', choices=ENGINES, help='Engines to run; all by default')
+
+    def handle(self, *args, **options):
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA journal_mode=WAL')
+                self.stdout.write(f'journal mode: {cursor.fetchone()[0]}')
+        for engine in options['engine'] or ENGINES:
+            store_class = import_module(engine).SessionStore
+            keys = self.create_sessions(store_class, options['sessions'])
+            try:
+                self.run(engine, store_class, keys, options['threads'], options['requests'], options['write_ratio'])
+            finally:
+                session_store.flush()
+                if hasattr(store_class, 'delete_many'):
+                    store_class.delete_many(keys)
+                else:
+                    Session.objects.filter(session_key__in=keys).delete()
+
+    def create_sessions(self, store_class, count):
+        keys = []
+        for number in range(count):
+            store = store_class()
+            # Roughly what a logged-in shopper carries
+            store.update({
+                '_auth_user_id': str(number), '_auth_user_backend': 'django.contrib.auth.backends.ModelBackend',
+                '_auth_user_hash': 'x' * 64, 'cart': {str(number % 50): 1},
+            })
+            store.create()
+            keys.append(store.session_key)
+        return keys
+
+    def run(self, engine, store_class, keys, thread_count, requests, write_ratio):
+        results = {'reads': 0, 'writes': 0, 'errors': 0}
+        latencies = []
+        lock = threading.Lock()
+        start = threading.Barrier(thread_count)
+
+        def worker(seed):
+            rng = random.Random(seed)
+            local = {'reads': 0, 'writes': 0, 'errors': 0}
+            timings = []
+            start.wait()
+            try:
+                for _ in range(requests):
+                    began = time.perf_counter()
+                    try:
+                        # What SessionMiddleware does: load, save only if modified
+                        store = store_class(rng.choice(keys))
+                        cart = dict(store.get('cart', {}))
+                        if rng.random() < write_ratio:
+                            cart[str(rng.randrange(50))] = rng.randrange(1, 5)
+                            store['cart'] = cart
+                            store.save()
+                            local['writes'] += 1
+                        else:
+                            local['reads'] += 1
+                    except OperationalError:
+                        local['errors'] += 1
+                    timings.append(time.perf_counter() - began)
+            finally:
+                connections.close_all()
+            with lock:
+                for key, value in local.items():
+                    results[key] += value
+                latencies.extend(timings)
+
+        threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(thread_count)]
+        began = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - began
+        flush_began = time.perf_counter()
+        flushed = session_store.flush()
+        flush_time = time.perf_counter() - flush_began
+
+        latencies.sort()
+        total = thread_count * requests
+        self.stdout.write(self.style.MIGRATE_HEADING(engine))
+        self.stdout.write(
+            f'{total} requests from {thread_count} threads in {elapsed:.3f}s ({total / elapsed:.0f} requests/s)'
+        )
+        self.stdout.write(f"{results['reads']} reads, {results['writes']} writes, {results['errors']} database errors")
+        self.stdout.write(
+            f'latency p50 {latencies[len(latencies) // 2] * 1000:.2f}ms, '
+            f'p95 {latencies[int(len(latencies) * 0.95)] * 1000:.2f}ms, '
+            f'p99 {latencies[int(len(latencies) * 0.99)] * 1000:.2f}ms'
+        )
+        if flushed:
+            self.stdout.write(f'{flushed} queued sessions written afterwards in {flush_time * 1000:.1f}ms')
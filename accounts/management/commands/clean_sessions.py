@@ -0,0 +1,53 @@
+import time
+from datetime import timedelta
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.sessions.backends.db import SessionStore as DatabaseSessionStore
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from accounts import session_store, sessions
+
+# Expired sessions deleted per statement, so the table is never locked for long
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = 'Delete expired sessions and their user session index rows; repeat with --interval'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=int, default=0,
+            help='Run again every this many seconds instead of once',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            expired = self.clean()
+            pruned = sessions.prune()
+            self.stdout.write(f'Removed {expired} expired sessions and {pruned} stale index rows')
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
+
+    def clean(self):
+        store_class = import_module(settings.SESSION_ENGINE).SessionStore
+        if not issubclass(store_class, DatabaseSessionStore):
+            # Engines without the session table expire entries themselves
+            store_class.clear_expired()
+            return 0
+        cutoff = timezone.now()
+        if issubclass(store_class, session_store.SessionStore):
+            # A row's expiry can lag a queued write by up to one interval
+            cutoff -= timedelta(seconds=2 * session_store.WRITE_BEHIND_SECONDS)
+        removed = 0
+        while True:
+            keys = list(
+                Session.objects.filter(expire_date__lt=cutoff).values_list('session_key', flat=True)[:BATCH_SIZE]
+            )
+            if not keys:
+                return removed
+            Session.objects.filter(session_key__in=keys).delete()
+            removed += len(keys)
@@ -0,0 +1,47 @@
+# Generated by Django 4.2.11 on 2026-10-17 07:05
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def index_existing_sessions(apps, schema_editor):
+    # One pass over the session table so users already logged in are covered
+    from django.contrib.sessions.backends.db import SessionStore
+
+    Session = apps.get_model('sessions', 'Session')
+    User = apps.get_model('accounts', 'User')
+    UserSession = apps.get_model('accounts', 'UserSession')
+    store = SessionStore()
+    owners = {}
+    for session_key, session_data in Session.objects.values_list('session_key', 'session_data').iterator():
+        user_id = store.decode(session_data).get('_auth_user_id')
+        if user_id:
+            owners[session_key] = int(user_id)
+    # Sessions can outlive their user
+    users = set(User.objects.values_list('pk', flat=True))
+    UserSession.objects.bulk_create([
+        UserSession(user_id=user_id, session_key=session_key)
+        for session_key, user_id in owners.items() if user_id in users
+    ], batch_size=500, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_emailchangerequest'),
+        ('sessions', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserSession',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('session_key', models.CharField(max_length=40, unique=True)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='login_sessions', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.RunPython(index_existing_sessions, migrations.RunPython.noop),
+    ]
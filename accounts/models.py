@@ -101,4 +101,13 @@ class EmailChangeRequest(models.Model):
         return now() > expiration_time
     
     def __str__(self):
-        return f"Email change request for {self.user.email} to {self.new_email}"  # type: ignore
\ No newline at end of file
+        return f"Email change request for {self.user.email} to {self.new_email}"  # type: ignore
+
+class UserSession(models.Model):
+    """Which sessions a user is logged in with (see accounts.sessions)."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='login_sessions')
+    session_key = models.CharField(max_length=40, unique=True)
+    created = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f'{self.user} ({self.session_key[:8]}…)'
@@ -0,0 +1,155 @@
+"""Session engine that answers from the cache and writes to the database later.
+
+Set SESSION_ENGINE = 'accounts.session_store' to use it. Reads come from
+the cache named by SESSION_CACHE_ALIAS and only fall back to the
+django_session table on a miss, like the cached_db engine. Unlike
+cached_db, modifying a session only updates the cache: the row is queued
+and a background thread writes all queued sessions every
+SESSION_WRITE_BEHIND_SECONDS in one transaction, so a session that changes
+on every request costs one UPDATE per interval instead of one per request.
+
+New sessions, deletions and logouts still go to the database at once, so
+every session has a row. Deleting a session also leaves a marker in the
+cache for DELETED_SECONDS; a request still holding the session that saves
+it afterwards finds the marker and gets UpdateError, as with cached_db,
+instead of putting it back in the cache. The queue lives in the process,
+so the cache must be shared by all worker processes (memcached, Redis) for
+them to see the latest data and each other's deletions; the
+accounts.E001 check refuses a per-process cache. A crashed process loses
+at most its last interval of session changes.
+
+Expired rows are removed by manage.py clean_sessions.
+"""
+import atexit
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.sessions.backends.base import UpdateError
+from django.contrib.sessions.backends.cached_db import SessionStore as CachedDBStore
+from django.db import connections, router, transaction
+
+logger = logging.getLogger(__name__)
+
+WRITE_BEHIND_SECONDS = getattr(settings, 'SESSION_WRITE_BEHIND_SECONDS', 5)
+# How long a deleted session key is remembered; longer than any request
+DELETED_SECONDS = getattr(settings, 'SESSION_DELETED_SECONDS', 3600)
+
+# session_key -> Session instance waiting to be written
+_pending = {}
+_pending_lock = threading.Lock()
+# Held while queued rows are written, so a delete cannot be overtaken by a
+# write of the same session that was queued before it
+_write_lock = threading.Lock()
+_writer = None
+
+
+def _start_writer():
+    global _writer
+    if _writer is not None and _writer.is_alive():
+        return
+    with _pending_lock:
+        if _writer is not None and _writer.is_alive():
+            return
+        _writer = threading.Thread(target=_write_loop, name='session-write-behind', daemon=True)
+        _writer.start()
+
+
+def _write_loop():
+    while True:
+        time.sleep(WRITE_BEHIND_SECONDS)
+        try:
+            flush()
+        except Exception:
+            logger.exception('Failed to write sessions')
+
+
+def flush():
+    """Write every queued session to the database; return how many."""
+    with _write_lock:
+        with _pending_lock:
+            sessions = list(_pending.values())
+            _pending.clear()
+        if not sessions:
+            return 0
+        model = SessionStore.get_model_class()
+        using = router.db_for_write(model)
+        try:
+            with transaction.atomic(using=using):
+                # Rows exist since creation; an UPDATE also keeps deleted
+                # sessions deleted
+                model.objects.using(using).bulk_update(
+                    sessions, ['session_data', 'expire_date'], batch_size=500
+                )
+        except Exception:
+            with _pending_lock:
+                for session in sessions:
+                    # Keep anything queued again in the meantime, it is newer
+                    _pending.setdefault(session.session_key, session)
+            raise
+        finally:
+            if threading.current_thread() is _writer:
+                connections[using].close()
+        return len(sessions)
+
+
+atexit.register(flush)
+
+
+class SessionStore(CachedDBStore):
+    cache_key_prefix = 'accounts.session_store'
+    deleted_key_prefix = 'accounts.session_store.deleted'
+
+    @classmethod
+    def deleted_key(cls, session_key):
+        return cls.deleted_key_prefix + session_key
+
+    def load(self):
+        if self.session_key is not None:
+            with _pending_lock:
+                queued = _pending.get(self.session_key)
+            if queued is not None and self.cache_key not in self._cache:
+                # Evicted from the cache before it reached the database
+                return self.decode(queued.session_data)
+        return super().load()
+
+    def save(self, must_create=False):
+        if must_create or self.session_key is None or WRITE_BEHIND_SECONDS <= 0:
+            return super().save(must_create)
+        data = self._get_session()
+        self._cache.set(self.cache_key, data, self.get_expiry_age())
+        with _pending_lock:
+            _pending[self.session_key] = self.create_model_instance(data)
+        # Checked after writing: a delete marks the key before removing the
+        # cached and queued copies, so either it removes ours or we see it
+        if self._cache.get(self.deleted_key(self.session_key)):
+            self._cache.delete(self.cache_key)
+            with _pending_lock:
+                _pending.pop(self.session_key, None)
+            raise UpdateError
+        _start_writer()
+
+    def delete(self, session_key=None):
+        session_key = session_key or self.session_key
+        if session_key is None:
+            return
+        self._cache.set(self.deleted_key(session_key), True, DELETED_SECONDS)
+        with _write_lock:
+            with _pending_lock:
+                _pending.pop(session_key, None)
+            super().delete(session_key)
+
+    @classmethod
+    def delete_many(cls, session_keys):
+        """Delete many sessions with one DELETE; return how many rows went."""
+        session_keys = list(session_keys)
+        store = cls()
+        store._cache.set_many({cls.deleted_key(key): True for key in session_keys}, DELETED_SECONDS)
+        with _write_lock:
+            with _pending_lock:
+                for key in session_keys:
+                    _pending.pop(key, None)
+            store._cache.delete_many([cls.cache_key_prefix + key for key in session_keys])
+            count, _ = cls.get_model_class().objects.filter(session_key__in=session_keys).delete()
+        return count
@@ -0,0 +1,80 @@
+"""Index of the sessions each user is logged in with.
+
+UserSession maps a user to the keys of their authenticated sessions. Rows
+are added on login and removed on logout by the handlers in
+accounts.signals, so "log out everywhere" (after an email or password
+change, or when a manager locks an account) deletes exactly the user's
+sessions instead of decoding every session in the store.
+"""
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.auth import update_session_auth_hash
+from django.contrib.sessions.backends.db import SessionStore as DatabaseSessionStore
+from django.contrib.sessions.models import Session
+
+from .models import UserSession
+
+
+def _store_class():
+    return import_module(settings.SESSION_ENGINE).SessionStore
+
+
+def _uses_session_table(store_class):
+    return issubclass(store_class, DatabaseSessionStore)
+
+
+def track(user, session_key):
+    if session_key:
+        UserSession.objects.update_or_create(session_key=session_key, defaults={'user': user})
+
+
+def untrack(session_key):
+    if session_key:
+        UserSession.objects.filter(session_key=session_key).delete()
+
+
+def logout_everywhere(user, keep=None):
+    """End all of user's sessions except the one keyed keep; return how many."""
+    index = UserSession.objects.filter(user=user)
+    if keep:
+        index = index.exclude(session_key=keep)
+    store_class = _store_class()
+    if hasattr(store_class, 'delete_many'):
+        # accounts.session_store: also drops cached and queued copies
+        count = store_class.delete_many(index.values_list('session_key', flat=True))
+    elif store_class is DatabaseSessionStore:
+        # One DELETE ... WHERE session_key IN (SELECT ...) on two indexes
+        count, _ = Session.objects.filter(session_key__in=index.values('session_key')).delete()
+    else:
+        keys = list(index.values_list('session_key', flat=True))
+        for key in keys:
+            store_class(key).delete(key)
+        count = len(keys)
+    index.delete()
+    return count
+
+
+def password_changed(request, user):
+    """Keep the current session logged in after a password change and end the rest."""
+    old_key = request.session.session_key
+    logout_everywhere(user, keep=old_key)
+    # Stores the new password hash and moves the session to a new key
+    update_session_auth_hash(request, user)
+    untrack(old_key)
+    track(user, request.session.session_key)
+
+
+def prune():
+    """Drop index rows whose session has expired or been deleted; return how many."""
+    store_class = _store_class()
+    if _uses_session_table(store_class):
+        stale = UserSession.objects.exclude(session_key__in=Session.objects.values('session_key'))
+        count, _ = stale.delete()
+        return count
+    count = 0
+    for key in UserSession.objects.values_list('session_key', flat=True).iterator():
+        if not store_class().exists(key):
+            untrack(key)
+            count += 1
+    return count
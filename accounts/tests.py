@@ -1,3 +1,91 @@
+from unittest import mock
+
+from django.contrib.sessions.backends.base import UpdateError
+from django.contrib.sessions.models import Session
+from django.core.cache import caches
 from django.test import TestCase
+from django.urls import reverse
+
+from . import session_store, throttle
+from .models import User
+from .session_store import SessionStore
+
+
+@mock.patch.object(session_store, '_start_writer')
+class WriteBehindSessionTests(TestCase):
+    def setUp(self):
+        session = SessionStore()
+        session['cart'] = 1
+        session.create()
+        self.key = session.session_key
+        self.addCleanup(session._cache.clear)
+        self.addCleanup(session_store._pending.clear)
+
+    def assertGone(self):
+        self.assertNotIn(self.key, session_store._pending)
+        self.assertNotIn(SessionStore.cache_key_prefix + self.key, SessionStore()._cache)
+        self.assertFalse(Session.objects.filter(session_key=self.key).exists())
+        self.assertEqual(SessionStore(self.key).load(), {})
+
+    def test_save_is_written_later(self, start_writer):
+        session = SessionStore(self.key)
+        session['cart'] = 2
+        session.save()
+        start_writer.assert_called_once()
+        self.assertEqual(SessionStore(self.key)['cart'], 2)
+        self.assertEqual(session_store.flush(), 1)
+        self.assertEqual(Session.objects.get(session_key=self.key).get_decoded()['cart'], 2)
+
+    def test_save_after_delete(self, start_writer):
+        session = SessionStore(self.key)
+        self.assertEqual(session['cart'], 1)
+        SessionStore.delete_many([self.key])
+        session['cart'] = 2
+        with self.assertRaises(UpdateError):
+            session.save()
+        self.assertGone()
+        self.assertEqual(session_store.flush(), 0)
+
+    def test_delete_during_save(self, start_writer):
+        session = SessionStore(self.key)
+        session['cart'] = 2
+        cache_set = session._cache.set
+
+        def set_then_delete(key, *args, **kwargs):
+            cache_set(key, *args, **kwargs)
+            if key == session.cache_key:
+                # Another request logs the user out right after this one cached the session
+                SessionStore.delete_many([self.key])
+
+        with mock.patch.object(session._cache, 'set', set_then_delete):
+            with self.assertRaises(UpdateError):
+                session.save()
+        self.assertGone()
+        start_writer.assert_not_called()
+
+
+class LoginThrottleTests(TestCase):
+    def setUp(self):
+        caches[throttle.CACHE_ALIAS].clear()
+        self.addCleanup(caches[throttle.CACHE_ALIAS].clear)
+
+    def test_bucket_empties_and_refills_on_reset(self):
+        bucket = throttle.TokenBucket('test', 3, 60)
+        self.assertEqual([bucket.take('a@example.com') for _ in range(3)], [0, 0, 0])
+        self.assertGreater(bucket.take('a@example.com'), 0)
+        self.assertEqual(bucket.take('b@example.com'), 0)
+        bucket.reset('a@example.com')
+        self.assertEqual(bucket.take('a@example.com'), 0)
 
-# Create your tests here.
+    def test_login_rejected_once_account_bucket_is_empty(self):
+        User.objects.create_user('shopper@example.com', 'Shopper', 'right-pass-1234')
+        attempts, _ = throttle.ACCOUNT_RATE
+        data = {'email': 'shopper@example.com', 'password': 'wrong-pass'}
+        for _ in range(attempts):
+            self.assertNotEqual(self.client.post(reverse('accounts:user_login'), data).status_code, 429)
+        response = self.client.post(
+            reverse('accounts:user_login'), dict(data, password='right-pass-1234')
+        )
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+        self.assertNotIn('_auth_user_id', self.client.session)
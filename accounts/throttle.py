@@ -0,0 +1,98 @@
+"""Login attempt throttling, checked before any user lookup or password hash.
+
+Every login attempt takes a token from two buckets: one for the client IP
+and one for the email address tried. A bucket holds `capacity` tokens and
+refills continuously at capacity per `window` seconds, so the limit is over
+a sliding window rather than fixed clock intervals. An attempt that finds
+either bucket empty is rejected at once with the seconds until a token is
+back, which costs a cache read instead of a PBKDF2 hash.
+
+A successful login refills the account bucket, so the owner's own typos do
+not pile up. Buckets live in the cache named LOGIN_THROTTLE_CACHE, which
+must be shared by all worker processes (the database, memcached, Redis) or
+each process keeps its own allowance; the accounts.W001 check warns about a
+per-process cache. A bucket is read and written under a lock taken with
+cache.add, which is atomic on the shared backends, so concurrent attempts
+from different processes cannot take the same token.
+"""
+import hashlib
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+
+CACHE_ALIAS = getattr(settings, 'LOGIN_THROTTLE_CACHE', 'default')
+# (attempts, seconds)
+IP_RATE = getattr(settings, 'LOGIN_THROTTLE_IP_RATE', (20, 300))
+ACCOUNT_RATE = getattr(settings, 'LOGIN_THROTTLE_ACCOUNT_RATE', (5, 300))
+# Request.META key holding the client address, e.g. HTTP_X_REAL_IP behind a proxy
+IP_HEADER = getattr(settings, 'LOGIN_THROTTLE_IP_HEADER', 'REMOTE_ADDR')
+
+# A lock left by a crashed process expires after this many seconds
+LOCK_SECONDS = 2
+
+
+@contextmanager
+def _locked(cache, key):
+    """Hold the cache lock for key; go ahead without it after LOCK_SECONDS."""
+    lock_key = f'{key}:lock'
+    deadline = time.monotonic() + LOCK_SECONDS
+    while not cache.add(lock_key, 1, LOCK_SECONDS):
+        if time.monotonic() > deadline:
+            break
+        time.sleep(0.01)
+    try:
+        yield
+    finally:
+        cache.delete(lock_key)
+
+
+class TokenBucket:
+    def __init__(self, name, capacity, window):
+        self.name = name
+        self.capacity = capacity
+        self.window = window
+        self.rate = capacity / window
+
+    def _key(self, ident):
+        digest = hashlib.sha256(ident.encode()).hexdigest()
+        return f'throttle:{self.name}:{digest}'
+
+    def take(self, ident):
+        """Take a token for ident; return 0 if allowed, else seconds to wait."""
+        cache = caches[CACHE_ALIAS]
+        key = self._key(ident)
+        with _locked(cache, key):
+            now = time.time()
+            tokens, stamp = cache.get(key, (self.capacity, now))
+            tokens = min(self.capacity, tokens + (now - stamp) * self.rate)
+            if tokens < 1:
+                return int((1 - tokens) / self.rate) + 1
+            # An untouched bucket is full again after one window
+            cache.set(key, (tokens - 1, now), self.window)
+        return 0
+
+    def reset(self, ident):
+        caches[CACHE_ALIAS].delete(self._key(ident))
+
+
+ip_bucket = TokenBucket('ip', *IP_RATE)
+account_bucket = TokenBucket('account', *ACCOUNT_RATE)
+
+
+def client_ip(request):
+    return request.META.get(IP_HEADER, '').split(',')[0].strip() or 'unknown'
+
+
+def check_ip(request):
+    """Return 0 if the client may try to log in, else seconds to wait."""
+    return ip_bucket.take(client_ip(request))
+
+
+def check_account(email):
+    return account_bucket.take(email.strip().lower())
+
+
+def login_succeeded(email):
+    account_bucket.reset(email.strip().lower())
@@ -2,7 +2,6 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
-from django.core.mail import send_mail
 from django.conf import settings
 from django.template.loader import render_to_string
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
@@ -13,8 +12,10 @@ from django.core.exceptions import ObjectDoesNotExist
 from django.utils import timezone
 
 from .forms import UserRegistrationForm, UserLoginForm, ManagerLoginForm, EditProfileForm, AddressForm
+from . import sessions, throttle
 from .tokens import email_change_token
 from accounts.models import User, Address, EmailChangeRequest
+from outbox.mail import queue_email
 
 
 def create_manager():
@@ -31,15 +32,30 @@ def create_manager():
         user.save()
 
 
+def _throttled(request, template, context, wait):
+    messages.error(
+        request, f'Too many login attempts. Please try again in {wait} seconds.', 'danger'
+    )
+    response = render(request, template, context, status=429)
+    response['Retry-After'] = str(wait)
+    return response
+
+
 def manager_login(request):
     if request.method == 'POST':
         form = ManagerLoginForm(request.POST)
+        wait = throttle.check_ip(request)
+        if not wait and form.is_valid():
+            wait = throttle.check_account(form.cleaned_data['email'])
+        if wait:
+            return _throttled(request, 'manager_login.html', {'form': ManagerLoginForm()}, wait)
         if form.is_valid():
             data = form.cleaned_data
             user = authenticate(
                 request, email=data['email'], password=data['password']
             )
             if user is not None and user.is_manager:
+                throttle.login_succeeded(data['email'])
                 login(request, user)
                 return redirect('dashboard:dashboard')
             else:
@@ -295,14 +311,7 @@ Follow us on social media for the latest updates and exclusive offers:
 </html>
             """
             
-            send_mail(
-                subject,
-                text_message,
-                settings.DEFAULT_FROM_EMAIL,
-                [user.email],
-                html_message=html_message,
-                fail_silently=False,
-            )
+            queue_email(subject, text_message, [user.email], html_body=html_message)
             
             messages.success(
                 request, 'Account created successfully. Welcome to ShopEase!', 'success'
@@ -318,6 +327,12 @@ Follow us on social media for the latest updates and exclusive offers:
 def user_login(request):
     if request.method == 'POST':
         form = UserLoginForm(request.POST)
+        # Before the user lookup and password hash, so floods cost little
+        wait = throttle.check_ip(request)
+        if not wait and form.is_valid():
+            wait = throttle.check_account(form.cleaned_data['email'])
+        if wait:
+            return _throttled(request, 'login.html', {'title': 'Login', 'form': UserLoginForm()}, wait)
         if form.is_valid():
             data = form.cleaned_data
             # Check if user with this email exists
@@ -328,6 +343,7 @@ def user_login(request):
                     request, email=data['email'], password=data['password']
                 )
                 if user is not None:
+                    throttle.login_succeeded(data['email'])
                     login(request, user)
                     # Redirect managers to dashboard, regular users to home page
                     if user.is_manager:
@@ -397,18 +413,11 @@ def send_email_verification(request, user, new_email):
         # HTML version
         html_message = render_to_string('email_verification.html', context)
         
-        # Send email
+        # Queue email; send_outbox delivers it
         subject = '📧 Verify Your New Email Address - ShopEase'
-        result = send_mail(
-            subject,
-            text_message,
-            settings.DEFAULT_FROM_EMAIL,
-            [new_email],
-            html_message=html_message,
-            fail_silently=False,
-        )
+        queue_email(subject, text_message, [new_email], html_body=html_message)
         
-        return result > 0
+        return True
         
     except Exception as e:
         messages.error(request, f'There was an error sending the verification email: {str(e)}. Please try again.')
@@ -452,12 +461,7 @@ def verify_email(request, uidb64, token):
         email_change_request.delete()
         
         # Log out all sessions for this user
-        from django.contrib.sessions.models import Session
-        sessions = Session.objects.all()
-        for session in sessions:
-            session_data = session.get_decoded()
-            if str(session_data.get('_auth_user_id')) == str(user.pk):
-                session.delete()
+        sessions.logout_everywhere(user)
         
         messages.success(request, f'Your email address has been successfully updated from {old_email} to {new_email}! Please log in with your new email address.', 'success')
         return redirect('accounts:user_login')
@@ -487,8 +491,9 @@ def edit_profile(request):
                 
                 # Check if password fields are filled
                 if old_password and new_password1 and new_password2:
-                    # Validate and save password
-                    form.save()
+                    # Validate and save password, then end the user's other sessions
+                    user = form.save()
+                    sessions.password_changed(request, user)
                     messages.success(request, 'Your password has been updated successfully', 'success')
                 else:
                     messages.error(request, 'Please fill in all password fields', 'danger')
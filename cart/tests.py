@@ -1,3 +1,34 @@
-from django.test import TestCase
+from django.contrib.sessions.backends.db import SessionStore
+from django.test import RequestFactory, TestCase
 
-# Create your tests here.
+from shop.models import Category, Product
+from .utils.cart import CART_SESSION_ID, Cart
+
+
+class CartTests(TestCase):
+    def setUp(self):
+        self.request = RequestFactory().get('/')
+        self.request.session = SessionStore()
+        category = Category.objects.create(title='Audio')
+        self.product = Product.objects.create(
+            category=category, image='products/item.jpg', title='Speaker', description='Speaker', price=100,
+        )
+
+    def test_price_is_kept_from_when_it_was_added(self):
+        cart = Cart(self.request)
+        cart.add(self.product, 2)
+        Product.objects.filter(pk=self.product.pk).update(price=150)
+        cart = Cart(self.request)
+        cart.add(self.product, 1)
+        self.assertEqual([(line.product, line.quantity, line.price) for line in cart], [(self.product, 3, 100)])
+        self.assertEqual(cart.get_total_price(), 300)
+
+    def test_old_session_format_is_upgraded(self):
+        self.request.session[CART_SESSION_ID] = {str(self.product.pk): {'quantity': '2', 'price': '90'}}
+        cart = Cart(self.request)
+        self.assertEqual(len(cart), 2)
+        self.assertEqual(self.request.session[CART_SESSION_ID], {str(self.product.pk): [2, 90]})
+
+    def test_reading_an_empty_cart_leaves_the_session_alone(self):
+        self.assertEqual(list(Cart(self.request)), [])
+        self.assertFalse(self.request.session.modified)
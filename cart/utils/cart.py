@@ -1,44 +1,93 @@
+from typing import Any, NamedTuple
+
 from shop.models import Product
 
 CART_SESSION_ID = 'cart'
 
+# Only the product fields the cart and checkout pages use
+PRODUCT_FIELDS = ('id', 'title', 'slug', 'image', 'price')
+
+
+class CartLine(NamedTuple):
+    """One immutable line of the cart, with the price snapshotted at add time."""
+    product: Any
+    quantity: int
+    price: int
+
+    @property
+    def total_price(self) -> int:
+        return self.price * self.quantity
+
 
 class Cart:
+    """Shopping cart stored in the session.
+
+    The session holds {product_id: [quantity, unit_price]} with plain ints,
+    so it stays small and needs no parsing on read. Products are loaded in
+    a single query the first time the lines are needed and reused for the
+    rest of the request.
+    """
+
     def __init__(self, request):
         self.session = request.session
         self.cart = self.add_cart_session()
+        self._lines = None
+        self._total_price = None
 
     def __iter__(self):
-        product_ids = self.cart.keys()
-        products = Product.objects.filter(id__in=product_ids)
-        cart = self.cart.copy()
-        for product in products:
-            cart[str(product.id)]['product'] = product
-        for item in cart.values():
-            item['total_price'] = int(item['price']) * int(item['quantity'])
-            yield item
+        return iter(self.lines)
 
     def __len__(self):
         """
         Return the total number of items in the cart.
         """
-        return sum(int(item['quantity']) for item in self.cart.values())
+        return sum(quantity for quantity, _ in self.cart.values())
+
+    @property
+    def lines(self):
+        if self._lines is None:
+            products = Product.objects.only(*PRODUCT_FIELDS).in_bulk(
+                [int(product_id) for product_id in self.cart]
+            )
+            self._lines = [
+                CartLine(products[int(product_id)], quantity, price)
+                for product_id, (quantity, price) in self.cart.items()
+                # Products deleted since they were added are left out
+                if int(product_id) in products
+            ]
+        return self._lines
 
     def add_cart_session(self):
+        # Reading the cart must not touch the session: an empty cart is only
+        # stored once something is added to it
         cart = self.session.get(CART_SESSION_ID)
         if not cart:
-            cart = self.session[CART_SESSION_ID] = {}
+            return {}
+        if any(isinstance(entry, dict) for entry in cart.values()):
+            cart = self._upgrade(cart)
+            self.session[CART_SESSION_ID] = cart
         return cart
 
+    @staticmethod
+    def _upgrade(cart):
+        """Convert carts saved in the old {'quantity', 'price'} format."""
+        upgraded = {}
+        for product_id, entry in cart.items():
+            if isinstance(entry, dict):
+                entry = [int(entry['quantity']), int(entry['price'])]
+            upgraded[product_id] = entry
+        return upgraded
+
     def add(self, product, quantity):
         product_id = str(product.id)
+        if CART_SESSION_ID not in self.session:
+            self.session[CART_SESSION_ID] = self.cart
 
-        if product_id not in self.cart:
-            self.cart[product_id] = {'quantity': 0, 'price': str(product.price)}
-
-        cart_item = self.cart.get(product_id)
-        if cart_item is not None:
-            cart_item['quantity'] += quantity
+        if product_id in self.cart:
+            current_quantity, price = self.cart[product_id]
+            self.cart[product_id] = [current_quantity + quantity, price]
+        else:
+            self.cart[product_id] = [quantity, int(product.price)]
         self.save()
 
     def remove(self, product):
@@ -49,10 +98,16 @@ class Cart:
 
     def save(self):
         self.session.modified = True
+        self._lines = None
+        self._total_price = None
 
     def get_total_price(self):
-        return sum(int(item['price']) * item['quantity'] for item in self.cart.values())
+        if self._total_price is None:
+            self._total_price = sum(line.total_price for line in self.lines)
+        return self._total_price
 
     def clear(self):
-        del self.session[CART_SESSION_ID]
-        self.save()
\ No newline at end of file
+        if CART_SESSION_ID in self.session:
+            del self.session[CART_SESSION_ID]
+            self.save()
+        self.cart = {}
@@ -11,6 +11,9 @@ from shop.models import Product
 def add_to_cart(request, product_id):
     cart = Cart(request)
     product = get_object_or_404(Product, id=product_id)
+    if not product.in_stock:
+        messages.error(request, 'Sorry, this product is out of stock.')
+        return redirect('shop:product_detail', slug=product.slug)
     form = QuantityForm(request.POST)
     if form.is_valid():
         data = form.cleaned_data
@@ -1,13 +1,14 @@
 from django import forms
 from django.forms import ModelForm
 
+from orders.models import Order
 from shop.models import Product, Category
 
 
 class AddProductForm(ModelForm):
     class Meta:
         model = Product
-        fields = ['category', 'image', 'title','description', 'price']
+        fields = ['category', 'image', 'title','description', 'price', 'stock_on_hand']
 
     def __init__(self, *args, **kwargs):
         super(AddProductForm, self).__init__(*args, **kwargs)
@@ -31,9 +32,51 @@ class AddCategoryForm(ModelForm):
 class EditProductForm(ModelForm):
     class Meta:
         model = Product
-        fields = ['category', 'image', 'title','description', 'price']
+        fields = ['category', 'image', 'title','description', 'price', 'stock_on_hand']
 
     def __init__(self, *args, **kwargs):
         super(EditProductForm, self).__init__(*args, **kwargs)
         for visible in self.visible_fields():
-            visible.field.widget.attrs['class'] = 'form-control'
\ No newline at end of file
+            visible.field.widget.attrs['class'] = 'form-control'
+
+class ProductCSVForm(forms.Form):
+    file = forms.FileField(help_text='Columns: id, and any of price, title, category (slug or id)')
+    dry_run = forms.BooleanField(required=False, initial=True, label='Dry run (only show the changes)')
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['file'].widget.attrs.update({'class': 'form-control', 'accept': '.csv,text/csv'})
+        self.fields['dry_run'].widget.attrs['class'] = 'form-check-input'
+
+
+class InvoiceExportForm(forms.Form):
+    status = forms.ChoiceField(choices=[('', 'Any status')] + Order.STATUS_CHOICES, required=False)
+    payment_method = forms.ChoiceField(
+        choices=[('', 'Any payment')] + Order.PAYMENT_METHOD_CHOICES, required=False
+    )
+    date_from = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+    date_to = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+    user = forms.EmailField(required=False, widget=forms.EmailInput(attrs={'placeholder': 'Customer email'}))
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for visible in self.visible_fields():
+            visible.field.widget.attrs['class'] = 'form-control form-control-sm'
+
+    def clean(self):
+        cleaned_data = super().clean()
+        date_from, date_to = cleaned_data.get('date_from'), cleaned_data.get('date_to')
+        if date_from and date_to and date_from > date_to:
+            raise forms.ValidationError('The start date must be before the end date')
+        return cleaned_data
+
+
+class OrderFilterForm(InvoiceExportForm):
+    SORT_CHOICES = [
+        ('-created', 'Newest first'),
+        ('created', 'Oldest first'),
+        ('-subtotal', 'Highest total'),
+        ('subtotal', 'Lowest total'),
+        ('status', 'Status'),
+    ]
+    sort = forms.ChoiceField(choices=SORT_CHOICES, required=False)
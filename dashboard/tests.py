@@ -1,3 +1,40 @@
+from django.contrib.messages import get_messages
 from django.test import TestCase
+from django.urls import reverse
 
-# Create your tests here.
+from accounts.models import User
+from orders.models import Order
+
+
+class BulkStatusTests(TestCase):
+    def setUp(self):
+        manager = User.objects.create_user('manager@example.com', 'Manager', 'manager-pass-1234')
+        manager.is_manager = True
+        manager.save()
+        self.client.force_login(manager)
+        customer = User.objects.create_user('customer@example.com', 'Customer', 'customer-pass-1234')
+        self.pending = Order.objects.create(user=customer)
+        self.delivered = Order.objects.create(user=customer, status=Order.DELIVERED)
+
+    def bulk(self, query, **data):
+        response = self.client.post(
+            reverse('dashboard:orders') + query, dict({'bulk_status': '1', 'status': Order.SHIPPED}, **data)
+        )
+        return [str(message) for message in get_messages(response.wsgi_request)]
+
+    def statuses(self):
+        return dict(Order.objects.values_list('pk', 'status'))
+
+    def test_filtered_scope_moves_the_orders_that_can_move(self):
+        messages = self.bulk('?user=customer@example.com', scope='filtered')
+        self.assertEqual(messages, ['1 order updated to Shipped'])
+        self.assertEqual(self.statuses(), {self.pending.pk: Order.SHIPPED, self.delivered.pk: Order.DELIVERED})
+
+    def test_invalid_filters_update_nothing_and_say_why(self):
+        messages = self.bulk('?date_from=yesterday', scope='filtered')
+        self.assertEqual(messages, ['No orders updated, the filters are invalid. Date from: Enter a valid date.'])
+        self.assertEqual(self.statuses(), {self.pending.pk: Order.PENDING, self.delivered.pk: Order.DELIVERED})
+
+    def test_ticked_orders(self):
+        self.bulk('', scope='selected', order_ids=[self.pending.pk])
+        self.assertEqual(Order.objects.get(pk=self.pending.pk).status, Order.SHIPPED)
@@ -7,9 +7,12 @@ app_name = 'dashboard'
 urlpatterns = [
     path('', views.dashboard, name='dashboard'),
     path('products/', views.products, name='products'),
+    path('products/bulk-update/', views.bulk_update_products, name='bulk_update_products'),
     path('products/delete/<int:id>/', views.delete_product, name='delete_product'),
     path('products/edit/<int:id>/', views.edit_product, name='edit_product'),
     path('orders/', views.orders, name='orders'),
+    path('orders/export-invoices/', views.export_invoices, name='export_invoices'),
+    path('orders/export-invoices/<int:job_id>/', views.invoice_export, name='invoice_export'),
     path('orders/detail/<int:id>/', views.order_detail, name='order_detail'),
     path('add-product/', views.add_product, name='add_product'),
     path('add-category/', views.add_category, name='add_category'),
@@ -1,13 +1,29 @@
+import csv
+import uuid
+
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.decorators import user_passes_test
-from django.http import Http404
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.http import FileResponse, Http404
+from django.template.defaultfilters import pluralize
 
+from shop import bulk_edit
 from shop.models import Product
 from accounts.models import User
+from jobs.models import Job
+from jobs.queue import enqueue
+from orders import export, metrics
 from orders.models import Order, OrderItem
-from .forms import AddProductForm, AddCategoryForm, EditProductForm
+from orders.services import transition_orders
+from .forms import AddProductForm, AddCategoryForm, EditProductForm, InvoiceExportForm, OrderFilterForm, ProductCSVForm
+
+# Seconds the product and user counts on the dashboard may lag behind
+COUNT_TIMEOUT = 60
+ORDERS_PER_PAGE = 50
+PRODUCTS_PER_PAGE = 50
 
 
 def is_manager(user):
@@ -19,38 +35,61 @@ def is_manager(user):
         return False
 
 
+def form_errors(form):
+    """One line listing the form's errors by field label."""
+    parts = []
+    for name, field_errors in form.errors.items():
+        field = form.fields.get(name)
+        label = (field.label or name.replace('_', ' ').capitalize()) if field else 'Filters'
+        parts.append(f"{label}: {' '.join(field_errors)}")
+    return '; '.join(parts)
+
+
+def update_status(request, orders, new_status):
+    """Move the orders that allow it to new_status and report the outcome."""
+    if new_status not in dict(Order.STATUS_CHOICES):
+        messages.error(request, 'Invalid status')
+        return 0
+    label = dict(Order.STATUS_CHOICES)[new_status]
+    try:
+        moved = transition_orders(orders, new_status, request.build_absolute_uri('/')[:-1])
+    except Exception as e:
+        print(f"Failed to update order status: {e}")
+        messages.error(request, 'Error updating order status')
+        return 0
+    if moved:
+        messages.success(request, f'{moved} order{pluralize(moved)} updated to {label}')
+    else:
+        messages.error(request, f'No selected order can be moved to {label}')
+    return moved
+
+
 @user_passes_test(is_manager)
 @login_required
 def dashboard(request):
     # Handle status update
     if request.method == 'POST' and 'update_status' in request.POST:
-        order_id = request.POST.get('order_id')
-        new_status = request.POST.get('status')
-        try:
-            order = Order.objects.get(id=order_id)
-            if new_status in dict(Order.STATUS_CHOICES):
-                order.status = new_status
-                order.save()
-                messages.success(request, f'Order #{order.id} status updated to {order.get_status_display()}')
-            else:
-                messages.error(request, 'Invalid status')
-        except Exception as e:
-            messages.error(request, 'Error updating order status')
+        update_status(request, Order.objects.filter(id=request.POST.get('order_id')), request.POST.get('status'))
         return redirect('dashboard:dashboard')
     
-    # Get dashboard statistics
-    total_products = Product.objects.count()
-    total_orders = Order.objects.count()
-    total_users = User.objects.count()
+    # Order and revenue tiles come from the daily rollup; the two plain
+    # counts are cached briefly instead of counted on every load
+    sales = metrics.summary()
+    total_products = cache.get_or_set('dashboard-total-products', Product.objects.count, COUNT_TIMEOUT)
+    total_users = cache.get_or_set('dashboard-total-users', User.objects.count, COUNT_TIMEOUT)
     
     # Get recent orders
-    recent_orders = Order.objects.all().order_by('-created')[:5]
+    recent_orders = Order.objects.select_related('user').order_by('-created')[:5]
     
     context = {
         'title': 'Dashboard',
         'total_products': total_products,
-        'total_orders': total_orders,
+        'total_orders': sales['total_orders'],
         'total_users': total_users,
+        'sales': sales,
+        'status_counts': [
+            (label, sales['by_status'].get(value, 0)) for value, label in Order.STATUS_CHOICES
+        ],
         'recent_orders': recent_orders
     }
     return render(request, 'dashboard.html', context)
@@ -72,11 +111,33 @@ def products(request):
             messages.error(request, 'Error updating price')
         return redirect('dashboard:products')
     
-    products = Product.objects.all()
+    products = Paginator(Product.objects.select_related('category'), PRODUCTS_PER_PAGE).get_page(request.GET.get('page'))
     context = {'title':'Products' ,'products':products}
     return render(request, 'products.html', context)
 
 
+@user_passes_test(is_manager)
+@login_required
+def bulk_update_products(request):
+    report = None
+    if request.method == 'POST':
+        form = ProductCSVForm(request.POST, request.FILES)
+        if form.is_valid():
+            try:
+                report = bulk_edit.update_products(form.cleaned_data['file'], dry_run=form.cleaned_data['dry_run'])
+            except (bulk_edit.BulkEditError, UnicodeDecodeError, csv.Error) as e:
+                messages.error(request, f'Could not read the file: {e}')
+            else:
+                if report.applied:
+                    messages.success(request, f'{report.changed} products updated')
+                elif report.errors:
+                    messages.error(request, f'Nothing was saved: {len(report.errors)} rows are invalid')
+    else:
+        form = ProductCSVForm()
+    context = {'title': 'Bulk Update Products', 'form': form, 'report': report}
+    return render(request, 'bulk_update_products.html', context)
+
+
 @user_passes_test(is_manager)
 @login_required
 def add_product(request):
@@ -136,25 +197,90 @@ def add_category(request):
 def orders(request):
     # Handle status update
     if request.method == 'POST' and 'update_status' in request.POST:
-        order_id = request.POST.get('order_id')
-        new_status = request.POST.get('status')
-        try:
-            order = Order.objects.get(id=order_id)
-            if new_status in dict(Order.STATUS_CHOICES):
-                order.status = new_status
-                order.save()
-                messages.success(request, f'Order #{order.id} status updated to {order.get_status_display()}')
+        update_status(request, Order.objects.filter(id=request.POST.get('order_id')), request.POST.get('status'))
+        # Back to the same filtered page
+        return redirect(request.get_full_path())
+
+    form = OrderFilterForm(request.GET)
+    filters = {}
+    sort = '-created'
+    if form.is_valid():
+        filters = {name: value for name, value in form.cleaned_data.items() if name != 'sort'}
+        sort = form.cleaned_data['sort'] or sort
+    else:
+        errors = form_errors(form)
+
+    # Bulk status change for the ticked orders or everything the filters match
+    if request.method == 'POST' and 'bulk_status' in request.POST:
+        if request.POST.get('scope') == 'filtered':
+            if form.is_valid():
+                update_status(request, Order.objects.matching(**filters), request.POST.get('status'))
             else:
-                messages.error(request, 'Invalid status')
-        except Exception as e:
-            messages.error(request, 'Error updating order status')
-        return redirect('dashboard:orders')
-    
-    orders = Order.objects.all()
-    context = {'title':'Orders', 'orders':orders}
+                # Never fall back to some other set of orders
+                messages.error(request, f'No orders updated, the filters are invalid. {errors}')
+        else:
+            order_ids = [value for value in request.POST.getlist('order_ids') if value.isdigit()]
+            if order_ids:
+                update_status(request, Order.objects.filter(pk__in=order_ids), request.POST.get('status'))
+            else:
+                messages.error(request, 'No orders selected')
+        return redirect(request.get_full_path())
+
+    if not form.is_valid():
+        messages.error(request, f'Invalid filters. {errors}')
+
+    # One query per page: users joined in, item counts summed by the database
+    orders = (
+        Order.objects.matching(**filters)
+        .select_related('user')
+        .with_item_counts()
+        .order_by(sort, '-id')
+    )
+    page = Paginator(orders, ORDERS_PER_PAGE).get_page(request.GET.get('page'))
+
+    query = request.GET.copy()
+    query.pop('page', None)
+    context = {
+        'title': 'Orders', 'orders': page, 'form': form,
+        'query': query.urlencode(), 'statuses': Order.STATUS_CHOICES,
+    }
     return render(request, 'orders.html', context)
 
 
+@user_passes_test(is_manager)
+@login_required
+def export_invoices(request):
+    form = InvoiceExportForm(request.GET)
+    if not form.is_valid():
+        messages.error(request, 'Invalid export filters')
+        return redirect('dashboard:orders')
+
+    order_ids = list(export.filter_orders(**form.cleaned_data).values_list('id', flat=True))
+    if not order_ids:
+        messages.error(request, 'No orders match these filters')
+        return redirect('dashboard:orders')
+
+    # Rendered by the job worker; the status page offers the file when it is ready
+    job = enqueue('orders.export_invoices', max_attempts=2, order_ids=order_ids, token=uuid.uuid4().hex)
+    return redirect('dashboard:invoice_export', job_id=job.pk)
+
+
+@user_passes_test(is_manager)
+@login_required
+def invoice_export(request, job_id):
+    job = get_object_or_404(Job, pk=job_id, name='orders.export_invoices')
+    path = export.export_path(job.payload['token'])
+    ready = job.status == Job.DONE and path.exists()
+    if ready and 'download' in request.GET:
+        return FileResponse(open(path, 'rb'), as_attachment=True, filename='invoices.zip')
+    context = {
+        'title': 'Invoice export', 'job': job, 'ready': ready,
+        'count': len(job.payload['order_ids']),
+        'waiting': job.status in (Job.PENDING, Job.RUNNING),
+    }
+    return render(request, 'invoice_export.html', context)
+
+
 @user_passes_test(is_manager)
 @login_required
 def order_detail(request, id):
@@ -163,12 +289,8 @@ def order_detail(request, id):
     
     # Handle status update
     if request.method == 'POST':
-        new_status = request.POST.get('status')
-        if new_status in dict(Order.STATUS_CHOICES):
-            order.status = new_status
-            order.save()
-            messages.success(request, f'Order status updated to {order.get_status_display()}')
-            return redirect('dashboard:order_detail', id=order.id)
+        update_status(request, Order.objects.filter(id=id), request.POST.get('status'))
+        return redirect('dashboard:order_detail', id=id)
     
     context = {'title':'Order Detail', 'items':items, 'order':order}
     return render(request, 'order_detail.html', context)
@@ -0,0 +1,33 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from jobs.queue import claim, requeue_stale, run
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs (order emails, invoices, ...)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=4, help='Jobs run in parallel')
+        parser.add_argument('--poll-interval', type=float, default=2.0,
+                            help='Seconds to sleep when the queue is empty')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit once no due jobs are left instead of polling')
+
+    def handle(self, *args, **options):
+        concurrency = options['concurrency']
+        requeue_stale()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            while True:
+                jobs = claim(concurrency)
+                if not jobs:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    requeue_stale()
+                    continue
+                for job, succeeded in zip(jobs, pool.map(run, jobs)):
+                    status = 'done' if succeeded else 'failed'
+                    self.stdout.write(f'{job.name} #{job.id}: {status} (attempt {job.attempts})')
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.11 on 2026-10-17 07:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='claimed_by',
+            field=models.CharField(blank=True, max_length=32),
+        ),
+    ]
@@ -0,0 +1,49 @@
+from django.db import models
+from django.utils import timezone
+
+
+class QueuedItem(models.Model):
+    """A row of a database queue: a job here, or a message in the email outbox.
+
+    jobs.queue claims, retries and requeues any subclass the same way.
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    DEAD = 'dead'
+
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (DEAD, 'Dead'),
+    ]
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    # Counted when the item is claimed, so a worker dying mid-run uses up an attempt
+    attempts = models.PositiveSmallIntegerField(default=0)  # type: ignore
+    max_attempts = models.PositiveSmallIntegerField(default=5)  # type: ignore
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    # Token of the claim that is running the item
+    claimed_by = models.CharField(max_length=32, blank=True)
+    last_error = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        abstract = True
+        ordering = ('run_at', 'id')
+
+
+class Job(QueuedItem):
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+
+    class Meta(QueuedItem.Meta):
+        indexes = [
+            models.Index(fields=['status', 'run_at'], name='job_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.id} ({self.status})"
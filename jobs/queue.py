@@ -0,0 +1,129 @@
+"""Database-backed job queue.
+
+Jobs are rows in the jobs_job table, so enqueueing inside a transaction
+makes the job visible to workers only if that transaction commits. Workers
+(``manage.py run_jobs``) claim due jobs with a conditional UPDATE, retry
+failures with exponential backoff and move jobs that keep failing to the
+DEAD state, where they stay for inspection in the admin.
+
+claim(), requeue_stale(), failed(), release() and finish() work on any
+QueuedItem model; the email outbox uses them for its messages.
+
+Handlers are registered by name in each app's tasks.py::
+
+    @register('orders.send_order_confirmation')
+    def send_order_confirmation(order_id):
+        ...
+"""
+import traceback
+import uuid
+from datetime import timedelta
+
+from django.db import close_old_connections
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+# Seconds before the first retry; doubled for every further attempt
+RETRY_BACKOFF = 30
+# A job left RUNNING this long is assumed to belong to a dead worker
+STALE_AFTER = timedelta(minutes=30)
+
+_handlers = {}
+
+
+def register(name):
+    def decorator(func):
+        _handlers[name] = func
+        return func
+    return decorator
+
+
+def enqueue(name, max_attempts=5, run_at=None, **payload):
+    if name not in _handlers:
+        raise KeyError(f'No job handler registered as {name!r}')
+    return Job.objects.create(
+        name=name, payload=payload, max_attempts=max_attempts,
+        run_at=run_at or timezone.now(),
+    )
+
+
+def enqueue_many(name, payloads, max_attempts=5):
+    if name not in _handlers:
+        raise KeyError(f'No job handler registered as {name!r}')
+    now = timezone.now()
+    return Job.objects.bulk_create([
+        Job(name=name, payload=payload, max_attempts=max_attempts, run_at=now)
+        for payload in payloads
+    ])
+
+
+def requeue_stale(model=Job):
+    """Hand items stuck in RUNNING by a crashed worker back to the queue."""
+    return model.objects.filter(
+        status=model.RUNNING, locked_at__lt=timezone.now() - STALE_AFTER
+    ).update(status=model.PENDING, locked_at=None, claimed_by='', updated=timezone.now())
+
+
+def claim(limit, model=Job):
+    """Atomically take up to limit due items, oldest first, and return them."""
+    now = timezone.now()
+    token = uuid.uuid4().hex
+    due = list(model.objects.filter(status=model.PENDING, run_at__lte=now).values_list('id', flat=True)[:limit])
+    if not due:
+        return []
+    # The status condition keeps two workers from claiming the same row
+    model.objects.filter(pk__in=due, status=model.PENDING).update(
+        status=model.RUNNING, locked_at=now, claimed_by=token, attempts=F('attempts') + 1, updated=now
+    )
+    return list(model.objects.filter(claimed_by=token, status=model.RUNNING))
+
+
+def failed(item, error, permanent=False):
+    """Record a failed attempt of a claimed item: retry it with backoff, or give up."""
+    model = type(item)
+    now = timezone.now()
+    if permanent or item.attempts >= item.max_attempts:
+        model.objects.filter(pk=item.pk).update(
+            status=model.DEAD, last_error=error, locked_at=None, claimed_by='', updated=now
+        )
+    else:
+        delay = timedelta(seconds=RETRY_BACKOFF * 2 ** (item.attempts - 1))
+        model.objects.filter(pk=item.pk).update(
+            status=model.PENDING, last_error=error, locked_at=None, claimed_by='',
+            run_at=now + delay, updated=now
+        )
+
+
+def release(items):
+    """Put claimed items back untouched, without counting the attempt."""
+    if items:
+        model = type(items[0])
+        model.objects.filter(pk__in=[item.pk for item in items]).update(
+            status=model.PENDING, locked_at=None, claimed_by='',
+            attempts=F('attempts') - 1, updated=timezone.now()
+        )
+
+
+def finish(model, pks, **fields):
+    """Mark claimed items done, setting any extra fields."""
+    return model.objects.filter(pk__in=pks).update(
+        status=model.DONE, locked_at=None, claimed_by='', updated=timezone.now(), **fields
+    )
+
+
+def run(job):
+    """Run one claimed job and record the outcome; return True on success."""
+    close_old_connections()
+    try:
+        handler = _handlers[job.name]
+        handler(**job.payload)
+    except Exception:
+        failed(job, traceback.format_exc())
+        return False
+    else:
+        finish(Job, [job.pk])
+        return True
+    finally:
+        close_old_connections()
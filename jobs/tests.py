@@ -0,0 +1,46 @@
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+
+from . import queue
+from .models import Job
+
+calls = []
+
+
+@queue.register('jobs.tests.flaky')
+def flaky(fail):
+    calls.append(fail)
+    if fail:
+        raise RuntimeError('Temporary failure')
+
+
+# run() closes old connections around a job, which would end the test transaction
+@mock.patch.object(queue, 'close_old_connections')
+class QueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_job_runs_once(self, close):
+        job = queue.enqueue('jobs.tests.flaky', fail=False)
+        claimed = queue.claim(10)
+        self.assertEqual([item.pk for item in claimed], [job.pk])
+        self.assertEqual(queue.claim(10), [])
+        self.assertTrue(queue.run(claimed[0]))
+        self.assertEqual(Job.objects.get().status, Job.DONE)
+        self.assertEqual(calls, [False])
+
+    def test_failures_back_off_then_give_up(self, close):
+        job = queue.enqueue('jobs.tests.flaky', max_attempts=2, fail=True)
+        self.assertFalse(queue.run(queue.claim(10)[0]))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.PENDING, 1))
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertIn('Temporary failure', job.last_error)
+
+        Job.objects.update(run_at=timezone.now())
+        self.assertFalse(queue.run(queue.claim(10)[0]))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.DEAD, 2))
+        self.assertEqual(queue.claim(10), [])
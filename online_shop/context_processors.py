@@ -1,8 +1,13 @@
 from cart.utils.cart import Cart
-from shop.models import Category
+from shop.navigation import get_navigation
 from django.conf import settings
 
 def return_cart(request):
+    # The cart count is only shown to logged-in users, whose session is
+    # already loaded by the auth middleware. Skip the session entirely for
+    # anonymous visitors so browsing the catalog never creates one.
+    if not request.user.is_authenticated:
+        return {'cart_count': 0}
     cart = Cart(request)
     try:
         cart_count = len(cart)
@@ -13,8 +18,7 @@ def return_cart(request):
 
 
 def return_categories(request):
-    categories = Category.objects.all()
-    return {'categories': categories}
+    return {'categories': get_navigation()}
 
 
 def media_processor(request):
@@ -34,6 +34,8 @@ INSTALLED_APPS = [
     'shop.apps.ShopConfig',
     'dashboard.apps.DashboardConfig',
     'security_scanner.apps.SecurityScannerConfig',
+    'jobs.apps.JobsConfig',
+    'outbox.apps.OutboxConfig',
 ]
 
 MIDDLEWARE = [
@@ -84,6 +86,32 @@ DATABASES = {
 
 AUTH_USER_MODEL = 'accounts.User'
 
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Shared by all worker processes; create the table with
+    # manage.py createcachetable
+    'throttle': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'throttle_cache',
+    },
+}
+
+# Sessions are kept in the database; manage.py clean_sessions purges expired
+# ones. accounts.session_store serves them from a cache and writes them in
+# the background instead: to use it, add a cache shared by all worker
+# processes (memcached, Redis), point SESSION_CACHE_ALIAS at it and set
+# SESSION_ENGINE = 'accounts.session_store'.
+SESSION_WRITE_BEHIND_SECONDS = 5
+
+# Login attempts allowed per client IP and per email address, as
+# (attempts, seconds); see accounts.throttle. The cache must be shared by
+# all worker processes
+LOGIN_THROTTLE_CACHE = 'throttle'
+LOGIN_THROTTLE_IP_RATE = (20, 300)
+LOGIN_THROTTLE_ACCOUNT_RATE = (5, 300)
+
 # Password validation
 # https://docs.djangoproject.com/en/4.0/ref/settings/#auth-password-validators
 
@@ -128,6 +156,15 @@ STATIC_ROOT = BASE_DIR / "staticfiles"
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 MEDIA_URL = '/media/'
 
+# Generated invoice PDFs, reused until the order changes
+INVOICE_CACHE_DIR = BASE_DIR / 'invoice_cache'
+INVOICE_CACHE_MAX_BYTES = 100 * 1024 * 1024
+# Processes used to render bulk invoice exports; None means one per CPU core
+INVOICE_EXPORT_WORKERS = None
+# ZIP files of exports started from the dashboard, kept for a day
+INVOICE_EXPORT_DIR = BASE_DIR / 'invoice_exports'
+INVOICE_EXPORT_KEEP_SECONDS = 24 * 60 * 60
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.0/ref/settings/#default-auto-field
 
@@ -141,7 +178,13 @@ LOGIN_URL = 'accounts:user_login'
 
 
 # Email configuration
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+# Set EMAIL_BACKEND=django.core.mail.backends.filebased.EmailBackend (or the
+# console backend) in the environment to write mail locally instead of sending it
+EMAIL_BACKEND = os.environ.get('EMAIL_BACKEND', 'django.core.mail.backends.smtp.EmailBackend')
+EMAIL_FILE_PATH = BASE_DIR / 'sent_emails'
+# Outbox delivery (manage.py send_outbox): messages per second and per SMTP session
+OUTBOX_RATE_LIMIT = 10
+OUTBOX_MESSAGES_PER_CONNECTION = 100
 EMAIL_HOST = 'smtp.gmail.com'
 EMAIL_PORT = 587
 EMAIL_USE_TLS = True
@@ -0,0 +1,140 @@
+"""Bulk invoice export.
+
+Invoices are rendered by a pool of worker processes, one per CPU core by
+default. Each worker renders into the invoice cache and sends back only the
+file path, so the parent copies finished PDFs from disk into the ZIP one at
+a time and never holds more than one of them in memory. Invoices already
+in the cache are not rendered again.
+
+The pool is for the export_invoices command. Exports asked for from the
+dashboard run as an orders.export_invoices job (see orders.tasks) that
+writes the ZIP into EXPORT_DIR in the job worker, without a pool; the
+dashboard serves the file once the job is done.
+"""
+import os
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.apps import apps
+from django.conf import settings
+from django.db import connections
+
+from . import invoice_cache
+from .invoices import get_renderer
+from .models import Order
+
+WORKERS = getattr(settings, 'INVOICE_EXPORT_WORKERS', None) or os.cpu_count() or 1
+# Orders handed to a worker at a time; large enough to keep IPC overhead low
+CHUNK_SIZE = 8
+EXPORT_DIR = Path(getattr(settings, 'INVOICE_EXPORT_DIR', settings.BASE_DIR / 'invoice_exports'))
+# Finished dashboard exports are deleted after this many seconds
+EXPORT_KEEP_SECONDS = getattr(settings, 'INVOICE_EXPORT_KEEP_SECONDS', 24 * 60 * 60)
+
+
+def filter_orders(status=None, date_from=None, date_to=None, user=None, payment_method=None):
+    """Orders to export; user may be a User or an email address."""
+    return Order.objects.matching(
+        status=status, payment_method=payment_method, date_from=date_from, date_to=date_to, user=user
+    ).order_by('id')
+
+
+def render_to_cache(order_id):
+    """Make sure an order's invoice is in the cache and return its path."""
+    order = Order.objects.select_related('user', 'delivery_address').get(pk=order_id)
+    path, _, _ = invoice_cache.get_or_render(
+        order, lambda order: get_renderer().render(order.user, order)
+    )
+    return order_id, str(path)
+
+
+def _init_worker():
+    # Workers started with spawn (macOS, Windows) import nothing by default;
+    # forked workers must not share the parent's database connections
+    if not apps.ready:
+        django.setup()
+    connections.close_all()
+
+
+def rendered_invoices(order_ids, workers=WORKERS):
+    """Yield (order_id, path) for each order, in order_ids order."""
+    order_ids = list(order_ids)
+    if workers <= 1 or len(order_ids) <= 1:
+        for order_id in order_ids:
+            yield render_to_cache(order_id)
+        return
+
+    # Connections must not be inherited by forked children
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        try:
+            yield from pool.map(render_to_cache, order_ids, chunksize=CHUNK_SIZE)
+        except GeneratorExit:
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+
+
+def write_zip(order_ids, fileobj, workers=WORKERS, progress=None):
+    """Write the invoices of order_ids into a ZIP archive on fileobj.
+
+    fileobj does not need to be seekable. PDFs are already compressed, so
+    they are stored as-is. progress(done, total) is called after each file.
+    Returns the number of invoices written.
+    """
+    order_ids = list(order_ids)
+    count = 0
+    with zipfile.ZipFile(fileobj, 'w', zipfile.ZIP_STORED) as archive:
+        for order_id, path in rendered_invoices(order_ids, workers):
+            _add(archive, order_id, path)
+            count += 1
+            if progress:
+                progress(count, len(order_ids))
+    return count
+
+
+def _add(archive, order_id, path):
+    try:
+        archive.write(path, f'invoice-{order_id}.pdf')
+    except FileNotFoundError:
+        # Evicted by the cache size limit before it could be copied
+        _, path = render_to_cache(order_id)
+        archive.write(path, f'invoice-{order_id}.pdf')
+
+
+def export_path(token):
+    return EXPORT_DIR / f'invoices-{token}.zip'
+
+
+def export_to_file(order_ids, token, workers=1):
+    """Write the ZIP of a dashboard export to export_path(token) and return the path.
+
+    The file only appears once it is complete.
+    """
+    EXPORT_DIR.mkdir(parents=True, exist_ok=True)
+    remove_old_exports()
+    fd, partial = tempfile.mkstemp(dir=EXPORT_DIR, suffix='.part')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write_zip(order_ids, f, workers)
+        os.replace(partial, export_path(token))
+    except BaseException:
+        os.unlink(partial)
+        raise
+    return export_path(token)
+
+
+def remove_old_exports(max_age=EXPORT_KEEP_SECONDS):
+    """Delete dashboard exports older than max_age seconds; return how many went."""
+    cutoff = time.time() - max_age
+    removed = 0
+    for path in EXPORT_DIR.glob('invoices-*.zip'):
+        try:
+            if path.stat().st_mtime < cutoff:
+                path.unlink()
+                removed += 1
+        except FileNotFoundError:
+            pass
+    return removed
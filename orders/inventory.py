@@ -0,0 +1,190 @@
+"""Stock reservation for checkouts.
+
+Every stock change is a single conditional UPDATE with F() expressions, so
+concurrent checkouts never read-modify-write a product row and cannot
+oversell: the database only applies a reservation while enough unreserved
+stock remains. Products with no stock_on_hand are not tracked and always
+succeed.
+
+Lifecycle: place_order reserves stock for a new order (ACTIVE), payment
+commits it (COMMITTED, stock leaves stock_on_hand), and cancelling or
+expiry releases it (RELEASED, stock goes back to being available).
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Q, Value, When
+from django.utils import timezone
+
+from shop.models import Product
+from .models import StockReservation
+
+RESERVATION_MINUTES = getattr(settings, 'STOCK_RESERVATION_MINUTES', 15)
+
+
+class OutOfStock(Exception):
+    def __init__(self, product):
+        self.product = product
+        super().__init__(f'Not enough stock for {product}')
+
+
+def reserve(product_id, quantity):
+    """Hold quantity units of a product; return False if not enough are free."""
+    return bool(
+        Product.objects.filter(pk=product_id)
+        .filter(Q(stock_on_hand__isnull=True) | Q(stock_on_hand__gte=F('stock_reserved') + quantity))
+        .update(stock_reserved=F('stock_reserved') + quantity)
+    )
+
+
+def unreserve(product_id, quantity):
+    Product.objects.filter(pk=product_id).update(stock_reserved=F('stock_reserved') - quantity)
+
+
+class _Short(Exception):
+    pass
+
+
+def _covered(quantities):
+    """Filter for the products whose free stock covers {product id: quantity}."""
+    quantity = Case(
+        *[When(pk=product_id, then=Value(amount)) for product_id, amount in quantities.items()],
+        output_field=IntegerField(),
+    )
+    return quantity, Q(stock_on_hand__isnull=True) | Q(stock_on_hand__gte=F('stock_reserved') + quantity)
+
+
+@transaction.atomic
+def _reserve_all(order, quantities, products, expires_at):
+    """Reserve {product id: quantity} in one UPDATE and record the reservations.
+
+    Raises _Short, rolling back the reservations taken, when a product
+    cannot cover its quantity.
+    """
+    quantity, covered = _covered(quantities)
+    reserved = Product.objects.filter(covered, pk__in=quantities).update(
+        stock_reserved=F('stock_reserved') + quantity
+    )
+    if reserved < len(quantities):
+        raise _Short
+    StockReservation.objects.bulk_create([
+        StockReservation(order=order, product=products[product_id], quantity=amount, expires_at=expires_at)
+        for product_id, amount in quantities.items()
+    ])
+
+
+def _short_product(quantities, products):
+    """The first product whose free stock does not cover its quantity."""
+    _, covered = _covered(quantities)
+    free = set(Product.objects.filter(covered, pk__in=quantities).values_list('pk', flat=True))
+    missing = [pk for pk in sorted(quantities) if pk not in free] or sorted(quantities)
+    return products[missing[0]]
+
+
+def reserve_stock(order, lines):
+    """Reserve stock for every cart line of a new order, or none of them.
+
+    One conditional UPDATE covers all the products. Raises OutOfStock
+    (rolling back the surrounding transaction) when a product cannot cover
+    its lines.
+    """
+    quantities, products = {}, {}
+    for line in lines:
+        quantities[line.product.pk] = quantities.get(line.product.pk, 0) + line.quantity
+        products[line.product.pk] = line.product
+    expires_at = timezone.now() + timedelta(minutes=RESERVATION_MINUTES)
+    try:
+        _reserve_all(order, quantities, products, expires_at)
+    except _Short:
+        # Stale holds from abandoned checkouts may be what is in the way
+        if not release_expired_reservations(product_ids=list(quantities)):
+            raise OutOfStock(_short_product(quantities, products))
+        try:
+            _reserve_all(order, quantities, products, expires_at)
+        except _Short:
+            raise OutOfStock(_short_product(quantities, products))
+
+
+@transaction.atomic
+def commit_stock(order):
+    """Turn an order's reservations into stock leaving the warehouse.
+
+    Reservations that expired before payment are re-acquired on the spot,
+    so payment still fails cleanly with OutOfStock if the units were sold
+    in the meantime.
+    """
+    for reservation in order.reservations.order_by('product_id'):
+        if reservation.status == StockReservation.COMMITTED:
+            continue
+        claimed = StockReservation.objects.filter(
+            pk=reservation.pk, status=StockReservation.ACTIVE
+        ).update(status=StockReservation.COMMITTED)
+        stock = Product.objects.filter(pk=reservation.product_id)
+        if claimed:
+            updated = stock.update(
+                stock_on_hand=F('stock_on_hand') - reservation.quantity,
+                stock_reserved=F('stock_reserved') - reservation.quantity,
+            )
+        else:
+            # Already released: take the units straight from free stock
+            updated = stock.filter(
+                Q(stock_on_hand__isnull=True) |
+                Q(stock_on_hand__gte=F('stock_reserved') + reservation.quantity)
+            ).update(stock_on_hand=F('stock_on_hand') - reservation.quantity)
+            StockReservation.objects.filter(pk=reservation.pk).update(status=StockReservation.COMMITTED)
+        if not updated:
+            raise OutOfStock(reservation.product)
+
+
+@transaction.atomic
+def release_stock(order):
+    """Give back everything an order holds, e.g. when it is cancelled."""
+    release_orders([order.pk])
+
+
+@transaction.atomic
+def release_orders(order_ids):
+    """Give back everything a set of orders holds, one UPDATE per product."""
+    reservations = (
+        StockReservation.objects.filter(order_id__in=order_ids)
+        .exclude(status=StockReservation.RELEASED)
+        .values_list('id', 'status', 'product_id', 'quantity')
+    )
+    unreserved, restocked = {}, {}
+    for reservation_id, status, product_id, quantity in reservations:
+        released = StockReservation.objects.filter(
+            pk=reservation_id, status=status
+        ).update(status=StockReservation.RELEASED)
+        if not released:
+            continue
+        totals = unreserved if status == StockReservation.ACTIVE else restocked
+        totals[product_id] = totals.get(product_id, 0) + quantity
+    # Update rows in a fixed order so concurrent releases cannot deadlock
+    for product_id in sorted(unreserved):
+        unreserve(product_id, unreserved[product_id])
+    for product_id in sorted(restocked):
+        Product.objects.filter(pk=product_id).update(
+            stock_on_hand=F('stock_on_hand') + restocked[product_id]
+        )
+
+
+def release_expired_reservations(product_ids=None):
+    """Release active reservations past their expiry; return how many."""
+    expired = StockReservation.objects.filter(
+        status=StockReservation.ACTIVE, expires_at__lte=timezone.now()
+    )
+    if product_ids is not None:
+        expired = expired.filter(product_id__in=product_ids)
+
+    count = 0
+    for reservation in expired.only('id', 'product_id', 'quantity').iterator():
+        with transaction.atomic():
+            # The status check makes each release happen exactly once even
+            # if payment or another cleanup run races with this one
+            if StockReservation.objects.filter(
+                pk=reservation.pk, status=StockReservation.ACTIVE
+            ).update(status=StockReservation.RELEASED):
+                unreserve(reservation.product_id, reservation.quantity)
+                count += 1
+    return count
@@ -0,0 +1,168 @@
+"""On-disk cache of generated invoice PDFs.
+
+Each file is named after the order and a digest of everything printed on
+the invoice (order totals, payment method, customer, delivery address and
+items), so any change to the order produces a new name and the old file is
+simply never asked for again. The digest doubles as the ETag.
+
+The directory is kept under INVOICE_CACHE_MAX_BYTES by deleting the least
+recently served files after each write. Hits and misses are counted in the
+Django cache; see the invoice_cache management command.
+"""
+import hashlib
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+
+CACHE_DIR = Path(getattr(settings, 'INVOICE_CACHE_DIR', settings.BASE_DIR / 'invoice_cache'))
+MAX_BYTES = getattr(settings, 'INVOICE_CACHE_MAX_BYTES', 100 * 1024 * 1024)
+# Bump when the invoice layout changes so every cached PDF is re-rendered
+LAYOUT_VERSION = 1
+
+HITS_KEY = 'invoice-cache-hits'
+MISSES_KEY = 'invoice-cache-misses'
+
+
+def content_version(order):
+    """Digest of the order data the invoice shows.
+
+    Costs one query for the items; load the order with
+    select_related('user', 'delivery_address') to avoid two more.
+    """
+    address = order.delivery_address
+    parts = [
+        LAYOUT_VERSION, order.pk, order.created.isoformat(), order.payment_method,
+        order.subtotal, order.gst, order.total,
+        order.user.full_name, order.user.email,
+    ]
+    if address is not None:
+        parts += [
+            address.full_name, address.phone_number, address.street_address,
+            address.city, address.state, address.postal_code, address.country,
+        ]
+    parts += order.items.order_by('id').values_list('product_id', 'product__title', 'quantity', 'price')
+    return hashlib.sha256(repr(parts).encode()).hexdigest()[:32]
+
+
+def path_for(order_id, version):
+    return CACHE_DIR / f'{order_id}-{version}.pdf'
+
+
+def lookup(order_id, version):
+    """Return the cached file path for this order version, or None."""
+    path = path_for(order_id, version)
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        _count(MISSES_KEY)
+        return None
+    # Record the access for eviction; mtime stays the Last-Modified time
+    os.utime(path, (time.time(), stat.st_mtime))
+    _count(HITS_KEY)
+    return path
+
+
+def store(order_id, version, pdf_bytes):
+    """Write a rendered invoice into the cache and return its path."""
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    path = path_for(order_id, version)
+    # Write then rename, so concurrent readers never see a partial file
+    fd, tmp = tempfile.mkstemp(dir=CACHE_DIR, suffix='.tmp')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(pdf_bytes)
+    os.replace(tmp, path)
+
+    for stale in CACHE_DIR.glob(f'{order_id}-*.pdf'):
+        if stale != path:
+            stale.unlink(missing_ok=True)
+    evict()
+    return path
+
+
+def get_or_render(order, render):
+    """Return (path, version, hit) for order's invoice.
+
+    render(order) must return a buffer holding the PDF; it is only called on
+    a miss.
+    """
+    version = content_version(order)
+    path = lookup(order.pk, version)
+    if path is not None:
+        return path, version, True
+    return store(order.pk, version, render(order).getvalue()), version, False
+
+
+def discard(order_id):
+    """Remove every cached invoice of an order."""
+    for path in CACHE_DIR.glob(f'{order_id}-*.pdf'):
+        path.unlink(missing_ok=True)
+
+
+def _entries():
+    try:
+        with os.scandir(CACHE_DIR) as it:
+            return [entry for entry in it if entry.name.endswith('.pdf')]
+    except FileNotFoundError:
+        return []
+
+
+def evict(max_bytes=None):
+    """Delete least recently served invoices until the cache fits.
+
+    Trims to 90% of the limit so the next few writes do not each have to
+    delete something. Returns the number of files removed.
+    """
+    max_bytes = MAX_BYTES if max_bytes is None else max_bytes
+    files = []
+    size = 0
+    for entry in _entries():
+        try:
+            stat = entry.stat()
+        except FileNotFoundError:
+            continue
+        files.append((stat.st_atime, stat.st_size, entry.path))
+        size += stat.st_size
+    if size <= max_bytes:
+        return 0
+
+    target = max_bytes * 9 // 10
+    removed = 0
+    for _, file_size, file_path in sorted(files):
+        if size <= target:
+            break
+        try:
+            os.unlink(file_path)
+        except FileNotFoundError:
+            pass
+        size -= file_size
+        removed += 1
+    return removed
+
+
+def clear():
+    for entry in _entries():
+        os.unlink(entry.path)
+    cache.delete_many([HITS_KEY, MISSES_KEY])
+
+
+def _count(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, None):
+            cache.incr(key)
+
+
+def stats():
+    files = _entries()
+    return {
+        'hits': cache.get(HITS_KEY, 0),
+        'misses': cache.get(MISSES_KEY, 0),
+        'files': len(files),
+        'bytes': sum(os.path.getsize(entry.path) for entry in files if os.path.exists(entry.path)),
+        'max_bytes': MAX_BYTES,
+    }
@@ -0,0 +1,379 @@
+"""Invoice PDF rendering.
+
+InvoiceRenderer builds the paragraph and table styles and decodes the logo
+once; after that each invoice only lays out its own content. Use
+get_renderer() for the instance shared by the current process. Rendering
+does not mutate the renderer, so the instance can be shared by threads.
+"""
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from io import BytesIO
+
+from django.conf import settings
+from reportlab import rl_config
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.utils import ImageReader
+from reportlab.platypus import Flowable, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+LOGO_PATH = os.path.join(settings.BASE_DIR, 'static', 'media', 'shopping_bags.png')
+LOGO_SIZE = 30
+
+PAYMENT_LABELS = {
+    'cod': 'Cash on Delivery',
+    'paypal': 'PayPal',
+    'upi': 'UPI',
+}
+
+# Rows per items table; long orders are split into several tables
+ITEMS_PER_TABLE = 40
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_renderer = None
+# Invoice builds running now; see _binary_streams()
+_building_lock = threading.Lock()
+_building = 0
+_saved_a85 = None
+
+
+@contextmanager
+def _binary_streams():
+    """Have ReportLab write PDF streams as binary instead of ASCII85 text.
+
+    ReportLab encodes ASCII85 in pure Python, which was the single largest
+    cost of a short invoice (mostly re-encoding the logo), and the files
+    get smaller too. The switch is a process-wide setting, so it is only
+    turned off while invoices are being built and restored by the last
+    build to finish.
+    """
+    global _building, _saved_a85
+    with _building_lock:
+        if not _building:
+            _saved_a85 = rl_config.useA85
+            rl_config.useA85 = 0
+        _building += 1
+    try:
+        yield
+    finally:
+        with _building_lock:
+            _building -= 1
+            if not _building:
+                rl_config.useA85 = _saved_a85
+
+
+class Logo(Flowable):
+    """Draws an already decoded image, so it is not read from disk per invoice."""
+
+    def __init__(self, reader, width, height):
+        super().__init__()
+        self.reader = reader
+        self.width = width
+        self.height = height
+        self.hAlign = 'LEFT'
+
+    def wrap(self, available_width, available_height):
+        return self.width, self.height
+
+    def draw(self):
+        self.canv.drawImage(self.reader, 0, 0, self.width, self.height, mask='auto')
+
+
+class InvoiceRenderer:
+
+    def __init__(self, logo_path=LOGO_PATH):
+        self.logo = self._load_logo(logo_path)
+        self._build_styles()
+
+    @staticmethod
+    def _load_logo(path):
+        try:
+            reader = ImageReader(path)
+            # Decode now; the pixel data is cached on the reader
+            reader.getRGBData()
+            return reader
+        except Exception as e:
+            logger.warning('Invoice logo unavailable: %s', e)
+            return None
+
+    def _build_styles(self):
+        styles = getSampleStyleSheet()
+        self.sample_styles = styles
+
+        # Custom styles - using only basic fonts to avoid encoding issues
+        self.title_style = ParagraphStyle(
+            'InvoiceTitle', parent=styles['Heading1'], fontSize=24,
+            textColor=colors.HexColor('#1779ba'), alignment=1, spaceAfter=10, fontName='Helvetica-Bold'
+        )
+        self.subtitle_style = ParagraphStyle(
+            'InvoiceSubtitle', parent=styles['Normal'], fontSize=12,
+            textColor=colors.HexColor('#9b9b9b'), alignment=1, spaceAfter=20, fontName='Helvetica'
+        )
+        self.company_style = ParagraphStyle(
+            'CompanyStyle', parent=styles['Normal'], fontSize=18,
+            textColor=colors.HexColor('#1779ba'), alignment=0, spaceAfter=5, fontName='Helvetica-Bold'
+        )
+        self.company_subtitle_style = ParagraphStyle(
+            'CompanySubtitle', parent=styles['Normal'], fontSize=10,
+            textColor=colors.HexColor('#666666'), alignment=0, spaceAfter=20, fontName='Helvetica'
+        )
+        self.heading_style = ParagraphStyle(
+            'CustomHeading', parent=styles['Heading2'], fontSize=14,
+            textColor=colors.HexColor('#1779ba'), spaceAfter=10, fontName='Helvetica-Bold'
+        )
+        self.subheading_style = ParagraphStyle(
+            'SubHeading', parent=styles['Normal'], fontSize=9,
+            textColor=colors.HexColor('#666666'), spaceAfter=4, fontName='Helvetica-Bold'
+        )
+        self.normal_style = ParagraphStyle(
+            'CustomNormal', parent=styles['Normal'], fontSize=9, spaceAfter=4, fontName='Helvetica'
+        )
+        self.bold_style = ParagraphStyle('BoldText', parent=self.normal_style, fontName='Helvetica-Bold')
+        self.right_align_style = ParagraphStyle('RightAlign', parent=self.normal_style, alignment=2)
+        self.center_align_style = ParagraphStyle('CenterAlign', parent=self.normal_style, alignment=1)
+        self.footer_style = ParagraphStyle(
+            'FooterStyle', parent=styles['Normal'], fontSize=8,
+            textColor=colors.HexColor('#9b9b9b'), alignment=1
+        )
+
+        self.logo_table_style = TableStyle([
+            ('ALIGN', (0, 0), (0, -1), 'LEFT'),
+            ('ALIGN', (1, 0), (1, -1), 'CENTER'),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ])
+        self.company_table_style = TableStyle([
+            ('ALIGN', (0, 0), (0, -1), 'LEFT'),
+            ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 0),
+            ('TOPPADDING', (0, 0), (-1, -1), 0),
+        ])
+        self.intro_table_style = TableStyle([
+            ('ALIGN', (0, 0), (0, -1), 'LEFT'),
+            ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ])
+        self.items_table_style = TableStyle([
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('ALIGN', (2, 0), (2, -1), 'CENTER'),
+            ('ALIGN', (3, 0), (3, -1), 'RIGHT'),
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 8),
+            ('LINEBELOW', (0, 0), (-1, 0), 1, colors.HexColor('#c8c3be')),
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#eeeeee')),
+        ])
+        self.items_body_style = TableStyle([
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('ALIGN', (2, 0), (2, -1), 'CENTER'),
+            ('ALIGN', (3, 0), (3, -1), 'RIGHT'),
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+            ('FONTSIZE', (0, 0), (-1, -1), 8),
+        ])
+        self.totals_table_style = TableStyle([
+            ('ALIGN', (1, 0), (1, -1), 'LEFT'),
+            ('ALIGN', (2, 0), (2, -1), 'RIGHT'),
+            ('FONTNAME', (1, 3), (2, 3), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 9),
+            ('LINEABOVE', (1, 2), (2, 2), 1, colors.HexColor('#1779ba')),
+            ('LINEBELOW', (1, 2), (2, 2), 1, colors.HexColor('#1779ba')),
+            ('LINEABOVE', (1, 3), (2, 3), 1, colors.black),
+            ('LINEBELOW', (1, 3), (2, 3), 1, colors.black),
+            ('LINEWIDTH', (1, 3), (2, 3), 2),
+        ])
+        self.basic_table_style = TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 14),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black)
+        ])
+
+    @staticmethod
+    def _items(order):
+        return order.items.select_related('product').only(
+            'quantity', 'price', 'product__id', 'product__title'
+        )
+
+    @staticmethod
+    def _build(elements, **doc_options):
+        buffer = BytesIO()
+        doc = SimpleDocTemplate(buffer, pagesize=letter, **doc_options)
+        with _binary_streams():
+            doc.build(elements)
+        buffer.seek(0)
+        return buffer
+
+    def render(self, user, order):
+        """Return a buffer holding the full, branded invoice for order."""
+        elements = []
+
+        # Header with logo
+        if self.logo is not None:
+            header_table = Table([
+                [Logo(self.logo, LOGO_SIZE, LOGO_SIZE), Paragraph("ShopEase Invoice", self.title_style)],
+                ['', Paragraph("Professional E-commerce Invoice", self.subtitle_style)]
+            ], colWidths=[40, 460])
+            header_table.setStyle(self.logo_table_style)
+            elements.append(header_table)
+        else:
+            elements.append(Paragraph("🛍️ ShopEase Invoice", self.title_style))
+            elements.append(Paragraph("Professional E-commerce Invoice", self.subtitle_style))
+        elements.append(Spacer(1, 8))
+
+        # Company Info and Invoice Header
+        company_table = Table([
+            [Paragraph("ShopEase", self.company_style), Paragraph("INVOICE", self.title_style)],
+            [Paragraph("Simple. Fast. Delightful.", self.company_subtitle_style), Paragraph("", self.normal_style)]
+        ], colWidths=[300, 200])
+        company_table.setStyle(self.company_table_style)
+        elements.append(company_table)
+        elements.append(Spacer(1, 12))
+
+        # Customer Greeting and Invoice Info
+        customer_name = user.full_name or user.email
+        customer_info = Paragraph(f"<b>Hello, {customer_name}!</b><br/>Thank you for choosing ShopEase. We're delighted to serve you and hope you love your purchase!", self.normal_style)
+        order_info = Paragraph(f"<b>Order #{order.id}</b><br/>{order.created.strftime('%B %d, %Y')}", self.right_align_style)
+        intro_table = Table([[customer_info, order_info]], colWidths=[300, 200])
+        intro_table.setStyle(self.intro_table_style)
+        elements.append(intro_table)
+        elements.append(Spacer(1, 25))
+
+        # Items table
+        elements.append(Paragraph("Order Items", self.heading_style))
+        # Flowables keep layout state, so only styles are shared between invoices
+        rows = [[
+            Paragraph("Item Description", self.subheading_style),
+            Paragraph("Item ID", self.subheading_style),
+            Paragraph("Quantity", self.subheading_style),
+            Paragraph("Subtotal", self.subheading_style),
+        ]]
+        for item in self._items(order):
+            rows.append([
+                Paragraph(item.product.title, self.normal_style),
+                Paragraph(f"SE-{item.product.id}", self.normal_style),
+                Paragraph(str(item.quantity), self.center_align_style),
+                Paragraph(f"Rs. {item.get_cost()}", self.right_align_style)
+            ])
+        # Splitting one long table across pages re-measures every remaining
+        # row per page, so long orders are laid out as a stack of short tables
+        for start in range(0, len(rows), ITEMS_PER_TABLE):
+            items_table = Table(rows[start:start + ITEMS_PER_TABLE], colWidths=[250, 80, 80, 90])
+            items_table.setStyle(self.items_table_style if start == 0 else self.items_body_style)
+            elements.append(items_table)
+        elements.append(Spacer(1, 20))
+
+        # Totals
+        totals_table = Table([
+            ['', Paragraph("Subtotal", self.bold_style), Paragraph(f"Rs. {order.subtotal}", self.right_align_style)],
+            ['', Paragraph("Shipping & Handling", self.bold_style), Paragraph("Rs. 0.00", self.right_align_style)],
+            ['', Paragraph("GST (18%)", self.bold_style), Paragraph(f"Rs. {order.gst:.2f}", self.right_align_style)],
+            ['', Paragraph("Total", self.bold_style), Paragraph(f"Rs. {order.total:.2f}", self.right_align_style)]
+        ], colWidths=[350, 100, 100])
+        totals_table.setStyle(self.totals_table_style)
+        elements.append(totals_table)
+        elements.append(Spacer(1, 30))
+
+        elements.append(Paragraph("Additional Information", self.heading_style))
+        elements.append(Spacer(1, 10))
+
+        # Billing Information: the delivery address if available, otherwise default user info
+        address = order.delivery_address
+        if address:
+            billing_name = address.full_name
+            billing_phone = address.phone_number
+            billing_address = f"{address.street_address} {address.city}, {address.state} {address.postal_code} {address.country}"
+        else:
+            billing_name = user.full_name or user.email
+            billing_phone = "+91 89712 78930"
+            billing_address = "123 Shopping Street Retail City, 560032 India"
+        elements.append(Paragraph("Billing Information", self.subheading_style))
+        elements.append(Paragraph(billing_name, self.normal_style))
+        elements.append(Paragraph(billing_phone, self.normal_style))
+        elements.append(Paragraph(billing_address, self.normal_style))
+        elements.append(Spacer(1, 15))
+
+        # Payment Information
+        payment_method = PAYMENT_LABELS.get(order.payment_method, "Credit/Debit Card")
+        prefix = 'COD' if order.payment_method == 'cod' else 'TXN'
+        transaction_id = f"{prefix}-SE-{order.id}{order.created.strftime('%Y%m%d')}"
+        payment_status = "Unpaid (COD)" if order.payment_method == 'cod' else "Paid"
+        elements.append(Paragraph("Payment Information", self.subheading_style))
+        elements.append(Paragraph(f"Method: {payment_method}", self.normal_style))
+        elements.append(Paragraph(f"Transaction ID: {transaction_id}", self.normal_style))
+        elements.append(Paragraph(f"Amount: Rs. {order.total:.2f}", self.normal_style))
+        elements.append(Paragraph(f"Status: {payment_status}", self.normal_style))
+        elements.append(Spacer(1, 30))
+
+        # Footer
+        elements.append(Paragraph("ShopEase E-commerce Platform support@shopease.com +91 89712 78930", self.footer_style))
+        elements.append(Paragraph("123 Shopping Street, Retail City, 560032, India", self.footer_style))
+        elements.append(Spacer(1, 10))
+        elements.append(Paragraph("Thank you for your business!", self.center_align_style))
+
+        return self._build(elements, topMargin=30, bottomMargin=30)
+
+    def render_basic(self, user, order):
+        """Return a buffer holding the plain fallback invoice for order."""
+        styles = self.sample_styles
+        elements = [
+            Paragraph("ShopEase Invoice", styles['Title']),
+            Spacer(1, 12),
+            Paragraph(f"Invoice #SE-{order.id}", styles['Heading2']),
+            Paragraph(f"Order Date: {order.created.strftime('%B %d, %Y')}", styles['Normal']),
+            Spacer(1, 12),
+            Paragraph("Billing To:", styles['Heading3']),
+            Paragraph(f"{user.full_name or user.email}", styles['Normal']),
+            Paragraph(f"{user.email}", styles['Normal']),
+            Paragraph("+91 89712 78930", styles['Normal']),
+            Paragraph("123 Shopping Street, Retail City, 560032", styles['Normal']),
+            Spacer(1, 12),
+        ]
+
+        data = [['Item', 'SKU', 'Qty', 'Unit Price', 'Total']]
+        for item in self._items(order):
+            data.append([
+                item.product.title,
+                f"SE-{item.product.id}",
+                str(item.quantity),
+                f"₹{item.price}",
+                f"₹{item.get_cost()}"
+            ])
+        data.append(['', '', '', 'Subtotal', f"₹{order.subtotal}"])
+        data.append(['', '', '', 'GST (18%)', f"₹{order.gst:.2f}"])
+        data.append(['', '', '', 'Total', f"₹{order.total:.2f}"])
+        table = Table(data)
+        table.setStyle(self.basic_table_style)
+        elements.append(table)
+        elements.append(Spacer(1, 12))
+
+        elements.append(Paragraph("Notes:", styles['Heading3']))
+        elements.append(Paragraph("Thank you for shopping with ShopEase! If you have questions about this invoice, please contact support@shopease.com or call +91 89712 78930.", styles['Normal']))
+        return self._build(elements)
+
+    def render_error(self, order_id, error):
+        """Return a buffer holding a one-page PDF explaining a failed invoice."""
+        styles = self.sample_styles
+        return self._build([
+            Paragraph("Invoice Download Error", styles['Title']),
+            Spacer(1, 12),
+            Paragraph(f"Could not generate invoice for order {order_id}", styles['Normal']),
+            Paragraph(f"Error: {error}", styles['Normal']),
+        ])
+
+
+def get_renderer():
+    """Return this process's InvoiceRenderer, creating it on first use."""
+    global _renderer
+    if _renderer is None:
+        with _lock:
+            if _renderer is None:
+                _renderer = InvoiceRenderer()
+    return _renderer
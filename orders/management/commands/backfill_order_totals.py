@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from orders.models import Order
+
+
+class Command(BaseCommand):
+    help = 'Recompute the stored subtotal, GST and total of orders from their items'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Number of orders written per bulk update'
+        )
+        parser.add_argument(
+            '--stale-only', action='store_true',
+            help='Only rewrite orders whose stored subtotal is out of date'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if options['stale_only']:
+            orders = Order.objects.with_stale_totals()
+        else:
+            orders = Order.objects.with_computed_subtotal()
+        orders = orders.only('id', 'subtotal', 'gst', 'total').order_by('id')
+
+        batch = []
+        updated = 0
+        for order in orders.iterator(chunk_size=batch_size):
+            order.set_totals(order.computed_subtotal)
+            batch.append(order)
+            if len(batch) >= batch_size:
+                updated += Order.objects.bulk_update(batch, ['subtotal', 'gst', 'total'])
+                batch = []
+        if batch:
+            updated += Order.objects.bulk_update(batch, ['subtotal', 'gst', 'total'])
+
+        self.stdout.write(self.style.SUCCESS(f'Updated totals for {updated} orders'))
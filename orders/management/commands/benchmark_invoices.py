@@ -0,0 +1,87 @@
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from accounts.models import Address, User
+from orders.invoices import InvoiceRenderer, get_renderer
+from orders.models import Order, OrderItem
+from shop.models import Category, Product
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Time invoice rendering for orders of different sizes; all benchmark data is rolled back'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=10)
+        parser.add_argument('--sizes', type=int, nargs='+', default=[1, 50, 500])
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                orders = self.setup(options['sizes'])
+                # Building the shared renderer is a one-off cost per process
+                started = time.perf_counter()
+                get_renderer()
+                self.stdout.write(f'renderer setup: {(time.perf_counter() - started) * 1000:.1f}ms')
+
+                for order in orders:
+                    strategies = (
+                        ('per-call', lambda: InvoiceRenderer()),
+                        ('shared', get_renderer),
+                    )
+                    for label, renderer in strategies:
+                        self.run(label, renderer, order, options['iterations'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def setup(self, sizes):
+        user = User.objects.create_user('benchmark@example.com', 'Benchmark', 'unused-pass-1234')
+        address = Address.objects.create(
+            user=user, title='Home', full_name='Benchmark', street_address='1 Street',
+            city='City', state='State', postal_code='000000', phone_number='0000000000',
+        )
+        category = Category.objects.create(title='Benchmark category')
+        products = Product.objects.bulk_create([
+            Product(category=category, image='products/benchmark.jpg', title=f'Benchmark product {i}',
+                    description='benchmark', price=100 + i, slug=f'benchmark-{i}')
+            for i in range(max(sizes))
+        ])
+
+        orders = []
+        for size in sizes:
+            order = Order(user=user, delivery_address=address)
+            order.set_totals(sum(product.price * 2 for product in products[:size]))
+            order.save()
+            OrderItem.objects.bulk_create([
+                OrderItem(order=order, product=product, price=product.price, quantity=2)
+                for product in products[:size]
+            ])
+            orders.append(Order.objects.select_related('user', 'delivery_address').get(pk=order.pk))
+        return orders
+
+    def run(self, label, renderer, order, iterations):
+        item_count = order.items.count()
+
+        started = time.perf_counter()
+        for _ in range(iterations):
+            pdf = renderer().render(order.user, order)
+        elapsed = time.perf_counter() - started
+
+        # Measured in a separate pass, tracemalloc slows rendering down
+        tracemalloc.start()
+        renderer().render(order.user, order)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        self.stdout.write(
+            f'{item_count:>4} items {label:>8}: {iterations / elapsed:7.1f} invoices/s, '
+            f'{elapsed / iterations * 1000:7.1f}ms each, peak {peak / 1024 / 1024:.1f} MB, '
+            f'{len(pdf.getvalue()) / 1024:.0f} KB'
+        )
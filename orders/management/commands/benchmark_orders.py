@@ -0,0 +1,87 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import TestCase
+
+from accounts.models import Address, User
+from cart.utils.cart import CartLine
+from orders.models import Order, OrderItem
+from orders.services import place_order
+from shop.models import Category, Product
+
+
+class Rollback(Exception):
+    pass
+
+
+class QueryCounter:
+    """Execute wrapper counting statements; unlike the debug query log it has no cap."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def place_order_per_row(user, lines):
+    """The previous create_order flow, kept here as the baseline."""
+    order = Order.objects.create(user=user)
+    for line in lines:
+        OrderItem.objects.create(
+            order=order, product=line.product, price=line.price, quantity=line.quantity
+        )
+    default_address = user.addresses.filter(is_default=True).first()
+    if default_address:
+        order.delivery_address = default_address
+        order.save()
+    return order
+
+
+class Command(BaseCommand):
+    help = 'Time placing N orders of M items; all benchmark data is rolled back'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=200)
+        parser.add_argument('--items', type=int, default=10)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                lines = self.setup(options['items'])
+                for label, strategy in (('per-row', place_order_per_row), ('bulk', place_order)):
+                    self.run(label, strategy, lines, options['orders'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def setup(self, item_count):
+        self.user = User.objects.create_user('benchmark@example.com', 'Benchmark', 'unused-pass-1234')
+        Address.objects.create(
+            user=self.user, title='Home', full_name='Benchmark', street_address='1 Street',
+            city='City', state='State', postal_code='000000', phone_number='0000000000',
+        )
+        category = Category.objects.create(title='Benchmark category')
+        products = Product.objects.bulk_create([
+            Product(category=category, image='products/benchmark.jpg', title=f'Benchmark {i}',
+                    description='benchmark', price=100 + i, slug=f'benchmark-{i}')
+            for i in range(item_count)
+        ])
+        return [CartLine(product, 2, product.price) for product in products]
+
+    def run(self, label, strategy, lines, order_count):
+        queries = QueryCounter()
+        with connection.execute_wrapper(queries):
+            started = time.perf_counter()
+            for _ in range(order_count):
+                # Runs the on_commit work too, which the outer rollback would skip
+                with TestCase.captureOnCommitCallbacks(execute=True):
+                    with transaction.atomic():
+                        strategy(self.user, lines)
+            elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f'{label:>8}: {order_count} orders x {len(lines)} items in {elapsed:.3f}s '
+            f'({order_count / elapsed:.0f} orders/s, {queries.count / order_count:.1f} queries/order)'
+        )
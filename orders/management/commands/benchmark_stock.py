@@ -0,0 +1,111 @@
+import os
+import tempfile
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connection, connections
+from django.test.utils import setup_databases, teardown_databases
+
+from orders.inventory import reserve
+from shop.models import Category, Product
+
+
+class Command(BaseCommand):
+    help = ('Hammer one product with concurrent stock reservations from many threads '
+            'and check that none oversell')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=16)
+        parser.add_argument('--attempts', type=int, default=100, help='Reservations tried per thread')
+        parser.add_argument('--stock', type=int, default=500)
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('This benchmark targets SQLite')
+        # Everything happens on a throwaway test database, so neither the WAL
+        # journal mode nor the benchmark rows reach the real one
+        test_settings = connection.settings_dict['TEST']
+        temporary = None
+        if not test_settings.get('NAME'):
+            # Threads cannot share an in-memory test database
+            temporary = tempfile.mkdtemp(prefix='stock-benchmark-')
+            test_settings['NAME'] = os.path.join(temporary, 'benchmark.sqlite3')
+        old_config = setup_databases(0, interactive=False, aliases={DEFAULT_DB_ALIAS}, serialized_aliases=set())
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA journal_mode=WAL')
+                journal_mode = cursor.fetchone()[0]
+            category = Category.objects.create(title='Stock benchmark')
+            product = Product.objects.create(
+                category=category, image='products/benchmark.jpg', title='Stock benchmark hot item',
+                description='benchmark', price=1, stock_on_hand=options['stock'],
+            )
+            self.run(product, options['threads'], options['attempts'], journal_mode)
+        finally:
+            connections.close_all()
+            teardown_databases(old_config, 0)
+            if temporary:
+                test_settings.pop('NAME', None)
+                for name in os.listdir(temporary):
+                    os.remove(os.path.join(temporary, name))
+                os.rmdir(temporary)
+
+    def run(self, product, thread_count, attempts, journal_mode):
+        results = {'reserved': 0, 'rejected': 0, 'busy': 0}
+        latencies = []
+        lock = threading.Lock()
+        start = threading.Barrier(thread_count)
+
+        def worker():
+            local = {'reserved': 0, 'rejected': 0, 'busy': 0}
+            timings = []
+            start.wait()
+            try:
+                for _ in range(attempts):
+                    began = time.perf_counter()
+                    try:
+                        outcome = 'reserved' if reserve(product.pk, 1) else 'rejected'
+                    except OperationalError:
+                        outcome = 'busy'
+                    timings.append(time.perf_counter() - began)
+                    local[outcome] += 1
+            finally:
+                connections.close_all()
+            # Only tallying results takes a Python lock, never the stock update
+            with lock:
+                for key, value in local.items():
+                    results[key] += value
+                latencies.extend(timings)
+
+        threads = [threading.Thread(target=worker) for _ in range(thread_count)]
+        began = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - began
+
+        product.refresh_from_db()
+        latencies.sort()
+        total = thread_count * attempts
+        self.stdout.write(f'journal mode: {journal_mode}')
+        self.stdout.write(
+            f'{total} attempts from {thread_count} threads in {elapsed:.3f}s ({total / elapsed:.0f} attempts/s)'
+        )
+        self.stdout.write(
+            f"reserved {results['reserved']}, rejected {results['rejected']}, "
+            f"database busy {results['busy']}"
+        )
+        self.stdout.write(
+            f'latency p50 {latencies[len(latencies) // 2] * 1000:.2f}ms, '
+            f'p99 {latencies[int(len(latencies) * 0.99)] * 1000:.2f}ms'
+        )
+        if product.stock_reserved != results['reserved'] or product.stock_reserved > product.stock_on_hand:
+            raise CommandError(
+                f'Lost or oversold updates: {product.stock_reserved} units reserved in the '
+                f'database, {results["reserved"]} reported'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'No oversell: {product.stock_reserved} of {product.stock_on_hand} units reserved'
+        ))
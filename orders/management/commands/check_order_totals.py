@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from orders.models import Order
+
+
+class Command(BaseCommand):
+    help = 'Report orders whose stored totals do not match their items'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit', type=int, default=20,
+            help='Maximum number of mismatching orders to list'
+        )
+
+    def handle(self, *args, **options):
+        stale = Order.objects.with_stale_totals().order_by('id')
+        count = stale.count()
+        if not count:
+            self.stdout.write(self.style.SUCCESS('All order totals are consistent'))
+            return
+
+        for order in stale.values('id', 'subtotal', 'computed_subtotal')[:options['limit']]:
+            self.stdout.write(
+                f"Order #{order['id']}: stored {order['subtotal']}, "
+                f"items add up to {order['computed_subtotal']}"
+            )
+        raise CommandError(
+            f'{count} orders have stale totals, run backfill_order_totals --stale-only to fix them'
+        )
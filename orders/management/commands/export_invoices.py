@@ -0,0 +1,48 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from orders import export
+from orders.models import Order
+
+
+class Command(BaseCommand):
+    help = 'Export the invoices of matching orders into a ZIP file, rendered in parallel'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help='Path of the ZIP file to write')
+        parser.add_argument('--status', choices=[status for status, _ in Order.STATUS_CHOICES])
+        parser.add_argument(
+            '--payment-method', choices=[method for method, _ in Order.PAYMENT_METHOD_CHOICES]
+        )
+        parser.add_argument('--from', dest='date_from', type=date.fromisoformat, help='First order date, YYYY-MM-DD')
+        parser.add_argument('--to', dest='date_to', type=date.fromisoformat, help='Last order date, YYYY-MM-DD')
+        parser.add_argument('--user', help='Only orders placed by this email address')
+        parser.add_argument(
+            '--workers', type=int, default=export.WORKERS,
+            help='Rendering processes to use (default: one per CPU core)'
+        )
+
+    def handle(self, *args, **options):
+        order_ids = list(export.filter_orders(
+            status=options['status'], date_from=options['date_from'],
+            date_to=options['date_to'], user=options['user'],
+            payment_method=options['payment_method'],
+        ).values_list('id', flat=True))
+        if not order_ids:
+            raise CommandError('No orders match these filters')
+
+        self.stdout.write(f"Exporting {len(order_ids)} invoices with {options['workers']} workers")
+        started = time.perf_counter()
+
+        def progress(done, total):
+            if done % 100 == 0 or done == total:
+                self.stdout.write(f'  {done}/{total}')
+
+        with open(options['output'], 'wb') as f:
+            count = export.write_zip(order_ids, f, options['workers'], progress)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {count} invoices to {options['output']} in {elapsed:.1f}s ({count / elapsed:.1f} invoices/s)"
+        ))
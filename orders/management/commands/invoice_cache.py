@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from orders import invoice_cache
+
+
+class Command(BaseCommand):
+    help = 'Show invoice PDF cache statistics, or trim or clear the cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--evict', action='store_true',
+            help='Delete least recently served invoices until the cache is within its size limit'
+        )
+        parser.add_argument(
+            '--clear', action='store_true',
+            help='Delete every cached invoice and reset the hit/miss counters'
+        )
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            invoice_cache.clear()
+            self.stdout.write(self.style.SUCCESS('Invoice cache cleared'))
+        elif options['evict']:
+            removed = invoice_cache.evict()
+            self.stdout.write(self.style.SUCCESS(f'Evicted {removed} cached invoices'))
+
+        stats = invoice_cache.stats()
+        lookups = stats['hits'] + stats['misses']
+        hit_rate = stats['hits'] / lookups * 100 if lookups else 0
+        self.stdout.write(f"Directory: {invoice_cache.CACHE_DIR}")
+        self.stdout.write(
+            f"Files: {stats['files']} using {stats['bytes'] / 1024 / 1024:.1f} MB "
+            f"of {stats['max_bytes'] / 1024 / 1024:.1f} MB"
+        )
+        self.stdout.write(f"Hits: {stats['hits']}  Misses: {stats['misses']}  Hit rate: {hit_rate:.1f}%")
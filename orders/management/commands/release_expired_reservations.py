@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from orders.inventory import release_expired_reservations
+
+
+class Command(BaseCommand):
+    help = 'Return stock held by checkouts that were abandoned past their reservation expiry'
+
+    def handle(self, *args, **options):
+        count = release_expired_reservations()
+        self.stdout.write(self.style.SUCCESS(f'Released {count} expired reservations'))
@@ -0,0 +1,67 @@
+from datetime import datetime, time, timedelta
+
+from django.db import models
+from django.db.models import Count, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from accounts.models import User
+
+
+def _start_of(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+class OrderQuerySet(models.QuerySet):
+    def with_computed_subtotal(self):
+        """Annotate each order with the subtotal recomputed from its items."""
+        return self.annotate(
+            computed_subtotal=Coalesce(
+                Sum(F('items__price') * F('items__quantity')), Value(0)
+            )
+        )
+
+    def with_stale_totals(self):
+        """Orders whose stored subtotal no longer matches their items."""
+        return self.with_computed_subtotal().exclude(subtotal=F('computed_subtotal'))
+
+    def with_item_counts(self):
+        """Annotate each order with its number of lines and units.
+
+        Correlated subqueries rather than a join with GROUP BY, so a page of
+        orders can be read in index order and stop at the LIMIT.
+        """
+        items = (
+            self.model._meta.get_field('items').related_model.objects
+            .filter(order=OuterRef('pk')).order_by().values('order')
+        )
+        return self.annotate(
+            line_count=Coalesce(Subquery(items.annotate(n=Count('pk')).values('n')), Value(0)),
+            units=Coalesce(Subquery(items.annotate(n=Sum('quantity')).values('n')), Value(0)),
+        )
+
+    def matching(self, status=None, payment_method=None, date_from=None, date_to=None, user=None):
+        """Filter on the manager list and export filters; empty values are ignored.
+
+        Dates are inclusive local days, turned into ranges on created so the
+        (status, created) and (user, created) indexes apply. user may be a
+        User or an email address.
+        """
+        orders = self
+        if status:
+            orders = orders.filter(status=status)
+        if payment_method:
+            orders = orders.filter(payment_method=payment_method)
+        if date_from:
+            orders = orders.filter(created__gte=_start_of(date_from))
+        if date_to:
+            orders = orders.filter(created__lt=_start_of(date_to + timedelta(days=1)))
+        if isinstance(user, str) and user:
+            orders = orders.filter(user__in=User.objects.filter(email__iexact=user).values('pk'))
+        elif user:
+            orders = orders.filter(user=user)
+        return orders
+
+
+class OrderManager(models.Manager.from_queryset(OrderQuerySet)):
+    pass
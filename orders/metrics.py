@@ -0,0 +1,225 @@
+"""Daily sales rollup for the manager dashboard.
+
+DailySales and DailyCategorySales hold one row per (day, status, payment
+method[, category]) bucket. They are kept current with F() increments:
+placing an order adds its contribution right after the checkout commits,
+and a status or payment method change moves it from the old bucket to the
+new one in the same transaction as the change. Rarer edits to an order's items re-aggregate that
+order's whole day. rebuild() recomputes any date range from the orders
+themselves (manage.py rebuild_sales_metrics).
+
+Reading the dashboard tiles therefore scans a few rows per day instead of
+the orders and items tables.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .managers import _start_of
+from .models import GST_RATE, DailyCategorySales, DailySales, Order, OrderItem
+
+
+def _gst(revenue):
+    return (Decimal(revenue) * GST_RATE).quantize(Decimal('0.01'))
+
+
+def order_day(order):
+    return timezone.localdate(order.created)
+
+
+def contributions(orders):
+    """Return {order id: (order measures, {category_id: measures})} in one query."""
+    result = {
+        order.pk: ({'orders': 1, 'units': 0, 'revenue': order.subtotal, 'gst': order.gst}, {})
+        for order in orders
+    }
+    rows = (
+        OrderItem.objects.filter(order_id__in=result)
+        .values('order_id', 'product__category_id')
+        .annotate(units=Sum('quantity'), revenue=Sum(F('price') * F('quantity')))
+        .order_by()
+    )
+    for row in rows:
+        totals, categories = result[row['order_id']]
+        totals['units'] += row['units']
+        categories[row['product__category_id']] = {
+            'orders': 1, 'units': row['units'], 'revenue': row['revenue'], 'gst': _gst(row['revenue']),
+        }
+    return result
+
+
+def contribution(order):
+    """Return (order measures, {category_id: measures}) for one order."""
+    return contributions([order])[order.pk]
+
+
+def _merge(into, measures):
+    for name, value in measures.items():
+        into[name] = into.get(name, 0) + value
+
+
+def _add(model, key, measures, sign):
+    """Add (sign=1) or subtract (sign=-1) measures in the bucket at key."""
+    changes = {name: F(name) + sign * value for name, value in measures.items()}
+    if model.objects.filter(**key).update(**changes) or sign < 0:
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**key, **measures)
+    except IntegrityError:
+        # Created concurrently between the UPDATE and the INSERT
+        model.objects.filter(**key).update(**changes)
+
+
+def _apply(day, status, payment_method, measures, sign):
+    totals, categories = measures
+    key = {'day': day, 'status': status, 'payment_method': payment_method}
+    _add(DailySales, key, totals, sign)
+    for category_id, category_measures in categories.items():
+        if category_id is not None:
+            _add(DailyCategorySales, dict(key, category_id=category_id), category_measures, sign)
+
+
+def order_placed(order):
+    """Count a new order; call once its items exist."""
+    _apply(order_day(order), order.status, order.payment_method, contribution(order), 1)
+
+
+def order_removed(order):
+    _apply(order_day(order), order.status, order.payment_method, contribution(order), -1)
+
+
+def order_moved(order, old_status, old_payment_method):
+    """Move an order's contribution after its status or payment method changed."""
+    if (old_status, old_payment_method) == (order.status, order.payment_method):
+        return
+    measures = contribution(order)
+    day = order_day(order)
+    _apply(day, old_status, old_payment_method, measures, -1)
+    _apply(day, order.status, order.payment_method, measures, 1)
+
+
+def orders_moved(orders, status):
+    """Move many orders to status, one bucket update per (day, old bucket).
+
+    orders must still carry the status they are moving from.
+    """
+    orders = [order for order in orders if order.status != status]
+    measures = contributions(orders)
+    buckets = {}
+    for order in orders:
+        key = (order_day(order), order.status, order.payment_method)
+        totals, categories = buckets.setdefault(key, ({}, {}))
+        order_totals, order_categories = measures[order.pk]
+        _merge(totals, order_totals)
+        for category_id, category_measures in order_categories.items():
+            _merge(categories.setdefault(category_id, {}), category_measures)
+    for (day, old_status, payment_method), bucket in buckets.items():
+        _apply(day, old_status, payment_method, bucket, -1)
+        _apply(day, status, payment_method, bucket, 1)
+
+
+@transaction.atomic
+def rebuild(date_from=None, date_to=None):
+    """Recompute every bucket between two dates (inclusive) from the orders.
+
+    Open-ended when a bound is None. Returns the number of DailySales rows.
+    """
+    buckets = DailySales.objects.all()
+    category_buckets = DailyCategorySales.objects.all()
+    orders = Order.objects.all()
+    items = OrderItem.objects.all()
+    # Range conditions on the raw columns so indexes on created can be used
+    if date_from:
+        start = _start_of(date_from)
+        buckets = buckets.filter(day__gte=date_from)
+        category_buckets = category_buckets.filter(day__gte=date_from)
+        orders = orders.filter(created__gte=start)
+        items = items.filter(order__created__gte=start)
+    if date_to:
+        end = _start_of(date_to + timedelta(days=1))
+        buckets = buckets.filter(day__lte=date_to)
+        category_buckets = category_buckets.filter(day__lte=date_to)
+        orders = orders.filter(created__lt=end)
+        items = items.filter(order__created__lt=end)
+    orders = orders.annotate(day=TruncDate('created'))
+    items = items.annotate(day=TruncDate('order__created'))
+    buckets.delete()
+    category_buckets.delete()
+
+    units = {
+        (row['day'], row['order__status'], row['order__payment_method']): row['units']
+        for row in items.values('day', 'order__status', 'order__payment_method').annotate(units=Sum('quantity'))
+    }
+    rows = [
+        DailySales(
+            day=row['day'], status=row['status'], payment_method=row['payment_method'],
+            orders=row['orders'], revenue=row['revenue'] or 0, gst=row['gst'] or 0,
+            units=units.get((row['day'], row['status'], row['payment_method']), 0),
+        )
+        for row in orders.values('day', 'status', 'payment_method').annotate(
+            orders=Count('id'), revenue=Sum('subtotal'), gst=Sum('gst')
+        )
+    ]
+    DailySales.objects.bulk_create(rows, batch_size=500)
+
+    DailyCategorySales.objects.bulk_create([
+        DailyCategorySales(
+            day=row['day'], status=row['order__status'], payment_method=row['order__payment_method'],
+            category_id=row['product__category_id'], orders=row['orders'], units=row['units'],
+            revenue=row['revenue'], gst=_gst(row['revenue']),
+        )
+        for row in items.filter(product__category__isnull=False).values(
+            'day', 'order__status', 'order__payment_method', 'product__category_id'
+        ).annotate(
+            orders=Count('order_id', distinct=True), units=Sum('quantity'),
+            revenue=Sum(F('price') * F('quantity')),
+        )
+    ], batch_size=500)
+    return len(rows)
+
+
+def rebuild_day(day):
+    rebuild(day, day)
+
+
+def _money(value):
+    # SQLite sums decimals as floats
+    return Decimal(value or 0).quantize(Decimal('0.01'))
+
+
+def summary(days=30, top_categories=5):
+    """Dashboard tiles: all-time totals, the last days, statuses, top categories.
+
+    Revenue, GST and units leave out cancelled orders.
+    """
+    since = timezone.localdate() - timedelta(days=days - 1)
+    kept = DailySales.objects.exclude(status=Order.CANCELLED)
+    measures = {'revenue': Sum('revenue'), 'gst': Sum('gst'), 'units': Sum('units')}
+
+    totals = kept.aggregate(orders=Sum('orders'), **measures)
+    recent = kept.filter(day__gte=since).aggregate(orders=Sum('orders'), **measures)
+    by_status = dict(
+        DailySales.objects.values_list('status').annotate(orders=Sum('orders')).order_by()
+    )
+    categories = (
+        DailyCategorySales.objects.exclude(status=Order.CANCELLED).filter(day__gte=since)
+        .values('category__title')
+        .annotate(orders=Sum('orders'), units=Sum('units'), revenue=Sum('revenue'))
+        .order_by('-revenue')[:top_categories]
+    )
+    return {
+        'total_orders': sum(by_status.values()),
+        'revenue': totals['revenue'] or 0,
+        'gst': _money(totals['gst']),
+        'units': totals['units'] or 0,
+        'recent': dict(recent, orders=recent['orders'] or 0, revenue=recent['revenue'] or 0,
+                       units=recent['units'] or 0, gst=_money(recent['gst'])),
+        'days': days,
+        'by_status': by_status,
+        'top_categories': list(categories),
+    }
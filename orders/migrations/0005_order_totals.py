@@ -0,0 +1,41 @@
+# Generated by Django 4.2.11 on 2026-10-17 06:35
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import F, Sum
+
+
+def backfill_totals(apps, schema_editor):
+    Order = apps.get_model('orders', 'Order')
+    orders = Order.objects.annotate(items_subtotal=Sum(F('items__price') * F('items__quantity')))
+    for order in orders.iterator():
+        order.subtotal = order.items_subtotal or 0
+        order.gst = (Decimal(order.subtotal) * Decimal('0.18')).quantize(Decimal('0.01'))
+        order.total = order.subtotal + order.gst
+        order.save(update_fields=['subtotal', 'gst', 'total'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0004_order_payment_method'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='gst',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='subtotal',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='total',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12),
+        ),
+        migrations.RunPython(backfill_totals, migrations.RunPython.noop),
+    ]
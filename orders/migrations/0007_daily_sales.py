@@ -0,0 +1,100 @@
+# Generated by Django 4.2.11 on 2026-10-17 06:56
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+import django.db.models.deletion
+
+# The rate when the rollup was introduced
+GST_RATE = Decimal('0.18')
+
+
+def build_rollup(apps, schema_editor):
+    """Fill both rollup tables from the existing orders."""
+    Order = apps.get_model('orders', 'Order')
+    OrderItem = apps.get_model('orders', 'OrderItem')
+    DailySales = apps.get_model('orders', 'DailySales')
+    DailyCategorySales = apps.get_model('orders', 'DailyCategorySales')
+
+    orders = Order.objects.annotate(day=TruncDate('created'))
+    items = OrderItem.objects.annotate(day=TruncDate('order__created'))
+    units = {
+        (row['day'], row['order__status'], row['order__payment_method']): row['units']
+        for row in items.values('day', 'order__status', 'order__payment_method').annotate(units=Sum('quantity'))
+    }
+    DailySales.objects.bulk_create([
+        DailySales(
+            day=row['day'], status=row['status'], payment_method=row['payment_method'],
+            orders=row['orders'], revenue=row['revenue'] or 0, gst=row['gst'] or 0,
+            units=units.get((row['day'], row['status'], row['payment_method']), 0),
+        )
+        for row in orders.values('day', 'status', 'payment_method').annotate(
+            orders=Count('id'), revenue=Sum('subtotal'), gst=Sum('gst')
+        )
+    ], batch_size=500)
+    DailyCategorySales.objects.bulk_create([
+        DailyCategorySales(
+            day=row['day'], status=row['order__status'], payment_method=row['order__payment_method'],
+            category_id=row['product__category_id'], orders=row['orders'], units=row['units'],
+            revenue=row['revenue'],
+            gst=(Decimal(row['revenue']) * GST_RATE).quantize(Decimal('0.01')),
+        )
+        for row in items.filter(product__category__isnull=False).values(
+            'day', 'order__status', 'order__payment_method', 'product__category_id'
+        ).annotate(
+            orders=Count('order_id', distinct=True), units=Sum('quantity'),
+            revenue=Sum(F('price') * F('quantity')),
+        )
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0012_product_stock_on_hand_product_stock_reserved'),
+        ('orders', '0006_stockreservation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyCategorySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('shipped', 'Shipped'), ('delivered', 'Delivered'), ('cancelled', 'Cancelled')], max_length=20)),
+                ('payment_method', models.CharField(choices=[('credit_card', 'Credit/Debit Card'), ('paypal', 'PayPal'), ('upi', 'UPI'), ('cod', 'Cash on Delivery')], max_length=20)),
+                ('orders', models.IntegerField(default=0)),
+                ('units', models.IntegerField(default=0)),
+                ('revenue', models.BigIntegerField(default=0)),
+                ('gst', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('shipped', 'Shipped'), ('delivered', 'Delivered'), ('cancelled', 'Cancelled')], max_length=20)),
+                ('payment_method', models.CharField(choices=[('credit_card', 'Credit/Debit Card'), ('paypal', 'PayPal'), ('upi', 'UPI'), ('cod', 'Cash on Delivery')], max_length=20)),
+                ('orders', models.IntegerField(default=0)),
+                ('units', models.IntegerField(default=0)),
+                ('revenue', models.BigIntegerField(default=0)),
+                ('gst', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='dailysales',
+            constraint=models.UniqueConstraint(fields=('day', 'status', 'payment_method'), name='daily_sales_bucket'),
+        ),
+        migrations.AddField(
+            model_name='dailycategorysales',
+            name='category',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='shop.category'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailycategorysales',
+            constraint=models.UniqueConstraint(fields=('day', 'status', 'payment_method', 'category'), name='daily_category_sales_bucket'),
+        ),
+        migrations.RunPython(build_rollup, migrations.RunPython.noop),
+    ]
@@ -1,15 +1,21 @@
+from decimal import Decimal
+
 from django.db import models
+from django.db.models import F, Sum
 from typing import Any
 
 from accounts.models import User, Address
 from shop.models import Product
+from .managers import OrderManager
+
+# GST charged on every order
+GST_RATE = Decimal('0.18')
 
 
 class Order(models.Model):
     # Type hints for Django's automatic fields to help type checkers
     id: int
     items: Any
-    objects: Any
     
     # Order status choices
     PENDING = 'pending'
@@ -45,17 +51,44 @@ class Order(models.Model):
     updated = models.DateTimeField(auto_now=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=PENDING)
     payment_method = models.CharField(max_length=20, choices=PAYMENT_METHOD_CHOICES, default=PAYMENT_CREDIT_CARD)
+    # Totals are stored on the order and kept in sync by OrderItem writes,
+    # so list pages can show them without querying the items
+    subtotal = models.IntegerField(default=0)  # type: ignore
+    gst = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    total = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+
+    objects = OrderManager()
 
     class Meta:
         ordering = ('-created',)
+        indexes = [
+            models.Index(fields=['status', 'created'], name='order_status_created_idx'),
+            models.Index(fields=['user', 'created'], name='order_user_created_idx'),
+        ]
 
     def __str__(self):
         return str(self.id)
 
     @property
     def get_total_price(self) -> int:
-        total = sum(item.get_cost() for item in self.items.all())
-        return total  # type: ignore
+        return self.subtotal  # type: ignore
+
+    def set_totals(self, subtotal):
+        """Set subtotal, GST and grand total from an items subtotal."""
+        self.subtotal = subtotal
+        self.gst = (Decimal(subtotal) * GST_RATE).quantize(Decimal('0.01'))
+        self.total = self.subtotal + self.gst
+
+    def compute_subtotal(self) -> int:
+        subtotal = self.items.aggregate(subtotal=Sum(F('price') * F('quantity')))['subtotal']
+        return subtotal or 0
+
+    def update_totals(self):
+        """Recompute the stored totals from the order's items and persist them."""
+        self.set_totals(self.compute_subtotal())
+        Order.objects.filter(pk=self.pk).update(
+            subtotal=self.subtotal, gst=self.gst, total=self.total
+        )
     
 
 class OrderItem(models.Model):
@@ -74,4 +107,77 @@ class OrderItem(models.Model):
         return str(self.id)
 
     def get_cost(self) -> int:
-        return self.price * self.quantity  # type: ignore
\ No newline at end of file
+        return self.price * self.quantity  # type: ignore
+
+
+class StockReservation(models.Model):
+    """Units of a product held for an order between checkout and payment."""
+    ACTIVE = 'active'
+    COMMITTED = 'committed'
+    RELEASED = 'released'
+
+    STATUS_CHOICES = [
+        (ACTIVE, 'Active'),
+        (COMMITTED, 'Committed'),
+        (RELEASED, 'Released'),
+    ]
+
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='reservations')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='reservations')
+    quantity = models.PositiveIntegerField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=ACTIVE)
+    created = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'expires_at'], name='reservation_expiry_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity} x {self.product_id} for order {self.order_id}"
+
+
+class DailySales(models.Model):
+    """Orders rolled up per day, status and payment method (see orders.metrics)."""
+    day = models.DateField()
+    status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    payment_method = models.CharField(max_length=20, choices=Order.PAYMENT_METHOD_CHOICES)
+    orders = models.IntegerField(default=0)  # type: ignore
+    units = models.IntegerField(default=0)  # type: ignore
+    revenue = models.BigIntegerField(default=0)  # type: ignore
+    gst = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'status', 'payment_method'], name='daily_sales_bucket'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.status} {self.payment_method}"
+
+
+class DailyCategorySales(models.Model):
+    """Order items rolled up per day, status, payment method and category.
+
+    orders counts the orders with at least one item in the category, so it
+    does not add up across categories; use DailySales for order totals.
+    """
+    day = models.DateField()
+    status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    payment_method = models.CharField(max_length=20, choices=Order.PAYMENT_METHOD_CHOICES)
+    category = models.ForeignKey('shop.Category', on_delete=models.CASCADE, related_name='daily_sales')
+    orders = models.IntegerField(default=0)  # type: ignore
+    units = models.IntegerField(default=0)  # type: ignore
+    revenue = models.BigIntegerField(default=0)  # type: ignore
+    gst = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['day', 'status', 'payment_method', 'category'], name='daily_category_sales_bucket'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.status} {self.payment_method} {self.category_id}"
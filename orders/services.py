@@ -0,0 +1,93 @@
+from django.db import transaction
+from django.db.models import Subquery
+from django.utils import timezone
+
+from accounts.models import Address
+from jobs.queue import enqueue
+from . import metrics
+from .inventory import release_orders, reserve_stock
+from .models import Order, OrderItem
+
+
+@transaction.atomic
+def place_order(user, lines):
+    """Create an order with its items for the given cart lines.
+
+    Runs as one transaction: a single INSERT for the order (which also
+    resolves the user's default address in a subquery and carries the
+    precomputed totals), a single bulk INSERT for the items and a single
+    conditional UPDATE reserving the stock. The sales rollup is updated once
+    the transaction commits. Raises OutOfStock, creating nothing, if a line
+    cannot be covered.
+    """
+    lines = list(lines)
+    if not lines:
+        raise ValueError('Cannot place an order without items')
+
+    default_address = Address.objects.filter(user=user, is_default=True).values('pk')[:1]
+    order = Order(user=user, delivery_address_id=Subquery(default_address))
+    order.set_totals(sum(line.price * line.quantity for line in lines))
+    order.save(force_insert=True)
+    # The address id was resolved by the database; drop the expression so
+    # the field is loaded on first access like a deferred field
+    order.__dict__.pop('delivery_address_id')
+
+    OrderItem.objects.bulk_create([
+        OrderItem(order=order, product=line.product, price=line.price, quantity=line.quantity)
+        for line in lines
+    ])
+    reserve_stock(order, lines)
+    # Outside the checkout transaction, so the rollup rows are not locked
+    # for its length; manage.py rebuild_sales_metrics repairs a missed update
+    transaction.on_commit(lambda: metrics.order_placed(order), robust=True)
+    return order
+
+
+# Statuses each status may move to; delivered and cancelled orders are final
+TRANSITIONS = {
+    Order.PENDING: {Order.PROCESSING, Order.SHIPPED, Order.CANCELLED},
+    Order.PROCESSING: {Order.SHIPPED, Order.CANCELLED},
+    Order.SHIPPED: {Order.DELIVERED, Order.CANCELLED},
+    Order.DELIVERED: set(),
+    Order.CANCELLED: set(),
+}
+
+
+# Statuses the customer is emailed about (see tasks.notify_status_change)
+NOTIFY_STATUSES = {Order.CANCELLED, Order.SHIPPED, Order.DELIVERED}
+
+
+def can_transition(old_status, new_status):
+    return new_status in TRANSITIONS.get(old_status, ())
+
+
+@transaction.atomic
+def transition_orders(orders, status, base_url=''):
+    """Move every order in the queryset that may do so to status.
+
+    One conditional UPDATE changes the orders; orders whose current status
+    cannot move to status are left alone. Cancelled orders release their
+    stock, the sales rollup is adjusted and, for the statuses in
+    NOTIFY_STATUSES, the customer emails for all of them go out in a single
+    job. base_url is used for links in those emails. Returns the number of
+    orders moved.
+    """
+    sources = [old for old, targets in TRANSITIONS.items() if status in targets]
+    moving = list(
+        orders.filter(status__in=sources).select_for_update()
+        .only('id', 'status', 'payment_method', 'created', 'subtotal', 'gst')
+    )
+    if not moving:
+        return 0
+    order_ids = [order.pk for order in moving]
+    # The locks taken above make this match exactly the orders read
+    Order.objects.filter(pk__in=order_ids, status__in=sources).update(
+        status=status, updated=timezone.now()
+    )
+
+    if status == Order.CANCELLED:
+        release_orders(order_ids)
+    metrics.orders_moved(moving, status)
+    if status in NOTIFY_STATUSES:
+        enqueue('orders.notify_status_change', order_ids=order_ids, status=status, base_url=base_url)
+    return len(moving)
@@ -0,0 +1,53 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import invoice_cache, metrics
+from .models import Order, OrderItem
+
+
+def _rebuild_metrics_day(order):
+    day = metrics.order_day(order)
+    transaction.on_commit(lambda: metrics.rebuild_day(day))
+
+
+@receiver(post_save, sender=OrderItem)
+def order_item_saved(sender, instance, **kwargs):
+    instance.order.update_totals()
+    _rebuild_metrics_day(instance.order)
+
+
+@receiver(post_delete, sender=OrderItem)
+def order_item_deleted(sender, instance, origin=None, **kwargs):
+    # Nothing to keep in sync when the whole order is being deleted
+    if isinstance(origin, Order):
+        return
+    instance.order.update_totals()
+    _rebuild_metrics_day(instance.order)
+
+
+@receiver(pre_save, sender=Order)
+def order_saving(sender, instance, **kwargs):
+    if not instance._state.adding:
+        instance._metrics_bucket = (
+            Order.objects.filter(pk=instance.pk).values_list('status', 'payment_method').first()
+        )
+
+
+@receiver(post_save, sender=Order)
+def order_saved(sender, instance, created, **kwargs):
+    # New orders are counted by place_order once their items exist
+    previous = instance.__dict__.pop('_metrics_bucket', None)
+    if not created and previous:
+        metrics.order_moved(instance, *previous)
+
+
+@receiver(pre_delete, sender=Order)
+def order_deleting(sender, instance, **kwargs):
+    # Before the cascade removes the items the contribution is made of
+    metrics.order_removed(instance)
+
+
+@receiver(post_delete, sender=Order)
+def order_deleted(sender, instance, **kwargs):
+    invoice_cache.discard(instance.pk)
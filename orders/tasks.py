@@ -0,0 +1,32 @@
+from jobs.queue import register
+
+from . import export
+from .models import Order
+
+
+@register('orders.send_order_confirmation')
+def send_order_confirmation(order_id):
+    from .views import send_order_confirmation_email
+
+    order = Order.objects.select_related('user', 'delivery_address').get(pk=order_id)
+    send_order_confirmation_email(order.user, order)
+
+
+@register('orders.notify_status_change')
+def notify_status_change(order_ids, status, base_url=''):
+    from .views import send_cancellation_email, send_status_update_email
+
+    orders = (
+        Order.objects.filter(pk__in=order_ids, status=status)
+        .select_related('user').prefetch_related('items__product')
+    )
+    for order in orders:
+        if status == Order.CANCELLED:
+            send_cancellation_email(order, base_url)
+        elif status in (Order.SHIPPED, Order.DELIVERED):
+            send_status_update_email(order, base_url)
+
+
+@register('orders.export_invoices')
+def export_invoices(order_ids, token):
+    export.export_to_file(order_ids, token)
@@ -1,3 +1,98 @@
+from datetime import timedelta
+
+from django.db import transaction
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import User
+from cart.utils.cart import CartLine
+from jobs.models import Job
+from shop.models import Category, Product
+from .inventory import OutOfStock
+from .models import Order, StockReservation
+from .services import place_order, transition_orders
+
+
+class OrderTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('buyer@example.com', 'Buyer', 'buyer-pass-1234')
+        category = Category.objects.create(title='Phones')
+        self.product = Product.objects.create(
+            category=category, image='products/phone.jpg', title='Phone', description='A phone',
+            price=100, stock_on_hand=3,
+        )
+        self.untracked = Product.objects.create(
+            category=category, image='products/case.jpg', title='Case', description='A case', price=10,
+        )
+
+    def order(self, quantity=2):
+        return place_order(self.user, [
+            CartLine(self.product, quantity, self.product.price),
+            CartLine(self.untracked, 1, self.untracked.price),
+        ])
+
+    def stock(self):
+        self.product.refresh_from_db()
+        return self.product.stock_on_hand, self.product.stock_reserved
+
+
+class StockReservationTests(OrderTestCase):
+    def test_checkout_cannot_oversell(self):
+        self.order()
+        with self.assertRaises(OutOfStock) as raised:
+            with transaction.atomic():
+                self.order()
+        self.assertEqual(raised.exception.product, self.product)
+        self.assertEqual(self.stock(), (3, 2))
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(StockReservation.objects.count(), 2)
+
+    def test_expired_reservation_is_released_for_a_new_checkout(self):
+        first = self.order()
+        first.reservations.update(expires_at=timezone.now() - timedelta(minutes=1))
+        self.order()
+        self.assertEqual(self.stock(), (3, 2))
+        self.assertFalse(first.reservations.filter(product=self.product, status=StockReservation.ACTIVE).exists())
+
+    def test_payment_commits_stock_once(self):
+        order = self.order()
+        self.client.force_login(self.user)
+        url = reverse('orders:process_payment', args=[order.pk])
+        self.client.post(url, {'payment_method': 'upi'})
+        self.client.post(url, {'payment_method': 'upi'})
+        order.refresh_from_db()
+        self.assertEqual((order.status, order.payment_method), (Order.PROCESSING, 'upi'))
+        self.assertEqual(self.stock(), (1, 0))
+        self.assertEqual(Job.objects.filter(name='orders.send_order_confirmation').count(), 1)
+
+    def test_cancelled_order_cannot_be_paid(self):
+        order = self.order()
+        self.client.force_login(self.user)
+        self.client.get(reverse('orders:cancel_order', args=[order.pk]))
+        self.client.post(reverse('orders:process_payment', args=[order.pk]))
+        order.refresh_from_db()
+        self.assertEqual(order.status, Order.CANCELLED)
+        self.assertEqual(self.stock(), (3, 0))
+
+
+class TransitionTests(OrderTestCase):
+    def test_only_allowed_moves_happen(self):
+        pending = self.order(1)
+        delivered = self.order(1)
+        Order.objects.filter(pk=delivered.pk).update(status=Order.DELIVERED)
+        moved = transition_orders(Order.objects.filter(pk__in=[pending.pk, delivered.pk]), Order.SHIPPED)
+        self.assertEqual(moved, 1)
+        self.assertEqual(
+            dict(Order.objects.values_list('pk', 'status')),
+            {pending.pk: Order.SHIPPED, delivered.pk: Order.DELIVERED},
+        )
 
-# Create your tests here.
+    def test_customers_are_notified_only_for_emailed_statuses(self):
+        orders = Order.objects.filter(pk__in=[self.order(1).pk, self.order(1).pk])
+        transition_orders(orders, Order.PROCESSING)
+        self.assertFalse(Job.objects.filter(name='orders.notify_status_change').exists())
+        transition_orders(orders, Order.CANCELLED)
+        job = Job.objects.get(name='orders.notify_status_change')
+        self.assertEqual(sorted(job.payload['order_ids']), sorted(orders.values_list('pk', flat=True)))
+        self.assertEqual(self.stock(), (3, 0))
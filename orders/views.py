@@ -1,50 +1,46 @@
+import logging
+import os
+
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.core.mail import send_mail, EmailMultiAlternatives
 from django.conf import settings
 from django.template.loader import render_to_string
 from django.utils.html import strip_tags
 from django.views.decorators.http import require_POST
 from django.utils import timezone
-from django.http import HttpResponse
+from django.http import HttpResponse, FileResponse
 from django.template.loader import get_template
 from django.urls import reverse
-
-from .models import Order, OrderItem
+from django.db import transaction
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+from .models import Order
+from . import invoice_cache, metrics
+from .invoices import get_renderer
+from .inventory import OutOfStock, commit_stock
+from .services import place_order, transition_orders
 from accounts.models import Address
 from cart.utils.cart import Cart
+from jobs.queue import enqueue
+from outbox.mail import queue_email
 
-import os
-from reportlab.platypus import Image
-
-from io import BytesIO
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib import colors
+logger = logging.getLogger(__name__)
 
 
 @login_required
 def create_order(request):
     cart = Cart(request)
     
-    # Create order first
-    order = Order.objects.create(user=request.user)
-    
-    # Add items to order
-    for item in cart:
-        OrderItem.objects.create(
-            order=order, product=item['product'],
-            price=item['price'], quantity=item['quantity']
-        )
-    
-    # If user has a default address, assign it to the order
-    default_address = request.user.addresses.filter(is_default=True).first()
-    if default_address:
-        order.delivery_address = default_address
-        order.save()
+    try:
+        order = place_order(request.user, cart)
+    except OutOfStock as e:
+        messages.error(request, f'Sorry, {e.product.title} does not have enough stock left.')
+        return redirect('cart:show_cart')
+    except ValueError:
+        messages.error(request, 'Your cart is empty.')
+        return redirect('cart:show_cart')
     
     return redirect('orders:checkout', order_id=order.id)
 
@@ -57,11 +53,6 @@ def checkout(request, order_id):
     addresses = request.user.addresses.all()
     default_address = request.user.addresses.filter(is_default=True).first()
     
-    # Calculate GST and total
-    subtotal = order.get_total_price
-    gst = subtotal * 0.18
-    total = subtotal + gst
-    
     if request.method == 'POST':
         address_id = request.POST.get('delivery_address')
         if address_id:
@@ -80,54 +71,61 @@ def checkout(request, order_id):
         'order': order,
         'addresses': addresses,
         'default_address': default_address,
-        'gst': gst,
-        'total': total
+        'gst': order.gst,
+        'total': order.total
     }
     return render(request, 'checkout.html', context)
 
 
 @login_required
 def payment_page(request, order_id):
-    order = get_object_or_404(Order, id=order_id)
-    
-    # Calculate GST and total
-    subtotal = order.get_total_price
-    gst = subtotal * 0.18
-    total = subtotal + gst
+    order = get_object_or_404(Order, id=order_id, user=request.user)
     
     context = {
         'title': 'Payment', 
         'order': order,
-        'gst': gst,
-        'total': total
+        'gst': order.gst,
+        'total': order.total
     }
     return render(request, 'payment.html', context)
 
 
 @login_required
 def process_payment(request, order_id):
-    order = get_object_or_404(Order, id=order_id)
+    order = get_object_or_404(Order, id=order_id, user=request.user)
     
     # Only process payment on POST request
     if request.method == 'POST':
         # Get the selected payment method from the form
         payment_method = request.POST.get('payment_method', 'credit_card')
         
-        # Save payment method to the order
-        order.payment_method = payment_method
-        order.save()
+        # Take the reserved units out of stock, save the payment method and
+        # move the order to processing (not delivered) in one transaction.
+        # The conditional UPDATE lets only a pending order through, once,
+        # even when the form is posted twice or races a cancellation. The
+        # confirmation email and its PDF invoice are produced by the job
+        # worker, which only sees the job once this transaction commits.
+        try:
+            with transaction.atomic():
+                paid = Order.objects.filter(pk=order.pk, status=Order.PENDING).update(
+                    status=Order.PROCESSING, payment_method=payment_method, updated=timezone.now()
+                )
+                if not paid:
+                    messages.error(request, 'This order has already been paid or cancelled.')
+                    return redirect('orders:user_orders')
+                commit_stock(order)
+                old_payment_method = order.payment_method
+                order.status, order.payment_method = Order.PROCESSING, payment_method
+                metrics.order_moved(order, Order.PENDING, old_payment_method)
+                enqueue('orders.send_order_confirmation', order_id=order.id)
+        except OutOfStock as e:
+            messages.error(request, f'Sorry, {e.product.title} sold out before your payment went through.')
+            return redirect('orders:payment', order_id=order.id)
         
         # Clear the cart
         cart = Cart(request)
         cart.clear()
         
-        # Update order status to processing (not delivered)
-        order.status = Order.PROCESSING
-        order.save()
-        
-        # Send confirmation email with invoice
-        send_order_confirmation_email(request.user, order)
-        
         # Redirect to success page to prevent reprocessing on refresh
         return redirect('orders:payment_success', order_id=order.id)
     
@@ -161,417 +159,37 @@ def send_order_confirmation_email(user, order):
     # Plain text version
     plain_message = strip_tags(html_message)
     
-    # Generate PDF invoice
-    pdf_buffer = None
+    # Generate PDF invoice, keeping it in the invoice cache for later downloads
+    pdf_bytes = None
     try:
-        pdf_buffer = generate_modern_invoice_pdf(user, order)
-    except Exception as e:
-        print(f"Failed to generate PDF invoice: {e}")
+        path, _, _ = invoice_cache.get_or_render(order, render_invoice)
+        pdf_bytes = path.read_bytes()
+    except Exception:
+        logger.exception('Failed to generate PDF invoice for order %s', order.id)
         # Fallback to original invoice
         try:
-            pdf_buffer = generate_invoice_pdf(user, order)
-        except Exception as e2:
-            print(f"Failed to generate fallback PDF invoice: {e2}")
+            pdf_bytes = generate_invoice_pdf(user, order).getvalue()
+        except Exception:
+            logger.exception('Failed to generate fallback PDF invoice for order %s', order.id)
     
-    # Send email with PDF attachment
-    try:
-        email = EmailMultiAlternatives(
-            subject,
-            plain_message,
-            settings.DEFAULT_FROM_EMAIL,
-            [user.email]
-        )
-        email.attach_alternative(html_message, "text/html")
-        
-        # Attach PDF invoice if generated successfully
-        if pdf_buffer:
-            email.attach(f'invoice-{order.id}.pdf', pdf_buffer.getvalue(), 'application/pdf')
-        
-        email.send()
-    except Exception as e:
-        # Log the error but don't fail the payment
-        print(f"Failed to send order confirmation email: {e}")
+    # Queue the email with the PDF attached, if generated successfully;
+    # send_outbox delivers it
+    attachments = [(f'invoice-{order.id}.pdf', pdf_bytes, 'application/pdf')] if pdf_bytes else []
+    queue_email(subject, plain_message, [user.email], html_body=html_message, attachments=attachments)
 
 
 def generate_invoice_pdf(user, order):
     """Generate PDF invoice for the order using ReportLab"""
-    buffer = BytesIO()
-    
-    # Create the PDF object, using the buffer as its "file"
-    doc = SimpleDocTemplate(buffer, pagesize=letter)
-    elements = []
-    
-    # Sample stylesheet
-    styles = getSampleStyleSheet()
-    
-    # Title
-    elements.append(Paragraph("ShopEase Invoice", styles['Title']))
-    elements.append(Spacer(1, 12))
-    
-    # Order details
-    elements.append(Paragraph(f"Invoice #SE-{order.id}", styles['Heading2']))
-    elements.append(Paragraph(f"Order Date: {order.created.strftime('%B %d, %Y')}", styles['Normal']))
-    elements.append(Spacer(1, 12))
-    
-    # Customer details
-    elements.append(Paragraph("Billing To:", styles['Heading3']))
-    elements.append(Paragraph(f"{user.full_name or user.email}", styles['Normal']))
-    elements.append(Paragraph(f"{user.email}", styles['Normal']))
-    elements.append(Paragraph("+91 89712 78930", styles['Normal']))
-    elements.append(Paragraph("123 Shopping Street, Retail City, 560032", styles['Normal']))
-    elements.append(Spacer(1, 12))
-    
-    # Items table
-    data = [['Item', 'SKU', 'Qty', 'Unit Price', 'Total']]
-    for item in order.items.all():
-        data.append([
-            item.product.title,
-            f"SE-{item.product.id}",
-            str(item.quantity),
-            f"₹{item.price}",
-            f"₹{item.get_cost()}"
-        ])
-    
-    # Add totals
-    data.append(['', '', '', 'Subtotal', f"₹{order.get_total_price}"])
-    gst = order.get_total_price * 0.18
-    data.append(['', '', '', 'GST (18%)', f"₹{gst:.2f}"])
-    data.append(['', '', '', 'Total', f"₹{order.get_total_price + gst:.2f}"])
-    
-    table = Table(data)
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 14),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-    ]))
-    
-    elements.append(table)
-    elements.append(Spacer(1, 12))
-    
-    # Notes
-    elements.append(Paragraph("Notes:", styles['Heading3']))
-    elements.append(Paragraph("Thank you for shopping with ShopEase! If you have questions about this invoice, please contact support@shopease.com or call +91 89712 78930.", styles['Normal']))
-    
-    # Build PDF
-    doc.build(elements)
-    
-    # Reset buffer position to beginning
-    buffer.seek(0)
-    
-    return buffer
+    return get_renderer().render_basic(user, order)
+
+
+def render_invoice(order):
+    return generate_modern_invoice_pdf(order.user, order)
 
 
 def generate_modern_invoice_pdf(user, order):
     """Generate modern PDF invoice for the order using ReportLab"""
-    buffer = BytesIO()
-    
-    # Create the PDF object, using the buffer as its "file"
-    doc = SimpleDocTemplate(buffer, pagesize=letter, topMargin=30, bottomMargin=30)
-    elements = []
-    
-    # Styles
-    styles = getSampleStyleSheet()
-    
-    # Custom styles - using only basic fonts to avoid encoding issues
-    title_style = ParagraphStyle(
-        'InvoiceTitle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        textColor=colors.HexColor('#1779ba'),
-        alignment=1,  # Center alignment
-        spaceAfter=10,
-        fontName='Helvetica-Bold'
-    )
-    
-    subtitle_style = ParagraphStyle(
-        'InvoiceSubtitle',
-        parent=styles['Normal'],
-        fontSize=12,
-        textColor=colors.HexColor('#9b9b9b'),
-        alignment=1,  # Center alignment
-        spaceAfter=20,
-        fontName='Helvetica'
-    )
-    
-    company_style = ParagraphStyle(
-        'CompanyStyle',
-        parent=styles['Normal'],
-        fontSize=18,
-        textColor=colors.HexColor('#1779ba'),
-        alignment=0,  # Left alignment
-        spaceAfter=5,
-        fontName='Helvetica-Bold'
-    )
-    
-    company_subtitle_style = ParagraphStyle(
-        'CompanySubtitle',
-        parent=styles['Normal'],
-        fontSize=10,
-        textColor=colors.HexColor('#666666'),
-        alignment=0,  # Left alignment
-        spaceAfter=20,
-        fontName='Helvetica'
-    )
-    
-    heading_style = ParagraphStyle(
-        'CustomHeading',
-        parent=styles['Heading2'],
-        fontSize=14,
-        textColor=colors.HexColor('#1779ba'),
-        spaceAfter=10,
-        fontName='Helvetica-Bold'
-    )
-    
-    subheading_style = ParagraphStyle(
-        'SubHeading',
-        parent=styles['Normal'],
-        fontSize=9,
-        textColor=colors.HexColor('#666666'),
-        spaceAfter=4,
-        fontName='Helvetica-Bold'
-    )
-    
-    normal_style = ParagraphStyle(
-        'CustomNormal',
-        parent=styles['Normal'],
-        fontSize=9,
-        spaceAfter=4,
-        fontName='Helvetica'
-    )
-    
-    bold_style = ParagraphStyle(
-        'BoldText',
-        parent=normal_style,
-        fontName='Helvetica-Bold'
-    )
-    
-    right_align_style = ParagraphStyle(
-        'RightAlign',
-        parent=normal_style,
-        alignment=2  # Right alignment
-    )
-    
-    center_align_style = ParagraphStyle(
-        'CenterAlign',
-        parent=normal_style,
-        alignment=1,  # Center alignment
-    )
-    
-    footer_style = ParagraphStyle(
-        'FooterStyle',
-        parent=styles['Normal'],
-        fontSize=8,
-        textColor=colors.HexColor('#9b9b9b'),
-        alignment=1,  # Center alignment
-    )
-    
-    # Header with logo
-    # Add the shopping bag image to the header
-    try:
-        # Get the absolute path to the image
-        image_path = os.path.join(settings.BASE_DIR, 'static', 'media', 'shopping_bags.png')
-        if os.path.exists(image_path):
-            # Add image to the header
-            logo = Image(image_path, width=30, height=30)
-            logo.hAlign = 'LEFT'
-            
-            # Create a table to align the logo and text
-            header_data = [
-                [logo, Paragraph("ShopEase Invoice", title_style)],
-                ['', Paragraph("Professional E-commerce Invoice", subtitle_style)]
-            ]
-            
-            header_table = Table(header_data, colWidths=[40, 460])
-            header_table.setStyle(TableStyle([
-                ('ALIGN', (0, 0), (0, -1), 'LEFT'),
-                ('ALIGN', (1, 0), (1, -1), 'CENTER'),
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ]))
-            
-            elements.append(header_table)
-        else:
-            # Fallback if image is not found
-            elements.append(Paragraph("🛍️ ShopEase Invoice", title_style))
-            elements.append(Paragraph("Professional E-commerce Invoice", subtitle_style))
-    except:
-        # Fallback if there's any error with the image
-        elements.append(Paragraph("🛍️ ShopEase Invoice", title_style))
-        elements.append(Paragraph("Professional E-commerce Invoice", subtitle_style))
-    
-    elements.append(Spacer(1, 8))  # Further reduced spacing
-    
-    # Company Info and Invoice Header - More compact
-    header_data = [
-        [Paragraph("ShopEase", company_style), Paragraph("INVOICE", title_style)],
-        [Paragraph("Simple. Fast. Delightful.", company_subtitle_style), Paragraph("", normal_style)]
-    ]
-    
-    header_table = Table(header_data, colWidths=[300, 200])
-    header_table.setStyle(TableStyle([
-        ('ALIGN', (0, 0), (0, -1), 'LEFT'),
-        ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 0),
-        ('TOPPADDING', (0, 0), (-1, -1), 0),
-    ]))
-    
-    elements.append(header_table)
-    elements.append(Spacer(1, 12))  # Reduced spacing
-    
-    # Customer Greeting and Invoice Info - Enhanced greeting
-    customer_name = user.full_name or user.email
-    customer_info = Paragraph(f"<b>Hello, {customer_name}!</b><br/>Thank you for choosing ShopEase. We're delighted to serve you and hope you love your purchase!", normal_style)
-    order_info = Paragraph(f"<b>Order #{order.id}</b><br/>{order.created.strftime('%B %d, %Y')}", right_align_style)
-    
-    intro_data = [
-        [customer_info, order_info]
-    ]
-    
-    intro_table = Table(intro_data, colWidths=[300, 200])
-    intro_table.setStyle(TableStyle([
-        ('ALIGN', (0, 0), (0, -1), 'LEFT'),
-        ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-    ]))
-    
-    elements.append(intro_table)
-    elements.append(Spacer(1, 25))  # Adjusted spacing
-    
-    # Items table header
-    elements.append(Paragraph("Order Items", heading_style))
-    
-    # Items table
-    items_header = [
-        [Paragraph("Item Description", subheading_style), 
-         Paragraph("Item ID", subheading_style), 
-         Paragraph("Quantity", subheading_style), 
-         Paragraph("Subtotal", subheading_style)]
-    ]
-    
-    # Add items
-    items_data = []
-    for item in order.items.all():
-        items_data.append([
-            Paragraph(item.product.title, normal_style),
-            Paragraph(f"SE-{item.product.id}", normal_style),
-            Paragraph(str(item.quantity), center_align_style),
-            Paragraph(f"Rs. {item.get_cost()}", right_align_style)
-        ])
-    
-    # Combine header and items
-    all_items_data = items_header + items_data
-    
-    items_table = Table(all_items_data, colWidths=[250, 80, 80, 90])
-    items_table.setStyle(TableStyle([
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('ALIGN', (2, 0), (2, -1), 'CENTER'),
-        ('ALIGN', (3, 0), (3, -1), 'RIGHT'),
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 8),
-        ('LINEBELOW', (0, 0), (-1, 0), 1, colors.HexColor('#c8c3be')),
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#eeeeee')),
-    ]))
-    
-    elements.append(items_table)
-    elements.append(Spacer(1, 20))
-    
-    # Totals
-    subtotal = order.get_total_price
-    gst = subtotal * 0.18
-    total = subtotal + gst
-    
-    totals_data = [
-        ['', Paragraph("Subtotal", bold_style), Paragraph(f"Rs. {subtotal}", right_align_style)],
-        ['', Paragraph("Shipping & Handling", bold_style), Paragraph("Rs. 0.00", right_align_style)],
-        ['', Paragraph("GST (18%)", bold_style), Paragraph(f"Rs. {gst:.2f}", right_align_style)],
-        ['', Paragraph("Total", bold_style), Paragraph(f"Rs. {total:.2f}", right_align_style)]
-    ]
-    
-    totals_table = Table(totals_data, colWidths=[350, 100, 100])
-    totals_table.setStyle(TableStyle([
-        ('ALIGN', (1, 0), (1, -1), 'LEFT'),
-        ('ALIGN', (2, 0), (2, -1), 'RIGHT'),
-        ('FONTNAME', (1, 3), (2, 3), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 9),
-        ('LINEABOVE', (1, 2), (2, 2), 1, colors.HexColor('#1779ba')),
-        ('LINEBELOW', (1, 2), (2, 2), 1, colors.HexColor('#1779ba')),
-        ('LINEABOVE', (1, 3), (2, 3), 1, colors.black),
-        ('LINEBELOW', (1, 3), (2, 3), 1, colors.black),
-        ('LINEWIDTH', (1, 3), (2, 3), 2),
-    ]))
-    
-    elements.append(totals_table)
-    elements.append(Spacer(1, 30))
-    
-    # Additional Information Header
-    elements.append(Paragraph("Additional Information", heading_style))
-    elements.append(Spacer(1, 10))
-    
-    # Get the delivery address if available, otherwise use default user info
-    if order.delivery_address:
-        billing_name = order.delivery_address.full_name
-        billing_phone = order.delivery_address.phone_number
-        billing_address = f"{order.delivery_address.street_address} {order.delivery_address.city}, {order.delivery_address.state} {order.delivery_address.postal_code} {order.delivery_address.country}"
-    else:
-        billing_name = user.full_name or user.email
-        billing_phone = "+91 89712 78930"
-        billing_address = "123 Shopping Street Retail City, 560032 India"
-    
-    # Billing Information
-    elements.append(Paragraph("Billing Information", subheading_style))
-    elements.append(Paragraph(billing_name, normal_style))
-    elements.append(Paragraph(billing_phone, normal_style))
-    elements.append(Paragraph(billing_address, normal_style))
-    elements.append(Spacer(1, 15))
-    
-    # Payment Information
-    elements.append(Paragraph("Payment Information", subheading_style))
-    
-    # Determine payment method from the order
-    if order.payment_method == 'cod':
-        payment_method = "Cash on Delivery"
-        transaction_id = f"COD-SE-{order.id}{order.created.strftime('%Y%m%d')}"
-        payment_status = "Unpaid (COD)"
-    elif order.payment_method == 'paypal':
-        payment_method = "PayPal"
-        transaction_id = f"TXN-SE-{order.id}{order.created.strftime('%Y%m%d')}"
-        payment_status = "Paid"
-    elif order.payment_method == 'upi':
-        payment_method = "UPI"
-        transaction_id = f"TXN-SE-{order.id}{order.created.strftime('%Y%m%d')}"
-        payment_status = "Paid"
-    else:
-        payment_method = "Credit/Debit Card"
-        transaction_id = f"TXN-SE-{order.id}{order.created.strftime('%Y%m%d')}"
-        payment_status = "Paid"
-    
-    amount_paid = f"Rs. {total:.2f}"
-    
-    elements.append(Paragraph(f"Method: {payment_method}", normal_style))
-    elements.append(Paragraph(f"Transaction ID: {transaction_id}", normal_style))
-    elements.append(Paragraph(f"Amount: {amount_paid}", normal_style))
-    elements.append(Paragraph(f"Status: {payment_status}", normal_style))
-    elements.append(Spacer(1, 30))
-    
-    # Footer
-    elements.append(Paragraph("ShopEase E-commerce Platform support@shopease.com +91 89712 78930", footer_style))
-    elements.append(Paragraph("123 Shopping Street, Retail City, 560032, India", footer_style))
-    elements.append(Spacer(1, 10))
-    elements.append(Paragraph("Thank you for your business!", center_align_style))
-    
-    # Build PDF
-    doc.build(elements)
-    
-    # Reset buffer position to beginning
-    buffer.seek(0)
-    
-    return buffer
+    return get_renderer().render(user, order)
 
 
 @login_required
@@ -592,14 +210,12 @@ def order_tracking(request, order_id):
 def cancel_order(request, order_id):
     order = get_object_or_404(Order, id=order_id, user=request.user)
     
-    # Check if order can be cancelled (not already cancelled or delivered)
-    if order.status not in [Order.CANCELLED, Order.DELIVERED]:
-        order.status = Order.CANCELLED
-        order.save()
-        
-        # Send cancellation email
-        send_cancellation_email(request, order)
-        
+    # Locks the order, releases its stock, moves it in the sales rollup and
+    # queues the cancellation email, all only if it can still be cancelled
+    cancelled = transition_orders(
+        Order.objects.filter(pk=order.pk), Order.CANCELLED, request.build_absolute_uri('/')[:-1]
+    )
+    if cancelled:
         messages.success(request, 'Your order has been successfully cancelled.')
     else:
         messages.error(request, 'This order cannot be cancelled.')
@@ -607,8 +223,8 @@ def cancel_order(request, order_id):
     return redirect('orders:user_orders')
 
 
-def send_cancellation_email(request, order):
-    """Send order cancellation email to the user"""
+def send_cancellation_email(order, base_url):
+    """Send order cancellation email to the user; base_url has no trailing slash"""
     subject = '🛍️ Order Cancelled - ShopEase'
     
     # Calculate refund amount (full amount in this case)
@@ -618,9 +234,6 @@ def send_cancellation_email(request, order):
     items = order.items.all()
     items_list = ", ".join([f"{item.product.title} (x{item.quantity})" for item in items])
     
-    # Get the base URL for links
-    base_url = request.build_absolute_uri('/')[:-1]  # Remove trailing slash
-    
     # Render HTML email
     html_message = f"""
     <!doctype html>
@@ -750,19 +363,31 @@ def send_cancellation_email(request, order):
     ShopEase · 123 Shopping Street, Retail City, 560032
     """
     
-    # Send email
+    # Queue email
     try:
-        email = EmailMultiAlternatives(
-            subject,
-            plain_message,
-            settings.DEFAULT_FROM_EMAIL,
-            [order.user.email]
-        )
-        email.attach_alternative(html_message, "text/html")
-        email.send()
-    except Exception as e:
+        queue_email(subject, plain_message, [order.user.email], html_body=html_message)
+    except Exception:
         # Log the error but don't fail the cancellation
-        print(f"Failed to send cancellation email: {e}")
+        logger.exception('Failed to queue cancellation email for order %s', order.id)
+
+
+def send_status_update_email(order, base_url):
+    """Tell the user their order was shipped or delivered"""
+    status = order.get_status_display().lower()
+    subject = f'🛍️ Order #{order.id} {status} - ShopEase'
+    plain_message = f"""
+    Hi {order.user.full_name},
+    
+    Your order #{order.id} placed on {order.created.strftime('%B %d, %Y')} has been {status}.
+    
+    Track your order: {base_url}{reverse('orders:order_tracking', args=[order.id])}
+    
+    Thank you for shopping with ShopEase.
+    """
+    try:
+        queue_email(subject, plain_message, [order.user.email])
+    except Exception:
+        logger.exception('Failed to queue status update email for order %s', order.id)
 
 
 @login_required
@@ -770,73 +395,60 @@ def invoice_detail(request, order_id):
     order = get_object_or_404(Order, id=order_id, user=request.user)
     items = order.items.all()
     
-    # Calculate GST and total
-    subtotal = order.get_total_price
-    gst = subtotal * 0.18
-    total = subtotal + gst
-    
     context = {
         'title': 'Invoice Details',
         'order': order,
         'items': items,
         'user': request.user,
-        'gst': gst,
-        'total': total
+        'gst': order.gst,
+        'total': order.total
     }
     return render(request, 'invoice_detail.html', context)
 
 
 @login_required
 def download_invoice(request, order_id):
-    """Download invoice as PDF"""
+    """Download invoice as PDF, served from the invoice cache when possible"""
+    orders = Order.objects.select_related('user', 'delivery_address')
+    # Customers get their own invoices; managers any
+    if not request.user.is_manager:
+        orders = orders.filter(user=request.user)
+    order = get_object_or_404(orders, id=order_id)
     try:
-        print(f"Attempting to download invoice for order {order_id}")
-        # Get the order
-        order = get_object_or_404(Order, id=order_id)
-        # Get the user from the order
-        user = order.user
-        items = order.items.all()
-        
-        # Calculate GST and total
-        subtotal = order.get_total_price
-        gst = subtotal * 0.18
-        total = subtotal + gst
-        
-        print(f"Found order {order.id} for user {user.email}")
-        
-        # Generate PDF using ReportLab with our modern design
-        pdf_buffer = generate_modern_invoice_pdf(user, order)
-        
-        # Create response
-        response = HttpResponse(pdf_buffer.getvalue(), content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="invoice-{order.id}.pdf"'
-        print("Response created successfully")
-        
+        path, version, _ = invoice_cache.get_or_render(order, render_invoice)
+        try:
+            invoice = open(path, 'rb')
+        except FileNotFoundError:
+            # Evicted between the lookup and the open; render it again
+            path, version, _ = invoice_cache.get_or_render(order, render_invoice)
+            invoice = open(path, 'rb')
+        etag = f'"{version}"'
+        # From the open file, which stays readable even if it is evicted now
+        last_modified = int(os.fstat(invoice.fileno()).st_mtime)
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = FileResponse(
+                invoice, as_attachment=True,
+                filename=f'invoice-{order.id}.pdf', content_type='application/pdf'
+            )
+        else:
+            invoice.close()
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        # The invoice changes with the order, so clients must revalidate
+        patch_cache_control(response, private=True, no_cache=True)
         return response
     except Exception as e:
-        print(f"Error generating invoice: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception('Failed to generate invoice for order %s', order_id)
         
         # Try to return a simple PDF with error message
         try:
-            buffer = BytesIO()
-            doc = SimpleDocTemplate(buffer, pagesize=letter)
-            elements = []
-            styles = getSampleStyleSheet()
-            
-            elements.append(Paragraph("Invoice Download Error", styles['Title']))
-            elements.append(Spacer(1, 12))
-            elements.append(Paragraph(f"Could not generate invoice for order {order_id}", styles['Normal']))
-            elements.append(Paragraph(f"Error: {str(e)}", styles['Normal']))
-            
-            doc.build(elements)
-            buffer.seek(0)
-            
+            buffer = get_renderer().render_error(order_id, e)
             response = HttpResponse(buffer.getvalue(), content_type='application/pdf')
             response['Content-Disposition'] = f'attachment; filename="error-invoice-{order_id}.pdf"'
             return response
-        except Exception as e2:
-            print(f"Error generating error PDF: {e2}")
+        except Exception:
+            logger.exception('Failed to generate error PDF for order %s', order_id)
             # Final fallback - return a simple text response
             return HttpResponse(f"Error generating invoice: {str(e)}".encode('utf-8'), content_type='text/plain')
@@ -0,0 +1,12 @@
+from django.contrib import admin
+
+from .models import OutgoingEmail
+
+
+@admin.register(OutgoingEmail)
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    list_display = ('id', 'to', 'subject', 'status', 'attempts', 'run_at', 'sent_at')
+    list_filter = ('status',)
+    search_fields = ('to', 'subject', 'last_error')
+    exclude = ('attachments',)
+    readonly_fields = ('created', 'updated', 'sent_at', 'claimed_by', 'locked_at', 'last_error')
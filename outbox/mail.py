@@ -0,0 +1,145 @@
+"""Durable outbox for outgoing email.
+
+Views and jobs call queue_email(), which only inserts rows: one per
+recipient, so a bad address fails and retries on its own. The send_outbox
+command drains the table in batches over a single backend connection from
+get_connection(), reopening it every MESSAGES_PER_CONNECTION messages, and
+paces delivery to RATE_LIMIT messages per second to stay under the
+provider's quota. Messages are claimed, retried with backoff and requeued
+after a crash by jobs.queue, like jobs.
+"""
+import base64
+import smtplib
+import time
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.utils import timezone
+
+from jobs import queue
+
+from .models import OutgoingEmail
+
+# Messages per second; 0 disables pacing
+RATE_LIMIT = getattr(settings, 'OUTBOX_RATE_LIMIT', 10)
+MESSAGES_PER_CONNECTION = getattr(settings, 'OUTBOX_MESSAGES_PER_CONNECTION', 100)
+
+
+def queue_email(subject, body, recipients, html_body='', from_email=None, attachments=()):
+    """Queue a message for every recipient and return the created rows.
+
+    attachments is an iterable of (filename, content bytes, mimetype).
+    """
+    encoded = [
+        {'filename': filename, 'mimetype': mimetype, 'content': base64.b64encode(content).decode()}
+        for filename, content, mimetype in attachments
+    ]
+    return OutgoingEmail.objects.bulk_create([
+        OutgoingEmail(
+            to=recipient, from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+            subject=subject[:255], body=body, html_body=html_body, attachments=encoded,
+        )
+        for recipient in recipients
+    ])
+
+
+def requeue_stale():
+    return queue.requeue_stale(OutgoingEmail)
+
+
+def claim(limit):
+    """Take up to limit due messages for this sender, oldest first."""
+    return queue.claim(limit, OutgoingEmail)
+
+
+def build_message(email, connection):
+    message = EmailMultiAlternatives(
+        email.subject, email.body, email.from_email, [email.to], connection=connection
+    )
+    if email.html_body:
+        message.attach_alternative(email.html_body, 'text/html')
+    for attachment in email.attachments:
+        message.attach(
+            attachment['filename'], base64.b64decode(attachment['content']), attachment['mimetype']
+        )
+    return message
+
+
+class Sender:
+    """Sends claimed messages over one reused backend connection."""
+
+    def __init__(self, backend=None, rate_limit=RATE_LIMIT, per_connection=MESSAGES_PER_CONNECTION):
+        self.connection = get_connection(backend)
+        self.interval = 1 / rate_limit if rate_limit else 0
+        self.per_connection = per_connection
+        self.is_open = False
+        self.sent_on_connection = 0
+        self.next_slot = 0
+        self.connections_opened = 0
+
+    def open(self):
+        if self.is_open and self.sent_on_connection < self.per_connection:
+            return
+        self.close()
+        self.connection.open()
+        self.is_open = True
+        self.sent_on_connection = 0
+        self.connections_opened += 1
+
+    def close(self):
+        if self.is_open:
+            try:
+                self.connection.close()
+            except Exception:
+                pass
+            self.is_open = False
+
+    def _throttle(self):
+        if not self.interval:
+            return
+        now = time.monotonic()
+        if self.next_slot > now:
+            time.sleep(self.next_slot - now)
+        self.next_slot = max(now, self.next_slot) + self.interval
+
+    def _deliver(self, email):
+        self.open()
+        self._throttle()
+        self.connection.send_messages([build_message(email, self.connection)])
+        self.sent_on_connection += 1
+
+    def send_batch(self, emails):
+        """Send claimed emails; return (sent, failed) counts.
+
+        If the backend cannot be reached at all, the unsent part of the
+        batch goes back to the queue untouched and the error is raised.
+        """
+        sent_ids = []
+        failed = 0
+        try:
+            for index, email in enumerate(emails):
+                try:
+                    self.open()
+                except Exception:
+                    queue.release(emails[index:])
+                    raise
+                try:
+                    try:
+                        self._deliver(email)
+                    except smtplib.SMTPServerDisconnected:
+                        # The server dropped an idle or overused session; one fresh try
+                        self.close()
+                        self._deliver(email)
+                except smtplib.SMTPRecipientsRefused as e:
+                    # Retrying a rejected address will not help
+                    queue.failed(email, repr(e), permanent=True)
+                    failed += 1
+                except Exception as e:
+                    self.close()
+                    queue.failed(email, repr(e))
+                    failed += 1
+                else:
+                    sent_ids.append(email.pk)
+        finally:
+            queue.finish(OutgoingEmail, sent_ids, sent_at=timezone.now())
+        return len(sent_ids), failed
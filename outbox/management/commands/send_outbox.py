@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from outbox.mail import RATE_LIMIT, Sender, claim, requeue_stale
+
+
+class Command(BaseCommand):
+    help = 'Send queued emails in batches over a reused mail connection'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--rate', type=float, default=RATE_LIMIT,
+                            help='Maximum messages per second, 0 for no limit')
+        parser.add_argument('--backend', help='Email backend to send with instead of EMAIL_BACKEND')
+        parser.add_argument('--poll-interval', type=float, default=5.0,
+                            help='Seconds to sleep when the outbox is empty')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit once no due emails are left instead of polling')
+
+    def handle(self, *args, **options):
+        sender = Sender(options['backend'], rate_limit=options['rate'])
+        requeue_stale()
+        try:
+            while True:
+                emails = claim(options['batch_size'])
+                if not emails:
+                    # Do not hold an SMTP session open while idle
+                    sender.close()
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    requeue_stale()
+                    continue
+                try:
+                    sent, failed = sender.send_batch(emails)
+                except Exception as e:
+                    self.stderr.write(f'Mail backend unavailable: {e}')
+                    if options['once']:
+                        raise
+                    time.sleep(options['poll_interval'])
+                    continue
+                self.stdout.write(f'Sent {sent}, failed {failed} ({sender.connections_opened} connections opened so far)')
+        finally:
+            sender.close()
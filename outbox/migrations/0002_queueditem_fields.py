@@ -0,0 +1,61 @@
+# Generated by Django 4.2.11 on 2026-10-17 07:45
+
+from django.db import migrations, models
+
+# Old outbox statuses -> the shared jobs.queue ones
+STATUSES = {'sending': 'running', 'sent': 'done', 'failed': 'dead'}
+
+
+def rename_statuses(apps, schema_editor):
+    OutgoingEmail = apps.get_model('outbox', 'OutgoingEmail')
+    for old, new in STATUSES.items():
+        OutgoingEmail.objects.filter(status=old).update(status=new)
+
+
+def restore_statuses(apps, schema_editor):
+    OutgoingEmail = apps.get_model('outbox', 'OutgoingEmail')
+    for old, new in STATUSES.items():
+        OutgoingEmail.objects.filter(status=new).update(status=old)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('outbox', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='outgoingemail',
+            options={'ordering': ('run_at', 'id')},
+        ),
+        migrations.RemoveIndex(
+            model_name='outgoingemail',
+            name='outbox_due_idx',
+        ),
+        migrations.RenameField(
+            model_name='outgoingemail',
+            old_name='claimed_at',
+            new_name='locked_at',
+        ),
+        migrations.RenameField(
+            model_name='outgoingemail',
+            old_name='send_after',
+            new_name='run_at',
+        ),
+        migrations.AddField(
+            model_name='outgoingemail',
+            name='updated',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AlterField(
+            model_name='outgoingemail',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('running', 'Sending'), ('done', 'Sent'), ('dead', 'Failed')], default='pending', max_length=10),
+        ),
+        migrations.RunPython(rename_statuses, restore_statuses),
+        migrations.AddIndex(
+            model_name='outgoingemail',
+            index=models.Index(fields=['status', 'run_at'], name='outbox_due_idx'),
+        ),
+    ]
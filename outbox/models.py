@@ -0,0 +1,39 @@
+from django.db import models
+
+from jobs.models import QueuedItem
+
+
+class OutgoingEmail(QueuedItem):
+    """One message to one recipient, waiting to be sent by send_outbox.
+
+    Queued, claimed and retried by jobs.queue like a job; run_at is when
+    it may be sent.
+    """
+    SENDING = QueuedItem.RUNNING
+    SENT = QueuedItem.DONE
+    FAILED = QueuedItem.DEAD
+
+    STATUS_CHOICES = [
+        (QueuedItem.PENDING, 'Pending'),
+        (SENDING, 'Sending'),
+        (SENT, 'Sent'),
+        (FAILED, 'Failed'),
+    ]
+
+    to = models.EmailField(max_length=254)
+    from_email = models.CharField(max_length=254)
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    html_body = models.TextField(blank=True)
+    # [{"filename": ..., "mimetype": ..., "content": <base64>}, ...]
+    attachments = models.JSONField(default=list, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QueuedItem.PENDING)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta(QueuedItem.Meta):
+        indexes = [
+            models.Index(fields=['status', 'run_at'], name='outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} to {self.to} ({self.status})"
@@ -0,0 +1,54 @@
+import smtplib
+
+from django.core import mail
+from django.core.mail.backends.base import BaseEmailBackend
+from django.test import TestCase
+from django.utils import timezone
+
+from .mail import Sender, claim, queue_email
+from .models import OutgoingEmail
+
+
+class RefusingBackend(BaseEmailBackend):
+    def send_messages(self, messages):
+        raise smtplib.SMTPRecipientsRefused({messages[0].to[0]: (550, b'No such user')})
+
+
+class BrokenBackend(BaseEmailBackend):
+    def send_messages(self, messages):
+        raise OSError('Connection reset')
+
+
+class OutboxTests(TestCase):
+    def send(self, backend=None):
+        sender = Sender(backend, rate_limit=0)
+        try:
+            return sender.send_batch(claim(10))
+        finally:
+            sender.close()
+
+    def test_one_row_per_recipient_delivered_with_attachment(self):
+        queue_email(
+            'Invoice', 'Your invoice', ['a@example.com', 'b@example.com'],
+            attachments=[('invoice.pdf', b'%PDF-1.4', 'application/pdf')],
+        )
+        self.assertEqual(self.send(), (2, 0))
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), ['a@example.com', 'b@example.com'])
+        self.assertEqual(mail.outbox[0].attachments, [('invoice.pdf', b'%PDF-1.4', 'application/pdf')])
+        self.assertFalse(OutgoingEmail.objects.exclude(status=OutgoingEmail.SENT).exists())
+        self.assertEqual(claim(10), [])
+
+    def test_failed_delivery_is_retried_later(self):
+        queue_email('Hello', 'Hi', ['a@example.com'])
+        self.assertEqual(self.send('outbox.tests.BrokenBackend'), (0, 1))
+        email = OutgoingEmail.objects.get()
+        self.assertEqual((email.status, email.attempts), (OutgoingEmail.PENDING, 1))
+        self.assertGreater(email.run_at, timezone.now())
+        self.assertIn('Connection reset', email.last_error)
+        # Not due yet
+        self.assertEqual(claim(10), [])
+
+    def test_refused_recipient_is_not_retried(self):
+        queue_email('Hello', 'Hi', ['nobody@example.com'])
+        self.assertEqual(self.send('outbox.tests.RefusingBackend'), (0, 1))
+        self.assertEqual(OutgoingEmail.objects.get().status, OutgoingEmail.FAILED)
@@ -1,4 +1,10 @@
 from django.apps import AppConfig
+from django.utils.module_loading import autodiscover_modules
+
 
 class SecurityScannerConfig(AppConfig):
-    name = 'security_scanner'
\ No newline at end of file
+    name = 'security_scanner'
+
+    def ready(self):
+        # Each app registers its checks in a security_checks.py module
+        autodiscover_modules('security_checks')
@@ -0,0 +1,95 @@
+"""Stored scan runs, incremental re-scans and diffs between runs.
+
+scan() runs the checks, passing each check's latest stored result so the
+registry can reuse those whose fingerprint still matches, and saves the
+run with one row per check. A reused result keeps the time its check last
+actually ran; once that is older than MAX_REUSE_AGE the check runs again
+whatever its fingerprint, which catches data changes a cheap inputs()
+summary cannot see. Only the newest KEEP_RUNS runs are kept.
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from . import registry
+from .models import CheckResult, ScanRun
+
+MAX_REUSE_AGE = timedelta(seconds=getattr(settings, 'SECURITY_SCANNER_MAX_REUSE_SECONDS', 24 * 60 * 60))
+KEEP_RUNS = getattr(settings, 'SECURITY_SCANNER_KEEP_RUNS', 1000)
+
+
+def latest_results():
+    """Return {key: result dict} with the newest reusable stored result per check."""
+    # One row per key from the (key, id) index
+    newest = CheckResult.objects.values('key').annotate(last=Max('id')).values('last')
+    rows = CheckResult.objects.filter(
+        pk__in=newest, error=False, checked_at__gte=timezone.now() - MAX_REUSE_AGE
+    )
+    return {row.key: row.as_dict() for row in rows}
+
+
+def scan(keys=None, trigger=ScanRun.WEB, incremental=True, use_cache=True, workers=registry.WORKERS):
+    """Run the checks, store the run and return (run, results)."""
+    began = time.perf_counter()
+    results = registry.run_checks(
+        keys, use_cache=use_cache, workers=workers,
+        previous=latest_results() if incremental else None,
+    )
+    stats = registry.summarize(results)
+    with transaction.atomic():
+        run = ScanRun.objects.create(
+            trigger=trigger, partial=keys is not None, stats=stats,
+            duration_ms=int((time.perf_counter() - began) * 1000),
+            checks_run=len([r for r in results if not r['reused']]),
+            checks_reused=len([r for r in results if r['reused']]),
+        )
+        CheckResult.objects.bulk_create([
+            CheckResult(
+                run=run, key=r['key'], test=r['test'], status=r['status'], risk=r['risk'],
+                details=r['details'], error=r.get('error', False), fingerprint=r['fingerprint'],
+                reused=r['reused'], checked_at=r['checked_at'], findings=r.get('findings', []),
+            )
+            for r in results
+        ])
+    prune()
+    return run, results
+
+
+def prune(keep=KEEP_RUNS):
+    """Delete all but the newest keep runs; return how many went."""
+    cutoff = list(ScanRun.objects.order_by('-id').values_list('id', flat=True)[keep:keep + 1])
+    if not cutoff:
+        return 0
+    _, deleted = ScanRun.objects.filter(id__lte=cutoff[0]).delete()
+    return deleted.get(ScanRun._meta.label, 0)
+
+
+def previous_run(run):
+    return ScanRun.objects.filter(id__lt=run.id).order_by('-id').first()
+
+
+def diff(run, against):
+    """Compare run with an earlier run; return a list of changed checks.
+
+    Each entry has key, test, change ('added', 'removed' or 'changed') and
+    the before and after results (None where missing). Checks missing from
+    a partial run are not reported as removed.
+    """
+    before = {result.key: result for result in against.results.all()}
+    after = {result.key: result for result in run.results.all()}
+    changes = []
+    for key, result in after.items():
+        old = before.get(key)
+        if old is None:
+            changes.append({'key': key, 'test': result.test, 'change': 'added', 'before': None, 'after': result})
+        elif (old.status, old.risk, old.details) != (result.status, result.risk, result.details):
+            changes.append({'key': key, 'test': result.test, 'change': 'changed', 'before': old, 'after': result})
+    if not run.partial and not against.partial:
+        for key, result in before.items():
+            if key not in after:
+                changes.append({'key': key, 'test': result.test, 'change': 'removed', 'before': result, 'after': None})
+    return changes
@@ -0,0 +1,29 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+
+from security_scanner import query_lint, registry
+
+
+class Command(BaseCommand):
+    help = ('Look through templates and views for relations read inside loops without '
+            'select_related/prefetch_related (possible N+1 queries)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--json', action='store_true', help='Print findings in the scanner result format')
+
+    def handle(self, *args, **options):
+        began = time.perf_counter()
+        template_findings, view_findings = query_lint.lint()
+        findings = template_findings + view_findings
+        elapsed = time.perf_counter() - began
+
+        if options['json']:
+            self.stdout.write(json.dumps({'results': findings, 'stats': registry.summarize(findings)}, indent=2))
+            return
+        for finding in findings:
+            self.stdout.write(f"{finding['file']}:{finding['line']}: {finding['details']}")
+        self.stdout.write(
+            f'{len(template_findings)} in templates, {len(view_findings)} in views ({elapsed:.2f}s)'
+        )
@@ -0,0 +1,53 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from security_scanner import query_probe
+
+
+class Command(BaseCommand):
+    help = ('Request every page of the shop on a seeded throwaway database and rank them by SQL '
+            'queries; exits with an error if a page is over its query budget')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--namespace', action='append', dest='namespaces', metavar='APP',
+                            help=f"Profile only this URL namespace; repeatable (default: {', '.join(query_probe.APPS)})")
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--repeat', type=int, default=3, help='Requests per URL; times are the median')
+        parser.add_argument('--products', type=int, default=40)
+        parser.add_argument('--orders', type=int, default=20)
+        parser.add_argument('--items', type=int, default=5, help='Items per seeded order')
+        parser.add_argument('--no-save', action='store_true', help='Print the profile without storing it')
+        parser.add_argument('--json', action='store_true')
+
+    def handle(self, *args, **options):
+        began = time.perf_counter()
+        results = query_probe.profile(
+            options['namespaces'] or query_probe.APPS, workers=options['workers'], repeat=max(options['repeat'], 1),
+            products=options['products'], orders=options['orders'], items=options['items'],
+        )
+        duration_ms = int((time.perf_counter() - began) * 1000)
+        results.sort(key=lambda result: (-result['queries'], -result['total_ms']))
+        over = [r for r in results if not r['error'] and r['queries'] > query_probe.budget_for(r['name'])]
+
+        if options['json']:
+            self.stdout.write(json.dumps({'results': results, 'over_budget': [r['name'] for r in over]}, indent=2))
+        else:
+            self.stdout.write(f"{'queries':>7} {'similar':>7} {'dup':>4} {'sql ms':>8} {'render ms':>9} "
+                              f"{'total ms':>8} {'status':>6}  url")
+            for r in results:
+                if r['error']:
+                    self.stdout.write(self.style.WARNING(f"{'':>56}  {r['name']}: {r['error']}"))
+                    continue
+                line = (f"{r['queries']:>7} {r['similar']:>7} {r['duplicates']:>4} {r['sql_ms']:>8.1f} "
+                        f"{r['render_ms']:>9.1f} {r['total_ms']:>8.1f} {r['status_code']:>6}  {r['name']} {r['path']}")
+                self.stdout.write(self.style.ERROR(line) if r in over else line)
+        if not options['no_save']:
+            run = query_probe.save(
+                results, duration_ms=duration_ms, workers=options['workers'], repeat=options['repeat'],
+            )
+            if not options['json']:
+                self.stdout.write(f'Query profile #{run.pk}: {len(results)} URLs in {duration_ms}ms')
+        if over:
+            raise CommandError(f"{len(over)} pages over their query budget: {', '.join(r['name'] for r in over)}")
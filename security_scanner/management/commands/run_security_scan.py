@@ -0,0 +1,61 @@
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.management.base import BaseCommand, CommandError
+
+from security_scanner import history, registry
+from security_scanner.models import ScanRun
+
+
+class Command(BaseCommand):
+    help = ('Run the security scanner checks and store the run, reusing results whose inputs '
+            'are unchanged; exits with an error if any check fails')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='append', dest='checks', metavar='KEY',
+                            help='Run only this check (and what it depends on); repeatable')
+        parser.add_argument('--list', action='store_true', help='List the registered checks and exit')
+        parser.add_argument('--workers', type=int, default=registry.WORKERS)
+        parser.add_argument('--no-cache', action='store_true', help='Rerun cheap checks instead of reusing results')
+        parser.add_argument('--full', action='store_true',
+                            help='Run every check, ignoring stored results and the cache')
+        parser.add_argument('--json', action='store_true', help='Print the same JSON as the dashboard')
+
+    def handle(self, *args, **options):
+        if options['list']:
+            for check in registry.get_checks():
+                depends = f" after {', '.join(check.depends_on)}" if check.depends_on else ''
+                self.stdout.write(f'{check.key:<24} {check.cost:<10} {check.timeout:>4}s  {check.name}{depends}')
+            return
+        try:
+            run, results = history.scan(
+                options['checks'], trigger=ScanRun.COMMAND, incremental=not options['full'],
+                use_cache=not (options['no_cache'] or options['full']), workers=options['workers'],
+            )
+        except KeyError as e:
+            raise CommandError(e.args[0])
+        stats = run.stats
+        previous = history.previous_run(run)
+        changes = history.diff(run, previous) if previous else []
+
+        if options['json']:
+            self.stdout.write(json.dumps({'results': results, 'stats': stats}, indent=2, cls=DjangoJSONEncoder))
+        else:
+            for result in results:
+                reused = ' (reused)' if result['reused'] else ''
+                self.stdout.write(
+                    f"{result['status']:<8} {result['risk']:<9} {result['test']}: {result['details']}{reused}"
+                )
+                for finding in result.get('findings', []):
+                    self.stdout.write(f"    {finding['file']}:{finding['line']}: {finding['details']}")
+            for change in changes:
+                before = change['before'].status if change['before'] else 'none'
+                after = change['after'].status if change['after'] else 'none'
+                self.stdout.write(self.style.WARNING(f"{change['change']}: {change['test']} {before} -> {after}"))
+            self.stdout.write(
+                f"Scan #{run.pk}: {stats['total_tests']} checks in {run.duration_ms}ms "
+                f"({run.checks_run} run, {run.checks_reused} reused): {stats['passed']} passed, "
+                f"{stats['failed']} failed, {stats['warnings']} warnings, {stats['info']} info"
+            )
+        if stats['failed']:
+            raise CommandError(f"{stats['failed']} security checks failed")
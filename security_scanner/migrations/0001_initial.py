@@ -0,0 +1,51 @@
+# Generated by Django 4.2.11 on 2026-10-17 07:19
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScanRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('trigger', models.CharField(choices=[('web', 'Dashboard'), ('command', 'Management command')], default='web', max_length=10)),
+                ('partial', models.BooleanField(default=False)),
+                ('duration_ms', models.PositiveIntegerField(default=0)),
+                ('checks_run', models.PositiveIntegerField(default=0)),
+                ('checks_reused', models.PositiveIntegerField(default=0)),
+                ('stats', models.JSONField(default=dict)),
+            ],
+            options={
+                'ordering': ('-id',),
+            },
+        ),
+        migrations.CreateModel(
+            name='CheckResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=100)),
+                ('test', models.CharField(max_length=200)),
+                ('status', models.CharField(max_length=10)),
+                ('risk', models.CharField(max_length=10)),
+                ('details', models.TextField()),
+                ('error', models.BooleanField(default=False)),
+                ('fingerprint', models.CharField(blank=True, max_length=64)),
+                ('reused', models.BooleanField(default=False)),
+                ('checked_at', models.DateTimeField()),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='results', to='security_scanner.scanrun')),
+            ],
+            options={
+                'ordering': ('id',),
+                'indexes': [models.Index(fields=['key', 'id'], name='scanner_result_key_idx')],
+            },
+        ),
+    ]
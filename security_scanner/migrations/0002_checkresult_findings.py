@@ -0,0 +1,18 @@
+# Generated by Django 4.2.11 on 2026-10-17 07:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('security_scanner', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='checkresult',
+            name='findings',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
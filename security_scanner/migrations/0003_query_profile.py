@@ -0,0 +1,54 @@
+# Generated by Django 4.2.11 on 2026-10-17 07:34
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('security_scanner', '0002_checkresult_findings'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProfileRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('duration_ms', models.PositiveIntegerField(default=0)),
+                ('workers', models.PositiveIntegerField(default=0)),
+                ('repeat', models.PositiveIntegerField(default=0)),
+                ('urls', models.PositiveIntegerField(default=0)),
+                ('over_budget', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ('-id',),
+            },
+        ),
+        migrations.CreateModel(
+            name='ViewProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200)),
+                ('path', models.CharField(blank=True, max_length=255)),
+                ('view', models.CharField(max_length=255)),
+                ('role', models.CharField(max_length=10)),
+                ('status_code', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('queries', models.PositiveIntegerField(default=0)),
+                ('duplicates', models.PositiveIntegerField(default=0)),
+                ('similar', models.PositiveIntegerField(default=0)),
+                ('repeated_sql', models.TextField(blank=True)),
+                ('repeated_count', models.PositiveIntegerField(default=0)),
+                ('sql_ms', models.FloatField(default=0)),
+                ('render_ms', models.FloatField(default=0)),
+                ('total_ms', models.FloatField(default=0)),
+                ('budget', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='views', to='security_scanner.profilerun')),
+            ],
+            options={
+                'ordering': ('id',),
+            },
+        ),
+    ]
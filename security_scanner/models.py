@@ -0,0 +1,102 @@
+from django.db import models
+
+
+class ScanRun(models.Model):
+    WEB = 'web'
+    COMMAND = 'command'
+    TRIGGER_CHOICES = [(WEB, 'Dashboard'), (COMMAND, 'Management command')]
+
+    created = models.DateTimeField(auto_now_add=True)
+    trigger = models.CharField(max_length=10, choices=TRIGGER_CHOICES, default=WEB)
+    # Only some checks were asked for
+    partial = models.BooleanField(default=False)
+    duration_ms = models.PositiveIntegerField(default=0)
+    checks_run = models.PositiveIntegerField(default=0)
+    checks_reused = models.PositiveIntegerField(default=0)
+    stats = models.JSONField(default=dict)
+
+    class Meta:
+        ordering = ('-id',)
+
+    def __str__(self):
+        return f'Scan #{self.pk} at {self.created:%Y-%m-%d %H:%M}'
+
+
+class CheckResult(models.Model):
+    run = models.ForeignKey(ScanRun, on_delete=models.CASCADE, related_name='results')
+    key = models.CharField(max_length=100)
+    test = models.CharField(max_length=200)
+    status = models.CharField(max_length=10)
+    risk = models.CharField(max_length=10)
+    details = models.TextField()
+    error = models.BooleanField(default=False)
+    fingerprint = models.CharField(max_length=64, blank=True)
+    # Copied from an earlier run instead of running the check again
+    reused = models.BooleanField(default=False)
+    # When the check actually ran; kept when the result is reused
+    checked_at = models.DateTimeField()
+    # Per-location results, for checks such as the query lint that report many
+    findings = models.JSONField(default=list, blank=True)
+
+    class Meta:
+        ordering = ('id',)
+        indexes = [models.Index(fields=['key', 'id'], name='scanner_result_key_idx')]
+
+    def __str__(self):
+        return f'{self.test}: {self.status}'
+
+    def as_dict(self):
+        return {
+            'key': self.key, 'test': self.test, 'status': self.status, 'risk': self.risk,
+            'details': self.details, 'error': self.error, 'fingerprint': self.fingerprint,
+            'reused': self.reused, 'checked_at': self.checked_at, 'findings': self.findings,
+        }
+
+
+class ProfileRun(models.Model):
+    """One run of the URL query probe (see query_probe)."""
+    created = models.DateTimeField(auto_now_add=True)
+    duration_ms = models.PositiveIntegerField(default=0)
+    workers = models.PositiveIntegerField(default=0)
+    # Requests per URL; times are their median
+    repeat = models.PositiveIntegerField(default=0)
+    urls = models.PositiveIntegerField(default=0)
+    over_budget = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ('-id',)
+
+    def __str__(self):
+        return f'Query profile #{self.pk} at {self.created:%Y-%m-%d %H:%M}'
+
+
+class ViewProfile(models.Model):
+    run = models.ForeignKey(ProfileRun, on_delete=models.CASCADE, related_name='views')
+    name = models.CharField(max_length=200)
+    path = models.CharField(max_length=255, blank=True)
+    view = models.CharField(max_length=255)
+    role = models.CharField(max_length=10)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    queries = models.PositiveIntegerField(default=0)
+    # The same SQL and parameters run again
+    duplicates = models.PositiveIntegerField(default=0)
+    # The same SQL with other parameters
+    similar = models.PositiveIntegerField(default=0)
+    repeated_sql = models.TextField(blank=True)
+    repeated_count = models.PositiveIntegerField(default=0)
+    sql_ms = models.FloatField(default=0)
+    render_ms = models.FloatField(default=0)
+    total_ms = models.FloatField(default=0)
+    budget = models.PositiveIntegerField(default=0)
+    # Why the URL could not be profiled
+    error = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ('id',)
+
+    def __str__(self):
+        return f'{self.name}: {self.queries} queries'
+
+    @property
+    def over_budget(self):
+        return not self.error and self.queries > self.budget
@@ -0,0 +1,548 @@
+"""Static N+1 query lint over the project's templates and views.
+
+Nothing is rendered or imported beyond the models: templates are read with
+Django's template lexer and view modules with ast. A finding is a related
+object or manager reached from a loop variable, once per iteration, when
+the queryset being looped over does not select_related/prefetch_related
+that relation:
+
+- in templates, ``{{ item.product.title }}`` or ``{% for i in order.items.all %}``
+  inside a ``{% for %}``, and model methods that read a relation, such as a
+  ``get_total`` summing ``self.items.all()``;
+- in views, the same inside ``for`` loops and comprehensions over
+  ``Model.objects...`` querysets.
+
+A template loop over a context variable is checked against the queryset
+the rendering view puts in that variable, found from the render() calls in
+the view modules. Where the lint cannot tell what a loop variable holds it
+only flags names that are relations on the project's models, and managers
+only when one of their methods is called, as in ``x.items.all``.
+
+lint() returns findings in the scanner's result format plus file and line.
+"""
+import ast
+import inspect
+import re
+import textwrap
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.template.base import Lexer, TokenType
+
+MANAGER_METHODS = {
+    'all', 'count', 'exists', 'first', 'last', 'filter', 'exclude', 'order_by', 'values',
+    'values_list', 'aggregate', 'annotate', 'get', 'latest', 'earliest',
+}
+QUERYSET_METHODS = MANAGER_METHODS | {'select_related', 'prefetch_related', 'only', 'defer', 'distinct', 'reverse'}
+RENDER_FUNCTIONS = {'render', 'render_to_string', 'TemplateResponse', 'render_to_response'}
+
+FOR_TAG = re.compile(r'^for\s+(?P<targets>.+?)\s+in\s+(?P<iterable>\S+?)(?:\s+reversed)?$')
+DOTTED = re.compile(r'(?<![\w.])([A-Za-z_]\w*(?:\.\w+)+)')
+STRING = re.compile(r'"[^"]*"|\'[^\']*\'')
+
+
+class Relation:
+    def __init__(self, name, target, many):
+        self.name = name
+        self.target = target
+        self.many = many
+
+
+class Schema:
+    """Relations and relation-reading methods of every installed model."""
+
+    def __init__(self):
+        self.relations = {}
+        self.methods = {}
+        self.by_class_name = {}
+        # Relation names on project models, for loop variables of unknown type
+        self.single_names = set()
+        self.many_names = set()
+        base_dir = str(settings.BASE_DIR)
+        for model in apps.get_models():
+            relations = {}
+            for field in model._meta.get_fields():
+                if not field.is_relation or field.related_model is None:
+                    continue
+                if field.auto_created and not field.concrete:
+                    name = field.get_accessor_name()
+                    if not name or name.endswith('+'):
+                        continue
+                else:
+                    name = field.name
+                many = bool(field.one_to_many or field.many_to_many)
+                relations[name] = Relation(name, field.related_model, many)
+            self.relations[model] = relations
+            self.by_class_name.setdefault(model.__name__, []).append(model)
+            if inspect.getsourcefile(model).startswith(base_dir):
+                for name, relation in relations.items():
+                    (self.many_names if relation.many else self.single_names).add(name)
+                self.methods[model] = self._relation_methods(model, relations)
+
+    def _relation_methods(self, model, relations):
+        """Return {method name: relation} for argument-less methods reading a relation."""
+        try:
+            tree = ast.parse(textwrap.dedent(inspect.getsource(model)))
+        except (OSError, TypeError, SyntaxError):
+            return {}
+        methods = {}
+        for node in tree.body[0].body:
+            if not isinstance(node, ast.FunctionDef) or len(node.args.args) != 1:
+                continue
+            for inner in ast.walk(node):
+                if (isinstance(inner, ast.Attribute) and isinstance(inner.value, ast.Name)
+                        and inner.value.id == 'self' and inner.attr in relations):
+                    methods[node.name] = relations[inner.attr]
+                    break
+        return methods
+
+    def model_named(self, name):
+        models = self.by_class_name.get(name, [])
+        return models[0] if len(models) == 1 else None
+
+
+def _covered(prefetched, path):
+    return any(p == path or p.startswith(path + '__') for p in prefetched)
+
+
+def _join(path, name):
+    return f'{path}__{name}' if path else name
+
+
+def _finding(file, line, details, risk='low'):
+    return {
+        'key': 'n_plus_one', 'test': 'Possible N+1 query', 'status': 'WARNING',
+        'risk': risk, 'details': details, 'file': file, 'line': line,
+    }
+
+
+def walk_chain(schema, parts, model, path, prefetched, guess_single=True):
+    """Follow attribute names from an object of model (None if unknown).
+
+    For an unknown model, names of forward relations are only taken as
+    such when guess_single is true, i.e. the object is known to be a model
+    instance of some kind.
+
+    Returns (problems, model, path) where problems are (index into parts,
+    relation path, description) for relations that would query on every
+    iteration, and model and path describe what the chain ends on.
+    """
+    problems = []
+    for index, attr in enumerate(parts):
+        following = parts[index + 1] if index + 1 < len(parts) else None
+        if model is not None:
+            relation = schema.relations.get(model, {}).get(attr)
+            method = schema.methods.get(model, {}).get(attr)
+        else:
+            relation = method = None
+            if attr in schema.single_names and guess_single:
+                relation = Relation(attr, None, False)
+            elif attr in schema.many_names and following in MANAGER_METHODS:
+                relation = Relation(attr, None, True)
+        if relation is not None:
+            relation_path = _join(path, attr)
+            if not _covered(prefetched, relation_path) or (relation.many and following not in ('all', None)):
+                # Methods other than all() query again even when prefetched
+                kind = 'related manager' if relation.many else 'related object'
+                problems.append((index, relation_path, f'{kind} {attr}'))
+            if relation.many:
+                return problems, relation.target, relation_path
+            model, path = relation.target, relation_path
+            continue
+        if method is not None:
+            relation_path = _join(path, method.name)
+            if not _covered(prefetched, relation_path):
+                problems.append((index, relation_path, f'{attr}, which reads {method.name}'))
+        return problems, None, path
+    return problems, model, path
+
+
+# Views
+
+def _call_name(node):
+    if isinstance(node.func, ast.Attribute):
+        return node.func.attr
+    if isinstance(node.func, ast.Name):
+        return node.func.id
+    return None
+
+
+def _prefetches(node):
+    """Relation paths named in select_related/prefetch_related calls along a chain."""
+    paths = set()
+    while True:
+        if isinstance(node, ast.Call):
+            if _call_name(node) in ('select_related', 'prefetch_related'):
+                for arg in node.args:
+                    if isinstance(arg, ast.Constant) and isinstance(arg.value, str):
+                        paths.add(arg.value)
+                    elif (isinstance(arg, ast.Call) and _call_name(arg) == 'Prefetch' and arg.args
+                          and isinstance(arg.args[0], ast.Constant)):
+                        paths.add(arg.args[0].value)
+            node = node.func
+        elif isinstance(node, (ast.Attribute, ast.Subscript)):
+            node = node.value
+        else:
+            return paths
+
+
+class Queryset:
+    """Rows of model a view expression yields: one instance when single."""
+
+    def __init__(self, model, prefetched, line, single=False):
+        self.model = model
+        self.prefetched = prefetched
+        self.line = line
+        self.single = single
+
+
+def _relative(prefetched, name):
+    """Prefetch paths below relation name, as seen from its rows."""
+    return {path[len(name) + 2:] for path in prefetched if path.startswith(name + '__')}
+
+
+def _unchain(node):
+    """Split a.b(...).c into its root and the attribute names along it."""
+    names = []
+    while isinstance(node, (ast.Call, ast.Attribute, ast.Subscript)):
+        if isinstance(node, ast.Call):
+            if isinstance(node.func, ast.Name):
+                break
+            node = node.func
+        elif isinstance(node, ast.Attribute):
+            names.append(node.attr)
+            node = node.value
+        else:
+            node = node.value
+    names.reverse()
+    return node, names
+
+
+class ViewAnalyzer:
+    def __init__(self, schema, user_model):
+        self.schema = schema
+        self.user_model = user_model
+
+    def _root(self, node, assignments, depth):
+        if isinstance(node, ast.Name):
+            if node.id in assignments:
+                return self.resolve(assignments[node.id], assignments, depth + 1)
+            model = self.schema.model_named(node.id)
+            # A model class: only useful followed by .objects
+            return Queryset(model, set(), node.lineno, single=None) if model else None
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.args:
+            if node.func.id in ('get_object_or_404', 'get_list_or_404'):
+                found = self._root(node.args[0], assignments, depth)
+                if found is None:
+                    return None
+                return Queryset(found.model, found.prefetched, node.lineno, single=node.func.id == 'get_object_or_404')
+            if node.func.id == 'Paginator':
+                return self.resolve(node.args[0], assignments, depth + 1)
+        return None
+
+    def resolve(self, node, assignments, depth=0):
+        """Return a Queryset for an expression giving model rows or one instance, else None."""
+        if depth > 5:
+            return None
+        root, names = _unchain(node)
+        if isinstance(root, ast.Name) and root.id == 'request' and names[:1] == ['user']:
+            current = Queryset(self.user_model, set(), node.lineno, single=True)
+            names = names[1:]
+        else:
+            current = self._root(root, assignments, depth)
+        if current is None:
+            return None
+        if not names:
+            return current if current.single is not None else None
+        model, prefetched, single = current.model, current.prefetched | _prefetches(node), current.single
+        for name in names:
+            if single is None:
+                if name != 'objects':
+                    return None
+                single = False
+            elif single:
+                relation = self.schema.relations.get(model, {}).get(name)
+                if relation is None:
+                    return None
+                model, prefetched, single = relation.target, _relative(prefetched, name) | _prefetches(node), not relation.many
+            elif name in ('get', 'first', 'last', 'latest', 'earliest'):
+                single = True
+            elif name not in QUERYSET_METHODS | {'get_page', 'page', 'object_list', 'iterator'}:
+                return None
+        if single is None or model is None:
+            return None
+        return Queryset(model, prefetched, node.lineno, single)
+
+    def analyze(self, path, source):
+        """Return (findings, {template name: [(context, assignments, line)]})."""
+        findings = []
+        renders = {}
+        tree = ast.parse(source)
+        for function in ast.walk(tree):
+            if not isinstance(function, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                continue
+            assignments = {}
+            contexts = {}
+            for node in ast.walk(function):
+                if isinstance(node, ast.Assign) and len(node.targets) == 1:
+                    target = node.targets[0]
+                    if isinstance(target, ast.Name):
+                        assignments[target.id] = node.value
+                        if isinstance(node.value, ast.Dict):
+                            contexts[target.id] = node.value
+                    elif (isinstance(target, ast.Subscript) and isinstance(target.value, ast.Name)
+                          and isinstance(target.slice, ast.Constant)):
+                        contexts.setdefault(target.value.id, ast.Dict(keys=[], values=[]))
+                        contexts[target.value.id].keys.append(target.slice)
+                        contexts[target.value.id].values.append(node.value)
+            for node in ast.walk(function):
+                if isinstance(node, ast.For):
+                    findings += self.check_loop(path, node.target, node.iter, node.body, assignments)
+                elif isinstance(node, (ast.ListComp, ast.SetComp, ast.GeneratorExp, ast.DictComp)):
+                    body = [node.key, node.value] if isinstance(node, ast.DictComp) else [node.elt]
+                    for generator in node.generators:
+                        findings += self.check_loop(path, generator.target, generator.iter, body, assignments)
+                elif isinstance(node, ast.Call) and _call_name(node) in RENDER_FUNCTIONS:
+                    self._record_render(node, contexts, assignments, renders)
+        return findings, renders
+
+    def _record_render(self, call, contexts, assignments, renders):
+        args = list(call.args) + [keyword.value for keyword in call.keywords if keyword.arg in ('template_name', 'context')]
+        names = [arg.value for arg in args if isinstance(arg, ast.Constant) and isinstance(arg.value, str)]
+        context = next((arg for arg in args if isinstance(arg, ast.Dict)), None)
+        if context is None:
+            context = next((contexts[arg.id] for arg in args if isinstance(arg, ast.Name) and arg.id in contexts), None)
+        if not names or context is None:
+            return
+        variables = {}
+        for key, value in zip(context.keys, context.values):
+            if isinstance(key, ast.Constant) and isinstance(key.value, str):
+                queryset = self.resolve(value, assignments)
+                if queryset is not None:
+                    variables[key.value] = queryset
+        for name in names:
+            renders.setdefault(name, []).append(variables)
+
+    def check_loop(self, path, target, iterable, body, assignments):
+        if not isinstance(target, ast.Name):
+            return []
+        queryset = self.resolve(iterable, assignments)
+        if queryset is None or queryset.single:
+            return []
+        findings = []
+        reported = set()
+        for statement in body:
+            parents = {child: node for node in ast.walk(statement) for child in ast.iter_child_nodes(node)}
+            for node in ast.walk(statement):
+                if not (isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name)
+                        and node.value.id == target.id):
+                    continue
+                # The whole x.a.b chain starting here
+                parts = [node.attr]
+                outer = node
+                while isinstance(parents.get(outer), ast.Attribute):
+                    outer = parents[outer]
+                    parts.append(outer.attr)
+                problems, _, _ = walk_chain(self.schema, parts, queryset.model, '', queryset.prefetched)
+                for index, relation_path, description in problems:
+                    if relation_path in reported:
+                        continue
+                    reported.add(relation_path)
+                    expression = '.'.join([target.id] + parts[:index + 1])
+                    findings.append(_finding(
+                        path, node.lineno,
+                        f'{expression} in a loop over the {queryset.model.__name__} queryset on line '
+                        f'{queryset.line} loads a {description} per row; add '
+                        f'select_related/prefetch_related("{relation_path}")',
+                    ))
+        return findings
+
+
+# Templates
+
+class Scope:
+    """What a template loop variable holds, as far as the lint can tell."""
+
+    def __init__(self, model, path, prefetched, source, instance):
+        self.model = model
+        # Relation path from the view's context variable
+        self.path = path
+        self.prefetched = prefetched
+        self.source = source
+        self.instance = instance
+
+
+def _dotted_names(contents):
+    return DOTTED.findall(STRING.sub('""', contents))
+
+
+def lint_template(schema, path, source, renders):
+    """Return findings for one template; renders maps context names to Querysets."""
+    findings = []
+    # One {variable: Scope} per open for tag
+    loops = []
+    reported = set()
+    for token in Lexer(source).tokenize():
+        if token.token_type == TokenType.BLOCK:
+            contents = token.contents.strip()
+            bits = contents.split()
+            if not bits:
+                continue
+            if bits[0] == 'endfor':
+                if loops:
+                    loops.pop()
+                continue
+            match = FOR_TAG.match(contents)
+            names = [match.group('iterable')] if match else _dotted_names(contents)
+            findings += _check_names(schema, path, token.lineno, names, loops, reported)
+            if match:
+                loops.append(_loop_scope(schema, match, loops, renders))
+        elif token.token_type == TokenType.VAR:
+            findings += _check_names(schema, path, token.lineno, _dotted_names(token.contents), loops, reported)
+    return findings
+
+
+def _lookup(loops, name):
+    for scope in reversed(loops):
+        if name in scope:
+            return scope[name]
+    return None
+
+
+def _loop_scope(schema, match, loops, renders):
+    """Return {loop variable: Scope} for a for tag."""
+    targets = [target.strip() for target in match.group('targets').split(',')]
+    if len(targets) != 1:
+        # Unpacked values are not followed
+        return {target: None for target in targets}
+    parts = match.group('iterable').split('|')[0].split('.')
+    outer = _lookup(loops, parts[0])
+    if outer is not None:
+        _, model, path = walk_chain(schema, parts[1:], outer.model, outer.path, outer.prefetched, outer.instance)
+        return {targets[0]: Scope(model, path, outer.prefetched, outer.source, outer.instance or path != outer.path)}
+
+    scopes = []
+    for queryset, view in renders.get(parts[0], []):
+        if queryset.single:
+            _, model, path = walk_chain(schema, parts[1:], queryset.model, '', queryset.prefetched)
+            if not path:
+                model = None
+        else:
+            model, path = (queryset.model, '') if set(parts[1:]) <= {'object_list', 'all'} else (None, '')
+        scopes.append(Scope(model, path, queryset.prefetched, f'{view}:{queryset.line}', True))
+    if scopes and all(scope.model is not None for scope in scopes) \
+            and len({(scope.model, scope.path) for scope in scopes}) == 1:
+        # Several views may render the template; each has to load the relation
+        return {targets[0]: Scope(
+            scopes[0].model, scopes[0].path, set.intersection(*(scope.prefetched for scope in scopes)),
+            ', '.join(scope.source for scope in scopes), True,
+        )}
+    # Unknown rows; model instances if the loop runs over a related manager
+    instance = len(parts) > 2 and parts[-2] in schema.many_names and parts[-1] in MANAGER_METHODS
+    return {targets[0]: Scope(None, '', set(), None, instance)}
+
+
+def _check_names(schema, path, line, names, loops, reported):
+    findings = []
+    if not loops:
+        return findings
+    for name in names:
+        parts = name.split('.')
+        scope = _lookup(loops, parts[0])
+        if scope is None:
+            continue
+        problems, _, _ = walk_chain(schema, parts[1:], scope.model, scope.path, scope.prefetched, scope.instance)
+        for index, relation_path, description in problems:
+            key = (id(scope), relation_path)
+            if key in reported:
+                continue
+            reported.add(key)
+            where = f' (loaded in {scope.source})' if scope.source else ''
+            findings.append(_finding(
+                path, line,
+                f'{".".join(parts[:index + 2])} inside a for loop loads a {description} per '
+                f'iteration{where}; add select_related/prefetch_related("{relation_path}")',
+            ))
+    return findings
+
+
+# Files
+
+def _project_dirs():
+    base_dir = Path(settings.BASE_DIR).resolve()
+    dirs = []
+    for app in apps.get_app_configs():
+        app_path = Path(app.path).resolve()
+        if base_dir in app_path.parents and 'site-packages' not in app_path.parts:
+            dirs.append((app.label, app_path))
+    return base_dir, dirs
+
+
+def template_files():
+    """Yield (path, template name) for the project's own templates."""
+    base_dir, dirs = _project_dirs()
+    roots = [path / 'templates' for _, path in dirs]
+    for engine in settings.TEMPLATES:
+        roots += [Path(d).resolve() for d in engine.get('DIRS', [])]
+    seen = set()
+    for root in roots:
+        if not root.is_dir() or base_dir not in root.parents:
+            continue
+        for file in sorted(root.rglob('*.html')):
+            if file not in seen:
+                seen.add(file)
+                yield file, file.relative_to(root).as_posix()
+
+
+def view_files():
+    _, dirs = _project_dirs()
+    for _, path in dirs:
+        if (path / 'views.py').is_file():
+            yield path / 'views.py'
+        if (path / 'views').is_dir():
+            yield from sorted((path / 'views').glob('*.py'))
+
+
+def model_files():
+    _, dirs = _project_dirs()
+    return [path / 'models.py' for _, path in dirs if (path / 'models.py').is_file()]
+
+
+def source_stats():
+    """Return {path: [mtime_ns, size]} for every file lint() reads."""
+    base_dir = Path(settings.BASE_DIR).resolve()
+    files = [file for file, _ in template_files()] + list(view_files()) + model_files()
+    stats = {}
+    for file in files:
+        stat = file.stat()
+        stats[file.relative_to(base_dir).as_posix()] = [stat.st_mtime_ns, stat.st_size]
+    return stats
+
+
+def lint():
+    """Lint every project template and view module; return findings."""
+    schema = Schema()
+    base_dir = Path(settings.BASE_DIR).resolve()
+    analyzer = ViewAnalyzer(schema, apps.get_model(settings.AUTH_USER_MODEL))
+    view_findings = []
+    renders = {}
+    for file in view_files():
+        name = file.relative_to(base_dir).as_posix()
+        try:
+            found, rendered = analyzer.analyze(name, file.read_text(encoding='utf-8'))
+        except SyntaxError as e:
+            view_findings.append(_finding(name, e.lineno or 0, f'Could not parse: {e.msg}', 'info'))
+            continue
+        view_findings += found
+        for template, contexts in rendered.items():
+            for variables in contexts:
+                for variable, queryset in variables.items():
+                    renders.setdefault(template, {}).setdefault(variable, []).append((queryset, name))
+
+    template_findings = []
+    for file, template in template_files():
+        name = file.relative_to(base_dir).as_posix()
+        source = file.read_text(encoding='utf-8', errors='replace')
+        template_findings += lint_template(schema, name, source, renders.get(template, {}))
+    return template_findings, view_findings
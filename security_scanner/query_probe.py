@@ -0,0 +1,341 @@
+"""Runtime query profile of every page, taken on a throwaway fixture database.
+
+profile() creates a test database the way the test runner does, seeds it
+with a small shop (categories, products, a customer with addresses, orders,
+favourites and a cart, and a manager) and sends a GET to every named URL in
+the APPS namespaces with the test client, from worker threads. Each request
+runs in a transaction that is rolled back, so pages that change data
+(cancel, delete, log out) leave the fixture as it was for the others, and
+each uses a freshly logged-in client.
+
+For every URL it records the SQL query count, duplicate queries (the same
+SQL with the same parameters again), similar queries (the same SQL with
+other parameters, the usual sign of an N+1), SQL time, template render
+time and total time. Render time includes the SQL the templates trigger.
+Times are the median of repeat requests.
+
+save() stores the profile as a ProfileRun; a URL over its query budget
+(QUERY_BUDGET, or QUERY_BUDGETS[url name]) is flagged there.
+"""
+import os
+import re
+import statistics
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.auth.tokens import default_token_generator
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction
+from django.template.base import Template
+from django.test import Client
+from django.test.utils import (
+    CaptureQueriesContext, setup_databases, setup_test_environment, teardown_databases,
+    teardown_test_environment,
+)
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from accounts.models import Address, EmailChangeRequest, User
+from cart.utils.cart import CART_SESSION_ID, CartLine
+from orders.models import Order
+from orders.services import place_order
+from shop.models import Category, Product
+
+from .models import ProfileRun, ViewProfile
+
+APPS = ('shop', 'cart', 'orders', 'accounts', 'dashboard')
+QUERY_BUDGET = getattr(settings, 'SECURITY_SCANNER_QUERY_BUDGET', 25)
+# {'namespace:name': queries} for pages allowed more (or fewer) than QUERY_BUDGET
+QUERY_BUDGETS = getattr(settings, 'SECURITY_SCANNER_QUERY_BUDGETS', {})
+KEEP_PROFILES = getattr(settings, 'SECURITY_SCANNER_KEEP_PROFILES', 100)
+
+ANONYMOUS = 'anonymous'
+CUSTOMER = 'customer'
+MANAGER = 'manager'
+# Pages for visitors who are not logged in; dashboard pages are requested
+# as the manager and everything else as the customer
+ANONYMOUS_URLS = {
+    'accounts:user_register', 'accounts:user_login', 'accounts:manager_login', 'accounts:password_reset',
+    'accounts:password_reset_done', 'accounts:password_reset_confirm', 'accounts:password_reset_complete',
+}
+
+# URL parameter -> fixture value, with overrides where a name means
+# something else on one page
+PARAMETERS = {
+    'slug': 'product_slug', 'id': 'product_id', 'product_id': 'product_id', 'order_id': 'order_id',
+    'address_id': 'address_id', 'uidb64': 'uidb64', 'token': 'reset_token',
+}
+URL_PARAMETERS = {
+    'shop:filter_by_category': {'slug': 'category_slug'},
+    'dashboard:order_detail': {'id': 'order_id'},
+    'accounts:verify_email': {'token': 'email_token'},
+}
+
+# Literals, then IN lists of any length, so queries differing only in
+# their parameters compare equal
+LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+IN_LISTS = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+
+_local = threading.local()
+
+
+def routes(namespaces=APPS):
+    """Return [(url name, view, parameter names)] for the named URLs under namespaces."""
+    found = []
+
+    def walk(patterns, prefix):
+        for pattern in patterns:
+            if isinstance(pattern, URLResolver):
+                walk(pattern.url_patterns, f'{prefix}{pattern.namespace}:' if pattern.namespace else prefix)
+            elif isinstance(pattern, URLPattern) and pattern.name and prefix:
+                if prefix.split(':')[0] in namespaces:
+                    view = getattr(pattern.callback, 'view_class', pattern.callback)
+                    found.append((
+                        prefix + pattern.name, f'{view.__module__}.{view.__qualname__}',
+                        list(pattern.pattern.converters),
+                    ))
+
+    walk(get_resolver().url_patterns, '')
+    return found
+
+
+def role_for(name):
+    if name in ANONYMOUS_URLS:
+        return ANONYMOUS
+    if name.startswith('dashboard:'):
+        return MANAGER
+    return CUSTOMER
+
+
+def seed(products=40, orders=20, items=5):
+    """Fill the (test) database with a small shop; return the values URLs are built from."""
+    customer = User.objects.create_user('customer@probe.invalid', 'Probe Customer', 'probe-pass-1234')
+    manager = User.objects.create_user('manager@probe.invalid', 'Probe Manager', 'probe-pass-1234')
+    manager.is_manager = True
+    manager.save(update_fields=['is_manager'])
+    others = [
+        User.objects.create_user(f'shopper{number}@probe.invalid', f'Probe Shopper {number}', 'probe-pass-1234')
+        for number in range(3)
+    ]
+    addresses = [
+        Address.objects.create(
+            user=user, title=title, full_name=user.full_name, street_address='1 Probe Street', city='City',
+            state='State', postal_code='000000', phone_number='0000000000', is_default=title == 'Home',
+        )
+        for user in [customer] + others for title in ('Home', 'Office')
+    ]
+
+    parents = [Category.objects.create(title=f'Probe category {number}') for number in range(3)]
+    categories = parents + [
+        Category.objects.create(title=f'Probe sub-category {number}', sub_category=parent, is_sub=True)
+        for number, parent in enumerate(parents)
+    ]
+    catalogue = Product.objects.bulk_create([
+        Product(
+            category=categories[number % len(categories)], image='products/probe.jpg',
+            title=f'Probe product {number}', description='Seeded by the query probe',
+            price=100 + number, slug=f'probe-product-{number}',
+        )
+        for number in range(products)
+    ])
+    customer.likes.add(*catalogue[:10])
+
+    placed = []
+    buyers = [customer] + others
+    for number in range(orders):
+        lines = [
+            CartLine(product, 1 + line % 3, product.price)
+            for line, product in enumerate(catalogue[number % products:][:items] or catalogue[:items])
+        ]
+        placed.append(place_order(buyers[number % len(buyers)], lines))
+    # A spread of statuses for the dashboard; the customer's newest order stays pending
+    statuses = [Order.PROCESSING, Order.SHIPPED, Order.DELIVERED, Order.CANCELLED]
+    for number, order in enumerate(placed[len(buyers):]):
+        Order.objects.filter(pk=order.pk).update(status=statuses[number % len(statuses)])
+
+    email_change = EmailChangeRequest.objects.create(
+        user=customer, new_email='changed@probe.invalid', token='probe-email-token'
+    )
+    return {
+        'customer': customer, 'manager': manager,
+        'cart': {str(product.pk): [2, product.price] for product in catalogue[:items]},
+        'cart_session_key': CART_SESSION_ID,
+        'product_slug': catalogue[0].slug, 'product_id': catalogue[0].pk,
+        'category_slug': parents[0].slug,
+        'order_id': placed[0].pk, 'address_id': addresses[0].pk,
+        'uidb64': urlsafe_base64_encode(force_bytes(customer.pk)),
+        'reset_token': default_token_generator.make_token(customer),
+        'email_token': email_change.token,
+    }
+
+
+def _timed_render(render):
+    """Wrap Template._render to add the time of the outermost render to _local.render_time."""
+    def _render(self, context):
+        if getattr(_local, 'rendering', False):
+            return render(self, context)
+        _local.rendering = True
+        started = time.perf_counter()
+        try:
+            return render(self, context)
+        finally:
+            _local.rendering = False
+            _local.render_time += time.perf_counter() - started
+    return _render
+
+
+def repeats(queries):
+    """Return (duplicates, similar, most repeated SQL, its count) for captured queries."""
+    exact = Counter(query['sql'] for query in queries)
+    shapes = Counter(IN_LISTS.sub('(?)', LITERALS.sub('?', query['sql'])) for query in queries)
+    duplicates = sum(count - 1 for count in exact.values())
+    similar = sum(count - 1 for count in shapes.values())
+    sql, count = shapes.most_common(1)[0] if shapes else ('', 0)
+    return duplicates, similar, (sql if count > 1 else ''), (count if count > 1 else 0)
+
+
+def _use_clone(suffixes, lock):
+    """Point this worker thread's default connection at its own database clone."""
+    with lock:
+        suffix = next(suffixes)
+    clone = connection.creation.get_test_db_clone_settings(suffix)
+    connections[DEFAULT_DB_ALIAS] = type(connections[DEFAULT_DB_ALIAS])(clone, DEFAULT_DB_ALIAS)
+
+
+def _client(fixture, role):
+    client = Client()
+    if role != ANONYMOUS:
+        client.force_login(fixture[role])
+    if role == CUSTOMER:
+        session = client.session
+        session[fixture['cart_session_key']] = fixture['cart']
+        session.save()
+    return client
+
+
+def _probe_one(route, fixture, repeat):
+    name, view, parameters = route
+    overrides = URL_PARAMETERS.get(name, {})
+    result = {
+        'name': name, 'view': view, 'role': role_for(name), 'path': '', 'status_code': None,
+        'queries': 0, 'duplicates': 0, 'similar': 0, 'repeated_sql': '', 'repeated_count': 0,
+        'sql_ms': 0.0, 'render_ms': 0.0, 'total_ms': 0.0, 'error': '',
+    }
+    try:
+        missing = [p for p in parameters if overrides.get(p, PARAMETERS.get(p)) not in fixture]
+        if missing:
+            result['error'] = f'Skipped: no fixture value for {", ".join(missing)}'
+            return result
+        result['path'] = reverse(name, kwargs={p: fixture[overrides.get(p, PARAMETERS[p])] for p in parameters})
+        timings = []
+        for _ in range(repeat):
+            client = _client(fixture, result['role'])
+            _local.render_time = 0.0
+            with transaction.atomic():
+                with CaptureQueriesContext(connection) as captured:
+                    started = time.perf_counter()
+                    response = client.get(result['path'])
+                    elapsed = time.perf_counter() - started
+                transaction.set_rollback(True)
+            sql_time = sum(float(query['time']) for query in captured.captured_queries)
+            timings.append((sql_time, _local.render_time, elapsed))
+        result['status_code'] = response.status_code
+        result['queries'] = len(captured.captured_queries)
+        (result['duplicates'], result['similar'],
+         result['repeated_sql'], result['repeated_count']) = repeats(captured.captured_queries)
+        for index, key in enumerate(('sql_ms', 'render_ms', 'total_ms')):
+            result[key] = round(statistics.median(timing[index] for timing in timings) * 1000, 2)
+    except Exception as e:
+        result['error'] = f'{type(e).__name__}: {e}'
+    finally:
+        # Pool threads open their own connections
+        connections.close_all()
+    return result
+
+
+def profile(namespaces=APPS, workers=4, repeat=3, products=40, orders=20, items=5):
+    """Profile every URL under namespaces on a fresh fixture database; return one dict per URL."""
+    found = routes(namespaces)
+    test_settings = connections[DEFAULT_DB_ALIAS].settings_dict['TEST']
+    temporary = None
+    if connection.vendor == 'sqlite' and not test_settings.get('NAME'):
+        # In-memory test databases cannot be cloned for the workers
+        temporary = tempfile.mkdtemp(prefix='query-probe-')
+        test_settings['NAME'] = os.path.join(temporary, 'probe.sqlite3')
+
+    setup_test_environment()
+    render = Template._render
+    Template._render = _timed_render(render)
+    try:
+        old_config = setup_databases(0, interactive=False, aliases={DEFAULT_DB_ALIAS}, serialized_aliases=set())
+        try:
+            fixture = seed(products, orders, items)
+            creation = connection.creation
+            # Every worker gets its own copy of the fixture, as in the parallel
+            # test runner, so their (rolled back) writes never wait on each other
+            suffixes = [str(number + 1) for number in range(workers)]
+            for suffix in suffixes:
+                creation.clone_test_db(suffix, verbosity=0)
+            try:
+                with ThreadPoolExecutor(
+                    max_workers=workers, thread_name_prefix='query-probe',
+                    initializer=_use_clone, initargs=(iter(suffixes), threading.Lock()),
+                ) as executor:
+                    results = list(executor.map(lambda route: _probe_one(route, fixture, repeat), found))
+                # Write queued sessions now, while the databases still exist
+                getattr(import_module(settings.SESSION_ENGINE), 'flush', lambda: None)()
+            finally:
+                for suffix in suffixes:
+                    creation.destroy_test_db(verbosity=0, suffix=suffix)
+        finally:
+            connections.close_all()
+            teardown_databases(old_config, 0)
+    finally:
+        Template._render = render
+        teardown_test_environment()
+        if temporary:
+            test_settings.pop('NAME', None)
+            os.rmdir(temporary)
+    return results
+
+
+def budget_for(name):
+    return QUERY_BUDGETS.get(name, QUERY_BUDGET)
+
+
+def save(results, duration_ms=0, workers=0, repeat=0):
+    """Store a profile; return the ProfileRun."""
+    with transaction.atomic():
+        run = ProfileRun.objects.create(
+            duration_ms=duration_ms, workers=workers, repeat=repeat, urls=len(results),
+            over_budget=len([r for r in results if not r['error'] and r['queries'] > budget_for(r['name'])]),
+        )
+        ViewProfile.objects.bulk_create([
+            ViewProfile(run=run, budget=budget_for(result['name']), **result) for result in results
+        ])
+    prune()
+    return run
+
+
+def prune(keep=KEEP_PROFILES):
+    """Delete all but the newest keep profiles; return how many went."""
+    cutoff = list(ProfileRun.objects.order_by('-id').values_list('id', flat=True)[keep:keep + 1])
+    if not cutoff:
+        return 0
+    _, deleted = ProfileRun.objects.filter(id__lte=cutoff[0]).delete()
+    return deleted.get(ProfileRun._meta.label, 0)
+
+
+def ranked(run):
+    """Return run's URLs, most queries first, each with .change in queries since the previous run."""
+    previous = ProfileRun.objects.filter(id__lt=run.id).order_by('-id').first()
+    before = dict(previous.views.values_list('name', 'queries')) if previous else {}
+    views = list(run.views.order_by('-queries', '-total_ms'))
+    for view in views:
+        view.change = view.queries - before[view.name] if view.name in before else None
+    return views
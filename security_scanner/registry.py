@@ -0,0 +1,204 @@
+"""Registry and runner for security scanner checks.
+
+Each app declares its checks in a security_checks.py module, found at
+startup like jobs' tasks.py::
+
+    @register
+    class CsrfProtection(Check):
+        key = 'csrf'
+        name = 'CSRF Protection'
+
+        def run(self, dependencies):
+            if 'django.middleware.csrf.CsrfViewMiddleware' in settings.MIDDLEWARE:
+                return self.result('PASS', 'info', 'Django CSRF middleware is enabled')
+            return self.result('FAIL', 'high', 'CSRF protection is not properly configured')
+
+run_checks() runs them on a thread pool. A check starts once the checks
+named in its depends_on have finished and gets their results; it is
+skipped if one of them errored or timed out. A check still running after
+its timeout is reported as timed out and the scan moves on.
+
+Every result carries a fingerprint: a hash of the check's version, its
+inputs() (the settings it reads, or a cheap summary of the data) and its
+dependencies' results. Given the previous results, run_checks() reuses any
+whose fingerprint still matches instead of running the check again.
+Results of CHEAP checks are also cached for MEMO_SECONDS and reused the
+same way, for callers that keep no history.
+"""
+import hashlib
+import json
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.utils import timezone
+
+CHEAP = 'cheap'
+EXPENSIVE = 'expensive'
+
+WORKERS = getattr(settings, 'SECURITY_SCANNER_WORKERS', 8)
+MEMO_SECONDS = getattr(settings, 'SECURITY_SCANNER_MEMO_SECONDS', 300)
+CACHE_PREFIX = 'security_scanner:check:'
+
+_checks = {}
+
+
+class Check:
+    key = None
+    name = None
+    cost = CHEAP
+    depends_on = ()
+    # Bump when run() changes, so results stored by the old code are not reused
+    version = 1
+    # Settings run() reads; the default inputs()
+    settings_used = ()
+    # Seconds before the scan stops waiting for this check
+    timeout = 10
+    # Reported when the check raises or times out
+    error_status = 'INFO'
+    error_risk = 'info'
+
+    def run(self, dependencies):
+        """Return self.result(...); dependencies maps key -> result."""
+        raise NotImplementedError
+
+    def inputs(self):
+        """Return what the result depends on, or None to always run the check."""
+        if not self.settings_used:
+            return None
+        return {name: getattr(settings, name, None) for name in self.settings_used}
+
+    def fingerprint(self, dependencies):
+        inputs = self.inputs()
+        if inputs is None:
+            return ''
+        payload = json.dumps({
+            'key': self.key, 'version': self.version, 'inputs': inputs,
+            'dependencies': {key: [r['status'], r['details']] for key, r in dependencies.items()},
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def result(self, status, risk, details):
+        return {'key': self.key, 'test': self.name, 'status': status, 'risk': risk, 'details': details}
+
+    def error(self, details):
+        return dict(
+            self.result(self.error_status, self.error_risk, details),
+            error=True, fingerprint='', reused=False, checked_at=timezone.now(),
+        )
+
+
+def register(check_class):
+    if not check_class.key or not check_class.name:
+        raise ValueError(f'{check_class.__name__} needs a key and a name')
+    if check_class.key in _checks:
+        raise KeyError(f'A security check is already registered as {check_class.key!r}')
+    _checks[check_class.key] = check_class()
+    return check_class
+
+
+def get_checks(keys=None):
+    """Return checks in registration order, with the dependencies of keys added."""
+    if keys is None:
+        return list(_checks.values())
+    wanted = set()
+    pending = list(keys)
+    while pending:
+        key = pending.pop()
+        if key not in _checks:
+            raise KeyError(f'No security check registered as {key!r}')
+        if key not in wanted:
+            wanted.add(key)
+            pending.extend(_checks[key].depends_on)
+    return [check for key, check in _checks.items() if key in wanted]
+
+
+def _run_one(check, dependencies, previous):
+    try:
+        fingerprint = check.fingerprint(dependencies)
+        if fingerprint and previous and previous.get('fingerprint') == fingerprint:
+            return dict(previous, reused=True)
+        return dict(check.run(dependencies), fingerprint=fingerprint, reused=False, checked_at=timezone.now())
+    except Exception as e:
+        return check.error(f'Error running {check.name}: {e}')
+    finally:
+        # Pool threads open their own connections
+        connections.close_all()
+
+
+def run_checks(keys=None, use_cache=True, workers=WORKERS, previous=None):
+    """Run the checks (all, or keys and their dependencies); return their results.
+
+    previous maps check keys to earlier results that may be reused.
+    """
+    checks = get_checks(keys)
+    previous = dict(previous or {})
+    if use_cache:
+        cached = cache.get_many([CACHE_PREFIX + check.key for check in checks if check.cost == CHEAP])
+        for check in checks:
+            if CACHE_PREFIX + check.key in cached:
+                previous[check.key] = cached[CACHE_PREFIX + check.key]
+
+    results = {}
+    waiting = list(checks)
+    running = {}
+    fresh = {}
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='security-check')
+    try:
+        while waiting or running:
+            for check in list(waiting):
+                if any(key not in results for key in check.depends_on):
+                    continue
+                waiting.remove(check)
+                failed = [key for key in check.depends_on if results[key].get('error')]
+                if failed:
+                    results[check.key] = check.error(f'Skipped: {", ".join(failed)} did not complete')
+                    continue
+                dependencies = {key: results[key] for key in check.depends_on}
+                future = executor.submit(_run_one, check, dependencies, previous.get(check.key))
+                running[future] = (check, time.monotonic() + check.timeout)
+            if not running:
+                if waiting:
+                    # Only reachable with a dependency cycle
+                    for check in waiting:
+                        results[check.key] = check.error('Skipped: circular dependency')
+                    waiting = []
+                continue
+
+            next_deadline = min(deadline for _, deadline in running.values())
+            done, _ = wait(running, timeout=max(0, next_deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+            for future in done:
+                check, _ = running.pop(future)
+                results[check.key] = fresh[check.key] = future.result()
+            now = time.monotonic()
+            for future, (check, deadline) in list(running.items()):
+                if deadline <= now:
+                    del running[future]
+                    future.cancel()
+                    results[check.key] = check.error(f'Timed out after {check.timeout}s')
+    finally:
+        # Threads of timed-out checks are left to finish on their own
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    if use_cache:
+        cache.set_many({
+            CACHE_PREFIX + key: result for key, result in fresh.items()
+            if _checks[key].cost == CHEAP and not result.get('error') and not result['reused']
+        }, MEMO_SECONDS)
+    return [results[check.key] for check in checks]
+
+
+def summarize(results):
+    return {
+        'total_tests': len(results),
+        'passed': len([r for r in results if r['status'] == 'PASS']),
+        'failed': len([r for r in results if r['status'] == 'FAIL']),
+        'warnings': len([r for r in results if r['status'] == 'WARNING']),
+        'info': len([r for r in results if r['status'] == 'INFO']),
+        'critical': len([r for r in results if r['risk'] == 'critical']),
+        'high': len([r for r in results if r['risk'] == 'high']),
+        'medium': len([r for r in results if r['risk'] == 'medium']),
+        'low': len([r for r in results if r['risk'] == 'low'])
+    }
@@ -0,0 +1,300 @@
+import threading
+
+from django.conf import settings
+from django.db.models import Max
+
+from accounts.models import User
+from orders.models import Order
+
+from . import query_lint
+from .registry import EXPENSIVE, Check, register
+
+# From this many accounts on the count is only reported as "or more"
+USER_COUNT_LIMIT = 10000
+
+
+@register
+class CsrfProtection(Check):
+    key = 'csrf'
+    name = 'CSRF Protection'
+    settings_used = ('MIDDLEWARE',)
+    error_status, error_risk = 'FAIL', 'high'
+
+    def run(self, dependencies):
+        if 'django.middleware.csrf.CsrfViewMiddleware' in settings.MIDDLEWARE:
+            return self.result('PASS', 'info', 'Django CSRF middleware is enabled')
+        return self.result('FAIL', 'high', 'CSRF protection is not properly configured')
+
+
+@register
+class SecureSessions(Check):
+    key = 'sessions'
+    name = 'Secure Session Management'
+    settings_used = ('SESSION_COOKIE_HTTPONLY',)
+    error_status, error_risk = 'FAIL', 'high'
+
+    def run(self, dependencies):
+        # In development SESSION_COOKIE_SECURE is typically False, but that's
+        # okay; what matters is that HTTPONLY is True (the default)
+        if getattr(settings, 'SESSION_COOKIE_HTTPONLY', True):
+            return self.result('PASS', 'info', 'Session cookies are HTTPOnly')
+        return self.result('FAIL', 'high', 'Session cookies are not HTTPOnly')
+
+
+@register
+class PasswordValidation(Check):
+    key = 'password_validation'
+    name = 'Password Validation'
+    settings_used = ('AUTH_PASSWORD_VALIDATORS',)
+    error_status, error_risk = 'FAIL', 'medium'
+
+    def run(self, dependencies):
+        if getattr(settings, 'AUTH_PASSWORD_VALIDATORS', []):
+            return self.result('PASS', 'info', 'Password validators are configured')
+        return self.result('FAIL', 'medium', 'No password validation configured')
+
+
+@register
+class DebugMode(Check):
+    key = 'debug'
+    name = 'Debug Mode Security'
+    settings_used = ('DEBUG',)
+
+    def run(self, dependencies):
+        # In development debug mode is expected, so this is INFO, not FAIL
+        if getattr(settings, 'DEBUG', True):
+            return self.result('INFO', 'info', 'Debug mode is enabled (expected in development)')
+        return self.result('PASS', 'info', 'Debug mode is disabled')
+
+
+@register
+class AllowedHosts(Check):
+    key = 'allowed_hosts'
+    name = 'Allowed Hosts Configuration'
+    settings_used = ('ALLOWED_HOSTS',)
+
+    def run(self, dependencies):
+        if not getattr(settings, 'ALLOWED_HOSTS', []):
+            return self.result('INFO', 'info', 'Allowed hosts is empty (acceptable in development)')
+        return self.result('PASS', 'info', 'Allowed hosts are configured')
+
+
+@register
+class StaticFiles(Check):
+    key = 'static_files'
+    name = 'Static Files Configuration'
+    settings_used = ('STATIC_URL',)
+    error_status, error_risk = 'FAIL', 'medium'
+
+    def run(self, dependencies):
+        if getattr(settings, 'STATIC_URL', None) is not None:
+            return self.result('PASS', 'info', 'Static files are properly configured')
+        return self.result('FAIL', 'medium', 'Static files not properly configured')
+
+
+@register
+class DatabaseSecurity(Check):
+    key = 'database'
+    name = 'Database Security'
+    settings_used = ('DATABASES',)
+
+    def run(self, dependencies):
+        # SQLite is acceptable in development
+        if 'sqlite3' in settings.DATABASES['default']['ENGINE']:
+            return self.result('INFO', 'info', 'Using SQLite database (acceptable in development)')
+        return self.result('PASS', 'info', 'Using production database engine')
+
+
+@register
+class SecretKey(Check):
+    key = 'secret_key'
+    name = 'Secret Key Security'
+    error_status, error_risk = 'FAIL', 'critical'
+
+    def inputs(self):
+        # Whether it is set, never the key itself
+        return {'configured': bool(getattr(settings, 'SECRET_KEY', ''))}
+
+    def run(self, dependencies):
+        # Only checks that it exists; a development key is fine
+        if getattr(settings, 'SECRET_KEY', ''):
+            return self.result('PASS', 'info', 'Secret key is configured')
+        return self.result('FAIL', 'critical', 'Secret key is not configured')
+
+
+@register
+class EmailConfiguration(Check):
+    key = 'email'
+    name = 'Email Configuration'
+    settings_used = ('EMAIL_BACKEND',)
+
+    def run(self, dependencies):
+        if 'smtp' in getattr(settings, 'EMAIL_BACKEND', ''):
+            return self.result('PASS', 'info', 'Email backend is configured for SMTP')
+        return self.result('INFO', 'info', 'Email backend configuration check')
+
+
+@register
+class PaymentMethodStorage(Check):
+    key = 'payment_method_storage'
+    name = 'Payment Method Storage'
+    cost = EXPENSIVE
+    depends_on = ('database',)
+
+    def inputs(self):
+        # New orders are the likely change; an unchanged result is also
+        # rerun once history.MAX_REUSE_AGE has passed
+        return Order.objects.aggregate(last=Max('pk'))
+
+    def run(self, dependencies):
+        # One matching row answers the question; no need to count them all
+        if Order.objects.exclude(payment_method='').exists():
+            return self.result('PASS', 'info', 'Payment method is stored with orders')
+        return self.result('INFO', 'info', 'No orders with payment method found (may be test environment)')
+
+
+@register
+class CustomUserModel(Check):
+    key = 'custom_user_model'
+    name = 'Custom User Model'
+    settings_used = ('AUTH_USER_MODEL',)
+
+    def run(self, dependencies):
+        if getattr(settings, 'AUTH_USER_MODEL', 'auth.User') != 'auth.User':
+            return self.result('PASS', 'info', 'Using custom user model')
+        return self.result('INFO', 'info', 'Using default Django user model')
+
+
+@register
+class PasswordHashing(Check):
+    key = 'password_hashing'
+    name = 'Password Hashing Algorithm'
+    settings_used = ('PASSWORD_HASHERS',)
+
+    def run(self, dependencies):
+        hashers = getattr(settings, 'PASSWORD_HASHERS', [])
+        # The default hashers start with PBKDF2
+        if not hashers or any('PBKDF2' in hasher for hasher in hashers):
+            return self.result('PASS', 'info', 'Using secure password hashing (PBKDF2)')
+        return self.result('WARNING', 'medium', 'Consider using more secure password hashing')
+
+
+@register
+class ClickjackingProtection(Check):
+    key = 'clickjacking'
+    name = 'Clickjacking Protection'
+    settings_used = ('MIDDLEWARE',)
+    error_status, error_risk = 'FAIL', 'medium'
+
+    def run(self, dependencies):
+        if 'django.middleware.clickjacking.XFrameOptionsMiddleware' in settings.MIDDLEWARE:
+            return self.result('PASS', 'info', 'Clickjacking protection middleware is enabled')
+        return self.result('FAIL', 'medium', 'Clickjacking protection not enabled')
+
+
+@register
+class SecurityMiddleware(Check):
+    key = 'security_middleware'
+    name = 'Security Middleware'
+    settings_used = ('MIDDLEWARE',)
+    error_status, error_risk = 'FAIL', 'high'
+
+    def run(self, dependencies):
+        if 'django.middleware.security.SecurityMiddleware' in settings.MIDDLEWARE:
+            return self.result('PASS', 'info', 'Security middleware is enabled')
+        return self.result('FAIL', 'high', 'Security middleware not enabled')
+
+
+@register
+class UploadSizeLimit(Check):
+    key = 'upload_size'
+    name = 'File Upload Size Limit'
+    settings_used = ('DATA_UPLOAD_MAX_MEMORY_SIZE',)
+
+    def run(self, dependencies):
+        max_upload_size = getattr(settings, 'DATA_UPLOAD_MAX_MEMORY_SIZE', None)
+        if max_upload_size is not None:
+            return self.result('PASS', 'info', f'File upload size limit is set to {max_upload_size} bytes')
+        return self.result('INFO', 'info', 'No file upload size limit configured')
+
+
+@register
+class UserAccountCount(Check):
+    key = 'user_count'
+    name = 'User Account Count'
+    cost = EXPENSIVE
+    depends_on = ('database',)
+
+    def inputs(self):
+        return User.objects.aggregate(last=Max('pk'))
+
+    def run(self, dependencies):
+        # Counts at most USER_COUNT_LIMIT rows instead of the whole table
+        user_count = User.objects.order_by().values('pk')[:USER_COUNT_LIMIT].count()
+        if user_count < USER_COUNT_LIMIT:
+            return self.result('PASS', 'info', f'{user_count} user accounts found')
+        return self.result(
+            'INFO', 'info', f'{user_count} or more user accounts found (high count may indicate data leak)'
+        )
+
+
+@register
+class MediaFiles(Check):
+    key = 'media_files'
+    name = 'Media Files Configuration'
+    settings_used = ('MEDIA_URL', 'MEDIA_ROOT')
+
+    def run(self, dependencies):
+        if getattr(settings, 'MEDIA_URL', '') and getattr(settings, 'MEDIA_ROOT', ''):
+            return self.result('PASS', 'info', 'Media files are properly configured')
+        return self.result('INFO', 'info', 'Media files configuration check')
+
+
+class QueryLint(Check):
+    cost = EXPENSIVE
+    timeout = 60
+    # Index into query_lint.lint()'s (template findings, view findings)
+    part = None
+    clean = None
+    # One lint() serves both checks: (source_stats() it ran on, its findings)
+    _linted = (None, None)
+    _lock = threading.Lock()
+
+    def inputs(self):
+        # The files lint() reads, by modification time and size
+        return query_lint.source_stats()
+
+    @staticmethod
+    def lint():
+        """Return lint()'s findings, linting again only when a source file changed."""
+        stats = query_lint.source_stats()
+        with QueryLint._lock:
+            if QueryLint._linted[0] != stats:
+                QueryLint._linted = (stats, query_lint.lint())
+            return QueryLint._linted[1]
+
+    def run(self, dependencies):
+        findings = self.lint()[self.part]
+        if not findings:
+            return self.result('PASS', 'info', self.clean)
+        locations = len({finding['file'] for finding in findings})
+        return dict(
+            self.result('WARNING', 'low', f'{len(findings)} possible N+1 queries in {locations} files'),
+            findings=findings,
+        )
+
+
+@register
+class TemplateQueryLint(QueryLint):
+    key = 'n_plus_one_templates'
+    name = 'N+1 Queries in Templates'
+    part = 0
+    clean = 'No relation lookups found inside template loops without select_related/prefetch_related'
+
+
+@register
+class ViewQueryLint(QueryLint):
+    key = 'n_plus_one_views'
+    name = 'N+1 Queries in Views'
+    part = 1
+    clean = 'No relation lookups found inside view loops without select_related/prefetch_related'
@@ -8,4 +8,7 @@ urlpatterns = [
     path('vulnerability-report/', views.vulnerability_report, name='vulnerability_report'),
     path('test-cases/', views.test_cases, name='test_cases'),
     path('run-tests/', views.run_security_tests, name='run_tests'),
+    path('history/', views.scan_history, name='scan_history'),
+    path('history/<int:run_id>/', views.scan_detail, name='scan_detail'),
+    path('query-profile/', views.query_profile, name='query_profile'),
 ]
\ No newline at end of file
@@ -0,0 +1,272 @@
+"""Bulk product edits from a CSV file.
+
+The file needs an ``id`` column and any of ``price``, ``title`` and
+``category`` (a category slug or id); blank cells leave the field alone.
+Rows are read one at a time and handled CHUNK_SIZE at a time: each chunk
+loads its products in one query, is validated and diffed against them, and
+its changes are written with bulk_update in batches of BATCH_SIZE, so
+repricing the whole catalog takes a few hundred statements rather than one
+round trip per product.
+
+A new title may give a product the slug of another product that is renamed
+too, anywhere in the file; the first product is then written after the
+other one.
+
+The whole file is one transaction. If any row is invalid nothing is
+written; with dry_run nothing is written either, and the report says what
+would have changed.
+"""
+import csv
+import io
+from itertools import islice
+
+from django.db import IntegrityError, transaction
+from django.utils.text import slugify
+
+from .models import Category, Product
+from .search import fts_available, reindex_products
+
+CHUNK_SIZE = 1000
+# Products per UPDATE statement
+BATCH_SIZE = 500
+FIELDS = ('price', 'title', 'category')
+# Written for products held back until the slug they take is free
+RENAME_FIELDS = ['category', 'price', 'slug', 'title']
+# Changes kept on the report for display; the rest are only counted
+MAX_REPORTED_CHANGES = 500
+
+
+class BulkEditError(Exception):
+    pass
+
+
+class Report:
+    def __init__(self, dry_run, max_changes):
+        self.dry_run = dry_run
+        self.max_changes = max_changes
+        self.applied = False
+        self.rows = 0
+        self.changed = 0
+        self.unchanged = 0
+        self.changes = []
+        self.truncated = False
+        self.errors = []
+
+    def add_change(self, line, product, field, old, new):
+        if self.max_changes is None or len(self.changes) < self.max_changes:
+            self.changes.append((line, product.pk, field, old, new))
+        else:
+            self.truncated = True
+
+
+class _Rollback(Exception):
+    pass
+
+
+def read_rows(fileobj):
+    """Yield (line number, row dict) from a CSV file opened in binary or text mode."""
+    if not isinstance(fileobj, io.TextIOBase):
+        fileobj = io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline='')
+    reader = csv.DictReader(fileobj)
+    columns = {name.strip().lower() for name in reader.fieldnames or ()}
+    if 'id' not in columns:
+        raise BulkEditError('The CSV file needs an "id" column')
+    if not columns & set(FIELDS):
+        raise BulkEditError(f'The CSV file needs at least one of the columns {", ".join(FIELDS)}')
+    for row in reader:
+        yield reader.line_num, {
+            (key or '').strip().lower(): (value or '').strip() for key, value in row.items()
+        }
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def _category_lookup():
+    lookup = {}
+    for pk, slug in Category.objects.values_list('id', 'slug'):
+        lookup[str(pk)] = pk
+        lookup[slug] = pk
+    return lookup
+
+
+def _parse(row, categories):
+    """Return {field: new value} for the filled-in cells of a row."""
+    values = {}
+    if row.get('price'):
+        try:
+            values['price'] = int(row['price'].replace(',', ''))
+        except ValueError:
+            raise BulkEditError(f'price "{row["price"]}" is not a whole number')
+        if values['price'] < 1:
+            raise BulkEditError('price must be at least 1')
+    if row.get('title'):
+        if len(row['title']) > Product._meta.get_field('title').max_length:
+            raise BulkEditError('title is too long')
+        if not slugify(row['title']):
+            raise BulkEditError(f'title "{row["title"]}" gives an empty slug')
+        values['title'] = row['title']
+    if row.get('category'):
+        if row['category'] not in categories:
+            raise BulkEditError(f'unknown category "{row["category"]}"')
+        values['category'] = categories[row['category']]
+    return values
+
+
+class _Renames:
+    """Slug changes across the whole file.
+
+    Slugs are unique, so a product may only take the slug of another product
+    once that product has been renamed itself, possibly further down the
+    file. Such products wait for it and are written right after it.
+    """
+    def __init__(self):
+        self.slugs = set()
+        # Renamed products, written or (after an error or on a dry run) due to be
+        self.done = set()
+        # Holder pk -> [(line, product)] waiting for the holder's rename
+        self.waiting = {}
+
+    def wait(self, holder_pk, line, product):
+        self.waiting.setdefault(holder_pk, []).append((line, product))
+
+    def release(self, products):
+        """Mark products renamed; return the products this frees, a list per round.
+
+        Each round only takes slugs given up by earlier rounds, so the rounds
+        must be written one after the other.
+        """
+        rounds = []
+        freed = list(products)
+        while freed:
+            self.done.update(product.pk for product in freed)
+            freed = [
+                product for holder in freed for _, product in self.waiting.pop(holder.pk, ())
+            ]
+            if freed:
+                rounds.append(freed)
+        return rounds
+
+    def blocked(self):
+        """(line, product) for the products still waiting at the end of the file."""
+        return [entry for entries in self.waiting.values() for entry in entries]
+
+
+def _process_chunk(chunk, categories, seen, renames, report):
+    """Validate and diff one chunk.
+
+    Returns the products to write now, their changed fields and the renamed
+    products among them. Products whose new slug another product still holds
+    are handed to renames to wait for it instead.
+    """
+    ids = {}
+    for line, row in chunk:
+        try:
+            product_id = int(row.get('id', ''))
+        except ValueError:
+            report.errors.append((line, f'id "{row.get("id", "")}" is not a number'))
+            continue
+        if product_id in seen:
+            report.errors.append((line, f'product {product_id} appears more than once'))
+            continue
+        seen.add(product_id)
+        ids[product_id] = (line, row)
+
+    products = Product.objects.only('id', 'title', 'slug', 'price', 'category_id').in_bulk(ids)
+    changed = []
+    fields = set()
+    renamed = {}
+    for product_id, (line, row) in ids.items():
+        product = products.get(product_id)
+        if product is None:
+            report.errors.append((line, f'product {product_id} does not exist'))
+            continue
+        try:
+            values = _parse(row, categories)
+        except BulkEditError as e:
+            report.errors.append((line, str(e)))
+            continue
+
+        old = {'price': product.price, 'title': product.title, 'category': product.category_id}
+        updates = {field: value for field, value in values.items() if old[field] != value}
+        if not updates:
+            report.unchanged += 1
+            continue
+        if 'title' in updates:
+            slug = slugify(updates['title'])
+            if slug != product.slug:
+                if slug in renames.slugs:
+                    report.errors.append((line, f'title gives slug "{slug}" which another row also uses'))
+                    continue
+                renames.slugs.add(slug)
+                renamed[slug] = (line, product)
+        for field, value in updates.items():
+            report.add_change(line, product, field, old[field], value)
+            setattr(product, 'category_id' if field == 'category' else field, value)
+            fields.add(field)
+        if 'title' in updates:
+            product.slug = slugify(product.title)
+            fields.add('slug')
+        report.changed += 1
+        changed.append(product)
+
+    # A new slug may still belong to another product, renamed in this chunk,
+    # later in the file or not at all
+    waiting = set()
+    if renamed:
+        holders = Product.objects.filter(slug__in=renamed).values_list('slug', 'id')
+        for slug, holder_pk in holders:
+            if holder_pk in renames.done:
+                continue
+            line, product = renamed[slug]
+            renames.wait(holder_pk, line, product)
+            waiting.add(product.pk)
+    changed = [product for product in changed if product.pk not in waiting]
+    renamed = [product for _, product in renamed.values() if product.pk not in waiting]
+    return changed, fields, renamed
+
+
+def update_products(fileobj, dry_run=False, max_changes=MAX_REPORTED_CHANGES):
+    """Apply a product CSV and return a Report; see the module docstring.
+
+    The report lists at most max_changes changes (all of them for None).
+    """
+    report = Report(dry_run, max_changes)
+    categories = _category_lookup()
+    seen = set()
+    renames = _Renames()
+    retitled = []
+    try:
+        with transaction.atomic():
+            for chunk in _chunks(read_rows(fileobj), CHUNK_SIZE):
+                report.rows += len(chunk)
+                changed, fields, renamed = _process_chunk(chunk, categories, seen, renames, report)
+                rounds = renames.release(renamed)
+                if report.errors or dry_run:
+                    # Keep validating the rest of the file for the report
+                    continue
+                if changed:
+                    Product.objects.bulk_update(changed, sorted(fields), batch_size=BATCH_SIZE)
+                    if 'title' in fields:
+                        retitled += [product.pk for product in changed]
+                for products in rounds:
+                    Product.objects.bulk_update(products, RENAME_FIELDS, batch_size=BATCH_SIZE)
+                    retitled += [product.pk for product in products]
+            for line, product in renames.blocked():
+                report.errors.append((line, f'title gives slug "{product.slug}" which another product already uses'))
+            if report.errors or dry_run:
+                raise _Rollback
+            # bulk_update sends no post_save, so refresh the search index here
+            if retitled and fts_available():
+                reindex_products(retitled)
+    except _Rollback:
+        pass
+    except IntegrityError as e:
+        report.errors.append((None, f'The database rejected the update: {e}'))
+    else:
+        report.applied = True
+    report.errors.sort(key=lambda error: error[0] or 0)
+    return report
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from shop.search import fts_available, rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text product search index from the product table'
+
+    def handle(self, *args, **options):
+        if not fts_available():
+            raise CommandError('The full-text search index requires an SQLite database')
+        count = rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f'Indexed {count} products'))
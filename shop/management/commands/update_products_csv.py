@@ -0,0 +1,45 @@
+import csv
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from shop.bulk_edit import BulkEditError, update_products
+
+
+class Command(BaseCommand):
+    help = 'Update product prices, titles and categories from a CSV file (id,price,title,category)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV file with an id column and the columns to change')
+        parser.add_argument('--dry-run', action='store_true', help='Report the changes without saving them')
+        parser.add_argument('--diff', help='Also write the reported changes to this CSV file')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        try:
+            with open(options['path'], 'rb') as f:
+                report = update_products(
+                    f, dry_run=options['dry_run'], max_changes=None if options['diff'] else 0
+                )
+        except (OSError, BulkEditError) as e:
+            raise CommandError(str(e))
+        elapsed = time.monotonic() - started
+
+        for line, message in report.errors[:50]:
+            self.stderr.write(f'line {line}: {message}' if line else message)
+        if len(report.errors) > 50:
+            self.stderr.write(f'... and {len(report.errors) - 50} more errors')
+
+        if options['diff']:
+            with open(options['diff'], 'w', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(['line', 'id', 'field', 'old', 'new'])
+                writer.writerows(report.changes)
+
+        summary = f'{report.rows} rows, {report.changed} products changed, {report.unchanged} unchanged in {elapsed:.1f}s'
+        if report.applied:
+            self.stdout.write(self.style.SUCCESS(f'Updated: {summary}'))
+        elif report.errors:
+            raise CommandError(f'Nothing saved, {len(report.errors)} invalid rows: {summary}')
+        else:
+            self.stdout.write(f'Dry run, nothing saved: {summary}')
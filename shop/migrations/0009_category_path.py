@@ -0,0 +1,34 @@
+# Generated by Django 4.2.11 on 2026-10-17 06:37
+
+from django.db import migrations, models
+
+
+def build_paths(apps, schema_editor):
+    Category = apps.get_model('shop', 'Category')
+    parents = dict(Category.objects.values_list('pk', 'sub_category_id'))
+    paths = {}
+
+    def path_for(pk):
+        if pk not in paths:
+            parent = parents[pk]
+            paths[pk] = (path_for(parent) if parent else '/') + f'{pk}/'
+        return paths[pk]
+
+    for pk in parents:
+        Category.objects.filter(pk=pk).update(path=path_for(pk))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0008_alter_product_slug'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='path',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=255),
+        ),
+        migrations.RunPython(build_paths, migrations.RunPython.noop),
+    ]
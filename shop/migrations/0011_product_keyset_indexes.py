@@ -0,0 +1,25 @@
+# Generated by Django 4.2.11 on 2026-10-17 06:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0010_product_search_index'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='product',
+            options={'ordering': ('-date_created', '-id')},
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['-date_created', '-id'], name='product_newest_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['category', '-date_created', '-id'], name='product_category_newest_idx'),
+        ),
+    ]
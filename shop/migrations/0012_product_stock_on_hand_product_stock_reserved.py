@@ -0,0 +1,23 @@
+# Generated by Django 4.2.11 on 2026-10-17 06:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0011_product_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='stock_on_hand',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='stock_reserved',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.11 on 2026-10-17 07:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0012_product_stock_on_hand_product_stock_reserved'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='updated',
+            field=models.DateTimeField(auto_now=True, null=True),
+        ),
+    ]
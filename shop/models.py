@@ -1,4 +1,6 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Value
+from django.db.models.functions import Concat, Substr
 from django.urls import reverse
 from django.template.defaultfilters import slugify
 from typing import Any
@@ -11,6 +13,11 @@ class Category(models.Model):
     )
     is_sub = models.BooleanField(default=False)  # type: ignore
     slug = models.SlugField(max_length=200, unique=True)
+    # Materialized path of ancestor ids including this category, e.g. "/3/12/".
+    # Maintained by save(), never edited by hand.
+    path = models.CharField(max_length=255, db_index=True, editable=False, default='')
+    # Bumped by every save; shop.navigation compares the newest value
+    updated = models.DateTimeField(auto_now=True, null=True)
 
     # Type hint for Django's default manager to help type checkers
     objects: Any
@@ -23,7 +30,52 @@ class Category(models.Model):
 
     def save(self, *args, **kwargs): # new
         self.slug = slugify(self.title)
-        return super().save(*args, **kwargs)
+        with transaction.atomic():
+            old_path = ''
+            if self.pk:
+                old_path = Category.objects.filter(pk=self.pk).values_list('path', flat=True).first() or ''
+            parent_path = '/'
+            if self.sub_category_id:
+                parent_path = Category.objects.values_list('path', flat=True).get(pk=self.sub_category_id)
+            if old_path and parent_path.startswith(old_path):
+                raise ValueError('A category cannot be moved under itself or its sub-categories')
+
+            # Computed before writing: the path in memory may predate a move
+            # of an ancestor
+            new_row = self.pk is None
+            if not new_row:
+                self.path = f'{parent_path}{self.pk}/'
+            result = super().save(*args, **kwargs)
+
+            if new_row:
+                self.path = f'{parent_path}{self.pk}/'
+                Category.objects.filter(pk=self.pk).update(path=self.path)
+            elif old_path and old_path != self.path:
+                # Re-root the descendants in one statement
+                Category.subtree(old_path).update(
+                    path=Concat(Value(self.path), Substr('path', len(old_path) + 1))
+                )
+        return result
+
+    @classmethod
+    def subtree(cls, path):
+        """Categories whose path lies under path, including the node itself.
+
+        Paths only contain digits and "/", so every descendant sorts between
+        the prefix and the prefix with its trailing "/" bumped to "0". The
+        range lookup stays on the path index, which LIKE does not on SQLite.
+        """
+        return cls.objects.filter(path__gte=path, path__lt=path[:-1] + '0')
+
+    def get_descendants(self, include_self=True):
+        categories = Category.subtree(self.path)
+        if not include_self:
+            categories = categories.exclude(pk=self.pk)
+        return categories
+
+    @property
+    def depth(self):
+        return self.path.count('/') - 1
         
 
 class Product(models.Model):
@@ -34,9 +86,20 @@ class Product(models.Model):
     price = models.IntegerField()
     date_created = models.DateTimeField(auto_now_add=True)
     slug = models.SlugField(unique=True)
+    # Units in the warehouse; empty means stock is not tracked for the product.
+    # Units held by unpaid checkouts are counted in stock_reserved until the
+    # order is paid or the reservation expires (see orders.inventory).
+    stock_on_hand = models.PositiveIntegerField(null=True, blank=True)
+    stock_reserved = models.PositiveIntegerField(default=0, editable=False)  # type: ignore
 
     class Meta:
-        ordering = ('-date_created',)
+        # id breaks ties between products created in the same instant, which
+        # keeps keyset pagination stable
+        ordering = ('-date_created', '-id')
+        indexes = [
+            models.Index(fields=['-date_created', '-id'], name='product_newest_idx'),
+            models.Index(fields=['category', '-date_created', '-id'], name='product_category_newest_idx'),
+        ]
 
     # Type hint for Django's default manager to help type checkers
     objects: Any
@@ -47,6 +110,28 @@ class Product(models.Model):
     def get_absolute_url(self):
         return reverse('shop:product_detail', kwargs={'slug':self.slug})
 
+    @property
+    def available_stock(self):
+        if self.stock_on_hand is None:
+            return None
+        return max(self.stock_on_hand - self.stock_reserved, 0)
+
+    @property
+    def in_stock(self):
+        return self.stock_on_hand is None or self.available_stock > 0
+
     def save(self, *args, **kwargs):
         self.slug = slugify(self.title)
-        return super().save(*args, **kwargs)
\ No newline at end of file
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            # stock_reserved only changes through F() updates in orders.inventory;
+            # leave it out so saving a stale instance cannot overwrite it
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'stock_reserved'
+            ]
+        return super().save(*args, **kwargs)
+
+    @classmethod
+    def in_category_tree(cls, category):
+        """Products filed under category or any of its descendants."""
+        return cls.objects.filter(category__in=category.get_descendants().values('pk'))
\ No newline at end of file
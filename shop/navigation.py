@@ -0,0 +1,81 @@
+"""Process-local cache of the category navigation tree.
+
+The tree used by the navbar and footer is built from a single query and
+kept in memory per process. Its version is the number of categories and
+the newest Category.updated, read from the database, so every worker
+process sees a change; each process checks it at most every CHECK_SECONDS
+and rebuilds its copy when the version differs. A category saved or
+deleted in this process (see shop.signals) is picked up on its next
+request.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.db.models import Count, Max
+
+from shop.models import Category
+
+# Seconds a process serves its tree before checking the version again
+CHECK_SECONDS = getattr(settings, 'NAVIGATION_CHECK_SECONDS', 10)
+
+_lock = threading.Lock()
+_cached = {'version': None, 'checked': None, 'roots': []}
+
+
+class NavNode:
+    __slots__ = ('id', 'title', 'slug', 'is_sub', 'children')
+
+    def __init__(self, id, title, slug, is_sub):
+        self.id = id
+        self.title = title
+        self.slug = slug
+        self.is_sub = is_sub
+        self.children = []
+
+    def __str__(self):
+        return str(self.title)
+
+
+def build_tree():
+    """Return the root NavNodes, each holding its sub-categories."""
+    nodes = {}
+    parents = {}
+    rows = Category.objects.order_by('id').values_list('id', 'title', 'slug', 'is_sub', 'sub_category_id')
+    for pk, title, slug, is_sub, parent_id in rows:
+        nodes[pk] = NavNode(pk, title, slug, is_sub)
+        parents[pk] = parent_id
+
+    roots = []
+    for pk, node in nodes.items():
+        parent = nodes.get(parents[pk])
+        if parent is None:
+            roots.append(node)
+        else:
+            parent.children.append(node)
+    return roots
+
+
+def get_version():
+    """Return a value that changes whenever a category is saved or deleted."""
+    state = Category.objects.aggregate(count=Count('id'), updated=Max('updated'))
+    return state['count'], state['updated']
+
+
+def get_navigation():
+    checked = _cached['checked']
+    if checked is None or time.monotonic() - checked >= CHECK_SECONDS:
+        with _lock:
+            checked = _cached['checked']
+            if checked is None or time.monotonic() - checked >= CHECK_SECONDS:
+                version = get_version()
+                if _cached['version'] != version:
+                    _cached['roots'] = build_tree()
+                    _cached['version'] = version
+                _cached['checked'] = time.monotonic()
+    return _cached['roots']
+
+
+def invalidate():
+    # Other processes see the change within CHECK_SECONDS
+    _cached['checked'] = None
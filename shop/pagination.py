@@ -0,0 +1,106 @@
+"""Keyset (cursor) pagination for catalog listings.
+
+Pages are addressed by an opaque token holding the (date_created, id) key
+of the row at the page boundary instead of a page number, so every page is
+a single indexed range scan with a LIMIT, no COUNT(*) and no OFFSET. The
+ordering matches Product.Meta.ordering.
+"""
+import base64
+import hashlib
+
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+PER_PAGE = 20
+# How long the (approximate) total of a listing is cached, in seconds
+TOTAL_CACHE_TIMEOUT = 300
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+def encode_cursor(direction, product):
+    raw = f'{direction}|{product.date_created.isoformat()}|{product.pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Return (direction, date_created, id) or None for a missing/bad token."""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode()
+        direction, created, pk = raw.split('|')
+        created = parse_datetime(created)
+        pk = int(pk)
+    except (ValueError, UnicodeDecodeError):
+        return None
+    if direction not in (NEXT, PREVIOUS) or created is None:
+        return None
+    return direction, created, pk
+
+
+def cached_total(queryset):
+    """Row count of queryset, cached so listings do not COUNT(*) per request."""
+    key = 'catalog-total:' + hashlib.md5(str(queryset.query).encode()).hexdigest()
+    return cache.get_or_set(key, queryset.count, TOTAL_CACHE_TIMEOUT)
+
+
+class CursorPage:
+    keyset = True
+
+    def __init__(self, object_list, next_token, previous_token, total=None):
+        self.object_list = object_list
+        self.next_token = next_token
+        self.previous_token = previous_token
+        self.total = total
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        return self.next_token is not None
+
+    def has_previous(self):
+        return self.previous_token is not None
+
+
+def keyset_page(queryset, token=None, per_page=PER_PAGE, with_total=False):
+    """Return the CursorPage of queryset addressed by token.
+
+    queryset must be a Product queryset; it is re-ordered newest first by
+    (date_created, id).
+    """
+    cursor = decode_cursor(token)
+    if cursor is None:
+        direction = NEXT
+        rows = list(queryset.order_by('-date_created', '-id')[:per_page + 1])
+    else:
+        direction, created, pk = cursor
+        if direction == NEXT:
+            rows = list(
+                queryset.filter(Q(date_created__lt=created) | Q(date_created=created, id__lt=pk))
+                .order_by('-date_created', '-id')[:per_page + 1]
+            )
+        else:
+            rows = list(
+                queryset.filter(Q(date_created__gt=created) | Q(date_created=created, id__gt=pk))
+                .order_by('date_created', 'id')[:per_page + 1]
+            )
+
+    more = len(rows) > per_page
+    rows = rows[:per_page]
+    if direction == PREVIOUS:
+        rows.reverse()
+        has_next, has_previous = True, more
+    else:
+        has_next, has_previous = more, cursor is not None
+
+    next_token = encode_cursor(NEXT, rows[-1]) if rows and has_next else None
+    previous_token = encode_cursor(PREVIOUS, rows[0]) if rows and has_previous else None
+    total = cached_total(queryset) if with_total else None
+    return CursorPage(rows, next_token, previous_token, total)
@@ -0,0 +1,177 @@
+"""Full-text product search backed by an SQLite FTS5 index.
+
+The index lives in the ``shop_product_fts`` virtual table (created by a
+migration) and holds a copy of each product's title and description keyed
+by the product id. It is kept current by the Product signals in
+``shop.signals`` and can be rebuilt with ``manage.py rebuild_search_index``.
+On databases without FTS5 the search falls back to ``icontains`` lookups.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from shop.models import Product
+
+FTS_TABLE = 'shop_product_fts'
+
+# bm25 column weights: a hit in the title counts more than one in the description
+TITLE_WEIGHT = 10.0
+DESCRIPTION_WEIGHT = 1.0
+
+SNIPPET_TOKENS = 16
+# Control characters never appear in product text, so they can mark
+# highlights inside the snippet before it is HTML-escaped
+_HIGHLIGHT_START = '\x02'
+_HIGHLIGHT_END = '\x03'
+
+_TERM_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def fts_available():
+    return connection.vendor == 'sqlite'
+
+
+def build_match_query(query):
+    """Turn free text into an FTS5 MATCH expression.
+
+    Every word becomes a quoted prefix term, so user input can never be
+    parsed as FTS5 syntax and "head" matches "headphones".
+    """
+    terms = _TERM_RE.findall(query or '')
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def index_product(product):
+    if not fts_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [product.pk])
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, title, description) VALUES (%s, %s, %s)',
+            [product.pk, product.title, product.description],
+        )
+
+
+def unindex_product(product_id):
+    if not fts_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [product_id])
+
+
+def reindex_products(product_ids):
+    """Refresh the index entries of many products, a few statements per 500."""
+    product_ids = list(product_ids)
+    with connection.cursor() as cursor:
+        for start in range(0, len(product_ids), 500):
+            batch = product_ids[start:start + 500]
+            placeholders = ', '.join(['%s'] * len(batch))
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})', batch)
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, title, description) '
+                f'SELECT id, title, description FROM {Product._meta.db_table} WHERE id IN ({placeholders})',
+                batch,
+            )
+
+
+def rebuild_index():
+    """Repopulate the whole index from the product table and return its size."""
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, title, description) '
+            f'SELECT id, title, description FROM {Product._meta.db_table}'
+        )
+        cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+        cursor.execute(f'SELECT count(*) FROM {FTS_TABLE}')
+        return cursor.fetchone()[0]
+
+
+def _highlight(snippet):
+    html = escape(snippet)
+    html = html.replace(_HIGHLIGHT_START, '<mark>').replace(_HIGHLIGHT_END, '</mark>')
+    return mark_safe(html)
+
+
+class SearchResults:
+    """Lazily evaluated, ranked search results.
+
+    Implements just enough of the sequence protocol (count() and slicing)
+    for Django's Paginator, so only the requested page is ranked out of
+    the index and hydrated from the product table.
+    """
+
+    def __init__(self, query):
+        self.query = query
+        self.match = build_match_query(query)
+        self._count = None
+
+    def count(self):
+        if self._count is None:
+            if not self.match:
+                self._count = 0
+            elif fts_available():
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        f'SELECT count(*) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+                        [self.match],
+                    )
+                    self._count = cursor.fetchone()[0]
+            else:
+                self._count = self._fallback_queryset().count()
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start = index.start or 0
+            stop = index.stop if index.stop is not None else self.count()
+            return self._fetch(start, max(stop - start, 0))
+        results = self._fetch(index, 1)
+        if not results:
+            raise IndexError(index)
+        return results[0]
+
+    def _fallback_queryset(self):
+        condition = Q()
+        for term in _TERM_RE.findall(self.query or ''):
+            condition &= Q(title__icontains=term) | Q(description__icontains=term)
+        return Product.objects.filter(condition)
+
+    def _fetch(self, offset, limit):
+        if not self.match or not limit:
+            return []
+        if not fts_available():
+            return list(self._fallback_queryset()[offset:offset + limit])
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid, snippet({FTS_TABLE}, 1, %s, %s, %s, %s) '
+                f'FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+                f'ORDER BY bm25({FTS_TABLE}, %s, %s) LIMIT %s OFFSET %s',
+                [
+                    _HIGHLIGHT_START, _HIGHLIGHT_END, '…', SNIPPET_TOKENS,
+                    self.match, TITLE_WEIGHT, DESCRIPTION_WEIGHT, limit, offset,
+                ],
+            )
+            rows = cursor.fetchall()
+
+        products = Product.objects.in_bulk([row[0] for row in rows])
+        results = []
+        for product_id, snippet in rows:
+            product = products.get(product_id)
+            # Skip index rows whose product vanished before a rebuild
+            if product is None:
+                continue
+            product.search_snippet = _highlight(snippet)
+            results.append(product)
+        return results
+
+
+def search_products(query):
+    return SearchResults(query)
@@ -0,0 +1,26 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import navigation
+from .models import Category, Product
+from .search import index_product, unindex_product
+
+
+@receiver(post_save, sender=Product)
+def product_saved(sender, instance, **kwargs):
+    index_product(instance)
+
+
+@receiver(post_delete, sender=Product)
+def product_deleted(sender, instance, **kwargs):
+    unindex_product(instance.pk)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def category_changed(sender, instance, **kwargs):
+    # Make this process re-read the version on its next request, once the
+    # change is committed and that read can see it; other processes notice
+    # within navigation.CHECK_SECONDS
+    transaction.on_commit(navigation.invalidate)
@@ -1,3 +1,123 @@
+import io
+from datetime import timedelta
+from unittest import mock
+
 from django.test import TestCase
+from django.utils import timezone
+
+from . import bulk_edit, search
+from .models import Category, Product
+from .pagination import keyset_page
+
+
+class CatalogTestCase(TestCase):
+    def setUp(self):
+        self.category = Category.objects.create(title='Audio')
+
+    def product(self, title, description='', price=100):
+        return Product.objects.create(
+            category=self.category, image='products/item.jpg', title=title,
+            description=description or title, price=price,
+        )
+
+
+class KeysetPaginationTests(CatalogTestCase):
+    def test_pages_walk_the_listing_both_ways(self):
+        now = timezone.now()
+        products = [self.product(f'Item {i}') for i in range(5)]
+        # Two products share a timestamp; the id breaks the tie
+        for i, product in enumerate(products):
+            Product.objects.filter(pk=product.pk).update(date_created=now - timedelta(minutes=min(i, 3)))
+        expected = list(Product.objects.values_list('pk', flat=True))
+
+        pages, token = [], None
+        while True:
+            page = keyset_page(Product.objects.all(), token, per_page=2)
+            pages.append([product.pk for product in page])
+            if not page.has_next():
+                break
+            token = page.next_token
+        self.assertEqual(sum(pages, []), expected)
+        self.assertEqual(len(pages), 3)
+
+        previous = keyset_page(Product.objects.all(), page.previous_token, per_page=2)
+        self.assertEqual([product.pk for product in previous], pages[1])
+        self.assertTrue(previous.has_previous())
+
+    def test_bad_cursor_gives_the_first_page(self):
+        self.product('Item')
+        page = keyset_page(Product.objects.all(), 'not-a-cursor', per_page=2)
+        self.assertEqual(len(page), 1)
+        self.assertFalse(page.has_previous())
+
+
+class SearchTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.headphones = self.product('Wireless Headphones', 'Over-ear, noise cancelling')
+        self.speaker = self.product('Speaker', 'Pairs with your headphones')
+        self.product('Cable', 'Braided USB cable')
+
+    def test_index_ranks_title_hits_first(self):
+        results = search.search_products('head')
+        self.assertEqual(results.count(), 2)
+        self.assertEqual(list(results[:2]), [self.headphones, self.speaker])
+        self.assertIn('<mark>', results[1].search_snippet)
+
+    def test_fallback_without_fts(self):
+        with mock.patch.object(search, 'fts_available', return_value=False):
+            results = search.search_products('head')
+            self.assertEqual(results.count(), 2)
+            self.assertEqual({product.pk for product in results[:10]}, {self.headphones.pk, self.speaker.pk})
+
+    def test_fts_syntax_in_query_is_plain_text(self):
+        self.assertEqual(search.search_products('head*) "(').count(), 2)
+
+
+class BulkEditTests(CatalogTestCase):
+    def update(self, rows, **kwargs):
+        csv = 'id,price,title\n' + ''.join(f'{pk},{price},{title}\n' for pk, price, title in rows)
+        return bulk_edit.update_products(io.BytesIO(csv.encode()), **kwargs)
+
+    def test_invalid_row_rolls_back_the_whole_file(self):
+        first, second = self.product('First', price=10), self.product('Second', price=20)
+        report = self.update([(first.pk, 15, ''), (second.pk, 'ten', '')])
+        self.assertFalse(report.applied)
+        self.assertEqual(report.errors, [(3, 'price "ten" is not a whole number')])
+        self.assertEqual(Product.objects.get(pk=first.pk).price, 10)
+
+    def test_dry_run_reports_without_writing(self):
+        first = self.product('First', price=10)
+        report = self.update([(first.pk, 15, '')], dry_run=True)
+        self.assertFalse(report.applied)
+        self.assertEqual(report.changes, [(2, first.pk, 'price', 10, 15)])
+        self.assertEqual(Product.objects.get(pk=first.pk).price, 10)
+
+    @mock.patch.object(bulk_edit, 'CHUNK_SIZE', 1)
+    def test_slug_freed_later_in_the_file(self):
+        first, second = self.product('First'), self.product('Second')
+        report = self.update([(first.pk, '', 'Second'), (second.pk, '', 'Third')])
+        self.assertTrue(report.applied, report.errors)
+        self.assertEqual(
+            dict(Product.objects.values_list('pk', 'slug')), {first.pk: 'second', second.pk: 'third'}
+        )
+
+    def test_swapped_titles_are_rejected(self):
+        first, second = self.product('First'), self.product('Second')
+        report = self.update([(first.pk, '', 'Second'), (second.pk, '', 'First')])
+        self.assertFalse(report.applied)
+        self.assertEqual(len(report.errors), 2)
+
+
+class CategoryPathTests(CatalogTestCase):
+    def test_stale_instance_keeps_the_moved_path(self):
+        child = Category.objects.create(title='Headphones', sub_category=self.category)
+        stale = Category.objects.get(pk=child.pk)
+        root = Category.objects.create(title='Electronics')
+        self.category.sub_category = root
+        self.category.save()
 
-# Create your tests here.
+        stale.title = 'Earphones'
+        stale.save()
+        self.assertEqual(Category.objects.get(pk=child.pk).path, f'/{root.pk}/{self.category.pk}/{child.pk}/')
+        self.assertEqual(set(root.get_descendants()), {root, self.category, child})
@@ -2,12 +2,14 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.core.paginator import Paginator, PageNotAnInteger, EmptyPage
-from django.core.mail import send_mail
 from django.conf import settings
 
 from shop.models import Product, Category
 from cart.forms import QuantityForm
 from .forms import ContactForm
+from .pagination import keyset_page
+from .search import search_products
+from outbox.mail import queue_email
 
 
 def paginat(request, list_objects):
@@ -22,9 +24,14 @@ def paginat(request, list_objects):
 	return page_obj
 
 
+def paginat_keyset(request, queryset):
+	"""Cursor pagination for listings in the default newest-first order"""
+	return keyset_page(queryset, request.GET.get('cursor'), with_total=True)
+
+
 def home_page(request):
 	products = Product.objects.all()
-	context = {'products': paginat(request ,products)}
+	context = {'products': paginat_keyset(request ,products)}
 	return render(request, 'home_page.html', context)
 
 
@@ -67,9 +74,11 @@ def favorites(request):
 
 
 def search(request):
-	query = request.GET.get('q')
-	products = Product.objects.filter(title__icontains=query).all()
-	context = {'products': paginat(request ,products)}
+	query = request.GET.get('q', '').strip()
+	if not query:
+		return redirect('shop:home_page')
+	products = search_products(query)
+	context = {'products': paginat(request ,products), 'query': query}
 	return render(request, 'home_page.html', context)
 
 
@@ -77,18 +86,9 @@ def filter_by_category(request, slug):
 	"""when user clicks on parent category
 	we want to show all products in its sub-categories too
 	"""
-	result = []
-	category = Category.objects.filter(slug=slug).first()
-	[result.append(product) \
-		for product in Product.objects.filter(category=category.id).all()]
-	# check if category is parent then get all sub-categories
-	if not category.is_sub:
-		sub_categories = category.sub_categories.all()
-		# get all sub-categories products 
-		for category in sub_categories:
-			[result.append(product) \
-				for product in Product.objects.filter(category=category).all()]
-	context = {'products': paginat(request ,result)}
+	category = get_object_or_404(Category, slug=slug)
+	products = Product.in_category_tree(category)
+	context = {'products': paginat_keyset(request ,products)}
 	return render(request, 'home_page.html', context)
 
 
@@ -130,15 +130,9 @@ Support: support@shopease.com
 Phone: +91 8971278930
             """
             
-            # Send email
+            # Queue email
             try:
-                send_mail(
-                    f"ShopEase Contact Form: {subject}",
-                    full_message,
-                    settings.DEFAULT_FROM_EMAIL,
-                    [settings.CONTACT_EMAIL],
-                    fail_silently=False,
-                )
+                queue_email(f"ShopEase Contact Form: {subject}", full_message, [settings.CONTACT_EMAIL])
                 messages.success(request, 'Thank you for your message. We will get back to you soon!')
                 return redirect('shop:contact')
             except Exception as e: